@@ -0,0 +1,89 @@
+"""Measure the throughput of the mlint output parsers on synthetic output.
+
+Usage: python -m benchmarks.mlint_parser_benchmark [--megabytes 200] [--messages-per-file 9]
+"""
+
+import argparse
+import itertools
+import time
+from typing import Callable, Iterable, List
+
+from precommitmatlablint.linter_results import LinterRecord
+from precommitmatlablint.mlint_parser import iter_mlint_output
+
+MESSAGES = [
+    "L {line} (C {column}): NOSEMI: "
+    "Terminate statement with semicolon to suppress output (in functions).",
+    "L {line} (C {column}-{end}): INUSL: "
+    "Input argument 'helpUrl' might be unused: consider replacing it by ~.",
+    "L {line} (C {column}): AGROW: "
+    "The variable 'result' appears to change size on every loop iteration.",
+    "L {line} (C {column}-{end}): GVMIS: "
+    "Global variables are inefficient. Use a function with input variables.",
+]
+
+
+def make_output(megabytes: float, messages_per_file: int) -> str:
+    """Build mlint output for several files, each a boundary line followed by its messages.
+
+    With messages_per_file 0, build the output of a single file instead, which has no boundaries.
+    """
+    lines: List[str] = []
+    size = 0
+    target = int(megabytes * 1024 * 1024)
+    # A file's boundary line and its messages
+    lines_per_file = messages_per_file + 1
+    for index in itertools.count():
+        if messages_per_file > 0 and index % lines_per_file == 0:
+            file_index = index // lines_per_file
+            folder, name = f"folder_{file_index % 97}", f"file_{file_index}.m"
+            line = f"========== /work/project/{folder}/{name} =========="
+        else:
+            line = MESSAGES[index % len(MESSAGES)].format(
+                line=index % 5000 + 1, column=index % 80 + 1, end=index % 80 + 9
+            )
+        lines.append(line)
+        size += len(line) + 1
+        if size >= target:
+            break
+    return "\n".join(lines) + "\n"
+
+
+def parse_lines(buffer: str) -> Iterable[LinterRecord]:
+    """The former approach: a stripped copy of every line, each parsed on its own."""
+    lines = [line.strip() for line in buffer.splitlines()]
+    return [LinterRecord.from_mlint(line) for line in lines if line and not line.startswith("===")]
+
+
+def measure(name: str, parse: Callable[[], Iterable], megabytes: float) -> None:
+    start = time.perf_counter()
+    count = sum(1 for _ in parse())
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {count:>10} items  {elapsed:7.2f} s  {megabytes / elapsed:7.1f} MB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--megabytes", type=float, default=200.0, help="Size of the synthetic output"
+    )
+    parser.add_argument(
+        "--messages-per-file",
+        type=int,
+        default=9,
+        help="Messages between two boundary lines (0 for the output of a single file)",
+    )
+    args = parser.parse_args()
+
+    text = make_output(args.megabytes, args.messages_per_file)
+    data = text.encode("utf-8")
+    megabytes = len(data) / (1024 * 1024)
+    print(f"Parsing {megabytes:.1f} MB of mlint output")
+
+    measure("line by line (str)", lambda: parse_lines(text), megabytes)
+    measure("iter_mlint_output (str)", lambda: iter_mlint_output(text), megabytes)
+    measure("iter_mlint_output (bytes)", lambda: iter_mlint_output(memoryview(data)), megabytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import re
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, cast
+
+from precommitmatlablint.process_slots import ProcessSlotPool
+
+MLINT_BACKEND = "mlint"
+MATLAB_BACKEND = "matlab"
+# The order in which backends are preferred when their cold-start latencies are unknown or equal
+BACKEND_PREFERENCE = (MLINT_BACKEND, MATLAB_BACKEND)
+
+# The options the hook may pass to mlint; '-config' stands for every '-config=<value>'
+CHECKCODE_FLAGS = ("-id", "-m0", "-m2", "-cyc", "-modcyc", "-notok", "-config=factory")
+# What mlint writes when it does not know an option
+UNSUPPORTED_FLAG_PATTERN = re.compile(
+    r"unknown|unrecognized|not recognized|invalid (?:option|flag|argument)", re.IGNORECASE
+)
+
+# How many times a benchmarked backend lints the sample corpus, and an empty file, once warm
+BENCHMARK_REPEATS = 3
+# The number of files in the sample corpus, written in turn from SAMPLE_SOURCES
+SAMPLE_CORPUS_SIZE = 16
+# Typical m-files, with a few of the issues mlint reports; {name} is replaced by the file's name
+SAMPLE_SOURCES = (
+    """function result = {name}(values)
+%{name} Sum the squares of the positive values
+result = [];
+for index = 1:numel(values)
+    if values(index) > 0
+        result(end + 1) = values(index) ^ 2;
+    end
+end
+result = sum(result)
+end
+""",
+    """function [low, high] = {name}(data, fraction)
+%{name} Return the bounds of the central fraction of the data
+if nargin < 2
+    fraction = 0.9;
+end
+sorted_data = sort(data(:));
+count = numel(sorted_data);
+tail = (1 - fraction) / 2;
+low = sorted_data(max(1, floor(tail * count)));
+high = sorted_data(min(count, ceil((1 - tail) * count)));
+end
+""",
+    """% {name} Plot a damped sine wave
+t = linspace(0, 10, 1000);
+y = exp(-0.3 * t) .* sin(2 * pi * t);
+figure
+plot(t, y)
+xlabel('Time (s)')
+ylabel('Amplitude')
+title('Damped sine')
+unused = 3
+""",
+    """function text = {name}(records)
+%{name} Format a struct array of records as a table
+text = '';
+for index = 1:length(records)
+    record = records(index);
+    switch class(record.value)
+        case 'char'
+            value = record.value;
+        otherwise
+            value = num2str(record.value);
+    end
+    text = [text sprintf('%s: %s\\n', record.name, value)];
+end
+end
+""",
+)
+
+
+@dataclass
+class BackendBenchmark:
+    """How fast a lint backend of a MATLAB install linted the sample corpus."""
+
+    file_count: int
+    # Seconds to lint the corpus the first time
+    cold_seconds: float
+    # Median seconds to lint the corpus again
+    warm_seconds: float
+    # Median seconds to lint an empty file, which is the overhead of every launch
+    startup_seconds: float
+
+    @property
+    def files_per_second(self) -> float:
+        return self.file_count / self.warm_seconds if self.warm_seconds > 0 else float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "file_count": self.file_count,
+            "cold_seconds": self.cold_seconds,
+            "warm_seconds": self.warm_seconds,
+            "startup_seconds": self.startup_seconds,
+        }
+
+    @classmethod
+    def from_dict(cls, input_dict: Dict[str, Any]) -> "BackendBenchmark":
+        return BackendBenchmark(
+            file_count=int(input_dict["file_count"]),
+            cold_seconds=float(input_dict["cold_seconds"]),
+            warm_seconds=float(input_dict["warm_seconds"]),
+            startup_seconds=float(input_dict["startup_seconds"]),
+        )
+
+
+@dataclass
+class BackendCapabilities:
+    """What probing a lint backend of a MATLAB install found out about it."""
+
+    name: str
+    available: bool
+    # The option names the backend accepts, as returned by flag_name()
+    flags: List[str] = field(default_factory=list)
+    # Seconds from launch to exit on an empty file; None if the backend was not launched
+    cold_start_seconds: Optional[float] = None
+    # How fast the backend linted the sample corpus, if it was benchmarked
+    benchmark: Optional[BackendBenchmark] = None
+
+    def supports(self, required_flags: Iterable[str]) -> bool:
+        return set(required_flags) <= set(self.flags)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "available": self.available,
+            "flags": list(self.flags),
+            "cold_start_seconds": self.cold_start_seconds,
+            "benchmark": self.benchmark.to_dict() if self.benchmark is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, input_dict: Dict[str, Any]) -> "BackendCapabilities":
+        cold_start_seconds = input_dict.get("cold_start_seconds")
+        benchmark = input_dict.get("benchmark")
+        return BackendCapabilities(
+            name=str(input_dict.get("name", "")),
+            available=bool(input_dict.get("available", False)),
+            flags=[str(f) for f in input_dict.get("flags") or []],
+            cold_start_seconds=None if cold_start_seconds is None else float(cold_start_seconds),
+            benchmark=None if benchmark is None else BackendBenchmark.from_dict(benchmark),
+        )
+
+
+def flag_name(argument: str) -> str:
+    """Return the option name of a command-line argument, e.g. '-config' for '-config=factory'."""
+    return argument.split("=", 1)[0]
+
+
+def probe_mlint(exe_path: Path) -> BackendCapabilities:
+    """Run mlint on an empty file to learn whether it works, how fast it starts and what it accepts.
+
+    All options are tried in one launch first; only if mlint rejects that are they tried one at a
+    time.
+    """
+    if not exe_path.is_file():
+        return BackendCapabilities(MLINT_BACKEND, available=False)
+
+    with TemporaryDirectory() as folder:
+        probe_file = Path(folder) / "probe.m"
+        probe_file.write_text("")
+        try:
+            cold_start_seconds, available = _run_probe([str(exe_path), str(probe_file)])
+            if not available:
+                return BackendCapabilities(MLINT_BACKEND, available=False)
+
+            _, all_accepted = _run_probe([str(exe_path), *CHECKCODE_FLAGS, str(probe_file)])
+            accepted: List[str] = list(CHECKCODE_FLAGS)
+            if not all_accepted:
+                accepted = [
+                    f for f in CHECKCODE_FLAGS if _run_probe([str(exe_path), f, str(probe_file)])[1]
+                ]
+        except OSError:
+            # The file exists but cannot be executed
+            return BackendCapabilities(MLINT_BACKEND, available=False)
+
+    return BackendCapabilities(
+        MLINT_BACKEND,
+        available=True,
+        flags=sorted({flag_name(f) for f in accepted}),
+        cold_start_seconds=cold_start_seconds,
+    )
+
+
+def _run_probe(command: List[str]) -> Tuple[float, bool]:
+    """Run a probe command, returning its duration in seconds and whether it succeeded."""
+    with ProcessSlotPool.for_mlint().slot():
+        start = time.perf_counter()
+        completed_process = subprocess.run(command, capture_output=True, text=True)
+        seconds = time.perf_counter() - start
+    succeeded = completed_process.returncode == 0 and not UNSUPPORTED_FLAG_PATTERN.search(
+        completed_process.stderr
+    )
+    return seconds, succeeded
+
+
+def write_sample_corpus(folder: Path) -> List[Path]:
+    """Write the corpus that backends are benchmarked on to a folder, returning the file paths."""
+    filepaths: List[Path] = []
+    for index in range(SAMPLE_CORPUS_SIZE):
+        name = f"sample_{index + 1}"
+        filepath = folder / f"{name}.m"
+        filepath.write_text(SAMPLE_SOURCES[index % len(SAMPLE_SOURCES)].replace("{name}", name))
+        filepaths.append(filepath)
+    return filepaths
+
+
+def benchmark_linter(
+    lint: Callable[[List[Path]], Any],
+    filepaths: List[Path],
+    empty_file: Path,
+    repeats: int = BENCHMARK_REPEATS,
+) -> BackendBenchmark:
+    """Time a backend's lint function on a corpus, cold and then warm, and on an empty file.
+
+    Errors raised by the lint function are passed on.
+    """
+
+    def time_lint(files: List[Path]) -> float:
+        start = time.perf_counter()
+        lint(files)
+        return time.perf_counter() - start
+
+    cold_seconds = time_lint(filepaths)
+    warm_seconds = statistics.median(time_lint(filepaths) for _ in range(max(repeats, 1)))
+    startup_seconds = statistics.median(time_lint([empty_file]) for _ in range(max(repeats, 1)))
+    return BackendBenchmark(
+        file_count=len(filepaths),
+        cold_seconds=cold_seconds,
+        warm_seconds=warm_seconds,
+        startup_seconds=startup_seconds,
+    )
+
+
+def select_backend(
+    backends: Dict[str, BackendCapabilities], required_flags: Set[str]
+) -> Optional[str]:
+    """Return the fastest available backend accepting the required options, or None if none does.
+
+    When every candidate was benchmarked, they are ranked by how long they took to lint the sample
+    corpus warm. Otherwise they are ranked by their cold start, and backends that were never
+    launched rank after those with a measured one.
+    """
+    candidates = [b for b in backends.values() if b.available and b.supports(required_flags)]
+    if not candidates:
+        return None
+    benchmarked = all(b.benchmark is not None for b in candidates)
+
+    def rank(backend: BackendCapabilities) -> Tuple[bool, float, int]:
+        preference = (
+            BACKEND_PREFERENCE.index(backend.name)
+            if backend.name in BACKEND_PREFERENCE
+            else len(BACKEND_PREFERENCE)
+        )
+        if benchmarked:
+            return False, cast(BackendBenchmark, backend.benchmark).warm_seconds, preference
+        seconds = backend.cold_start_seconds
+        return seconds is None, seconds if seconds is not None else 0.0, preference
+
+    return min(candidates, key=rank).name
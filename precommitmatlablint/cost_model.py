@@ -0,0 +1,186 @@
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from precommitmatlablint.file_lock import FileLock, atomic_write_text, get_lock_file
+from precommitmatlablint.utility import get_state_file
+
+# Used until a linter has been observed often enough to estimate its own costs
+DEFAULT_STARTUP_SECONDS = 0.05
+DEFAULT_SECONDS_PER_BYTE = 2e-6
+# Older observations count for less, so the model follows changes in the machine or the linter
+DECAY = 0.9
+# The weight a file's previous duration keeps when a new one is observed
+FILE_SMOOTHING = 0.5
+# Observations for at most this many files are kept
+MAX_FILE_ENTRIES = 100_000
+
+
+@dataclass
+class LinterCosts:
+    """A decaying least-squares fit of batch duration against batch size in bytes for one linter.
+
+    The intercept is the per-process startup overhead and the slope is the cost per byte of source.
+    """
+
+    weight: float = 0.0
+    sum_bytes: float = 0.0
+    sum_seconds: float = 0.0
+    sum_bytes_squared: float = 0.0
+    sum_bytes_seconds: float = 0.0
+
+    def observe(self, total_bytes: int, seconds: float) -> None:
+        self.weight = self.weight * DECAY + 1.0
+        self.sum_bytes = self.sum_bytes * DECAY + total_bytes
+        self.sum_seconds = self.sum_seconds * DECAY + seconds
+        self.sum_bytes_squared = self.sum_bytes_squared * DECAY + total_bytes * total_bytes
+        self.sum_bytes_seconds = self.sum_bytes_seconds * DECAY + total_bytes * seconds
+
+    def fit(self) -> Tuple[float, float]:
+        """Return the estimated (startup seconds, seconds per byte)."""
+        if self.weight <= 0.0:
+            return DEFAULT_STARTUP_SECONDS, DEFAULT_SECONDS_PER_BYTE
+
+        mean_bytes = self.sum_bytes / self.weight
+        mean_seconds = self.sum_seconds / self.weight
+        variance = self.sum_bytes_squared / self.weight - mean_bytes * mean_bytes
+        if variance <= 1e-9 * max(mean_bytes * mean_bytes, 1.0):
+            # All batches had about the same size, so the startup cost cannot be told apart from the
+            # rest
+            startup = min(DEFAULT_STARTUP_SECONDS, mean_seconds)
+            per_byte = (
+                (mean_seconds - startup) / mean_bytes
+                if mean_bytes > 0
+                else DEFAULT_SECONDS_PER_BYTE
+            )
+            return startup, max(per_byte, 0.0)
+
+        per_byte = (self.sum_bytes_seconds / self.weight - mean_bytes * mean_seconds) / variance
+        per_byte = max(per_byte, 0.0)
+        startup = max(mean_seconds - per_byte * mean_bytes, 0.0)
+        return startup, per_byte
+
+
+@dataclass
+class FileCost:
+    size: int
+    seconds: float
+
+
+@dataclass
+class LintCostModel:
+    """Observed lint durations, persisted between runs, used to size and order batches.
+
+    Per-file durations are keyed by path and remembered together with the file size; a file whose
+    size changed falls back to the linter's per-byte estimate. Batches may be observed from several
+    threads. Saving writes this process's observations over the ones saved meanwhile by parallel
+    hook processes, rather than replacing the whole file.
+    """
+
+    stats_file: Path = field(default_factory=lambda: get_state_file("lint-stats.json"))
+    linters: Dict[str, LinterCosts] = field(default_factory=dict)
+    files: Dict[str, FileCost] = field(default_factory=dict)
+    has_changes: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    # The linters and files observed since the last load or save
+    _changed_linters: Set[str] = field(default_factory=set, repr=False, compare=False)
+    _changed_files: Set[str] = field(default_factory=set, repr=False, compare=False)
+
+    def _read(self) -> Optional[Tuple[Dict[str, LinterCosts], Dict[str, FileCost]]]:
+        try:
+            data: Dict[str, Any] = json.loads(self.stats_file.read_text(encoding="utf-8"))
+            return (
+                {key: LinterCosts(**value) for key, value in data.get("linters", {}).items()},
+                {key: FileCost(*value) for key, value in data.get("files", {}).items()},
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as err:
+            logging.getLogger(__name__).warning(
+                f"Ignoring unreadable lint statistics {self.stats_file}: {err}"
+            )
+            return None
+
+    def load(self) -> None:
+        saved = self._read()
+        with self._lock:
+            if saved is not None:
+                self.linters, self.files = saved
+            self._changed_linters.clear()
+            self._changed_files.clear()
+            self.has_changes = False
+
+    def save(self) -> None:
+        if self.has_changes:
+            with FileLock(get_lock_file(self.stats_file)):
+                saved = self._read()
+                with self._lock:
+                    if saved is not None:
+                        linters, files = saved
+                        for key in self._changed_linters:
+                            linters[key] = self.linters[key]
+                        for key, value in self.files.items():
+                            if key in self._changed_files:
+                                files.pop(key, None)
+                                files[key] = value
+                        self.linters, self.files = linters, files
+                    self._changed_linters.clear()
+                    self._changed_files.clear()
+                    # Drop the entries that have not been updated for longest
+                    while len(self.files) > MAX_FILE_ENTRIES:
+                        del self.files[next(iter(self.files))]
+                    data = {
+                        "linters": {key: vars(value) for key, value in self.linters.items()},
+                        "files": {
+                            key: [value.size, value.seconds] for key, value in self.files.items()
+                        },
+                    }
+                    self.has_changes = False
+                atomic_write_text(self.stats_file, json.dumps(data))
+
+    def get_linter_costs(self, linter_key: str) -> Tuple[float, float]:
+        """Return the estimated (startup seconds, seconds per byte) of a linter."""
+        costs = self.linters.get(linter_key)
+        return (
+            costs.fit()
+            if costs is not None
+            else (DEFAULT_STARTUP_SECONDS, DEFAULT_SECONDS_PER_BYTE)
+        )
+
+    def estimate_file(self, linter_key: str, filepath: Path, size: int) -> float:
+        """Return the estimated seconds a linter spends on one file, excluding its startup."""
+        file_cost = self.files.get(str(filepath))
+        if file_cost is not None and file_cost.size == size:
+            return file_cost.seconds
+        return size * self.get_linter_costs(linter_key)[1]
+
+    def observe_batch(self, linter_key: str, files: List[Tuple[Path, int]], seconds: float) -> None:
+        """Record how long a linter took for one batch of (path, size) files.
+
+        The time left after the estimated startup overhead is shared out between the files in
+        proportion to their current estimates.
+        """
+        total_bytes = sum(size for _, size in files)
+        with self._lock:
+            costs = self.linters.setdefault(linter_key, LinterCosts())
+            self._changed_linters.add(linter_key)
+            startup, _ = costs.fit()
+            costs.observe(total_bytes, seconds)
+
+            estimates = [self.estimate_file(linter_key, path, size) for path, size in files]
+            total_estimate = sum(estimates)
+            work = max(seconds - startup, 0.0)
+            for (path, size), estimate in zip(files, estimates):
+                share = estimate / total_estimate if total_estimate > 0 else 1.0 / len(files)
+                key = str(path)
+                previous = self.files.pop(key, None)
+                observed = work * share
+                if previous is not None and previous.size == size:
+                    observed = FILE_SMOOTHING * previous.seconds + (1.0 - FILE_SMOOTHING) * observed
+                self.files[key] = FileCost(size=size, seconds=observed)
+                self._changed_files.add(key)
+
+            self.has_changes = True
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from precommitmatlablint.file_lock import FileLock, atomic_write_text, get_lock_file
+from precommitmatlablint.linter_results import LinterReport
+from precommitmatlablint.utility import get_state_file
+
+# Failures are remembered for at most this many files
+MAX_FAILURE_ENTRIES = 10_000
+
+
+@dataclass
+class FailureHistory:
+    """The files that failed linting in earlier runs, persisted to lint likely failures first.
+
+    Each failing file is remembered with the time it last failed; a file is forgotten once it
+    passes. Saving applies this process's updates to the history saved meanwhile by parallel hook
+    processes, rather than replacing the whole file.
+    """
+
+    history_file: Path = field(default_factory=lambda: get_state_file("failure-history.json"))
+    failures: Dict[str, float] = field(default_factory=dict)
+    has_changes: bool = False
+    # The failure time of each file updated since the last load or save, None once it passed
+    _changes: Dict[str, Optional[float]] = field(default_factory=dict, repr=False, compare=False)
+
+    def _read(self) -> Optional[Dict[str, float]]:
+        try:
+            data: Dict[str, Any] = json.loads(self.history_file.read_text(encoding="utf-8"))
+            return {str(key): float(value) for key, value in data.get("failures", {}).items()}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, AttributeError) as err:
+            logging.getLogger(__name__).warning(
+                f"Ignoring unreadable failure history {self.history_file}: {err}"
+            )
+            return None
+
+    def load(self) -> None:
+        failures = self._read()
+        if failures is not None:
+            self.failures = failures
+        self._changes = {}
+        self.has_changes = False
+
+    def save(self) -> None:
+        if self.has_changes:
+            with FileLock(get_lock_file(self.history_file)):
+                failures = self._read()
+                if failures is not None:
+                    for key, failed_at in self._changes.items():
+                        if failed_at is None:
+                            failures.pop(key, None)
+                        else:
+                            failures[key] = failed_at
+                    self.failures = failures
+                # Drop the failures that are oldest
+                while len(self.failures) > MAX_FAILURE_ENTRIES:
+                    del self.failures[min(self.failures, key=self.failures.__getitem__)]
+                atomic_write_text(self.history_file, json.dumps({"failures": self.failures}))
+            self._changes = {}
+            self.has_changes = False
+
+    def update(self, report: LinterReport) -> None:
+        key = str(report.source_file)
+        if report.has_failures():
+            self.failures[key] = self._changes[key] = time.time()
+            self.has_changes = True
+        elif self.failures.pop(key, None) is not None:
+            self._changes[key] = None
+            self.has_changes = True
+
+    def prioritize(self, filepaths: Iterable[Path]) -> List[Path]:
+        """Order files by how likely they are to fail: recent failures, then recent changes."""
+
+        def priority(filepath: Path) -> Tuple[bool, float, int]:
+            failed_at = self.failures.get(str(filepath))
+            try:
+                mtime_ns = os.stat(filepath).st_mtime_ns
+            except OSError:
+                mtime_ns = 0
+            return failed_at is None, -(failed_at or 0.0), -mtime_ns
+
+        return sorted(filepaths, key=priority)
+
+
+def stop_at_first_failure(reports: Iterable[LinterReport]) -> Iterator[LinterReport]:
+    """Yield reports up to and including the first failure, then stop the linting behind them."""
+    try:
+        for report in reports:
+            yield report
+            if report.has_failures():
+                return
+    finally:
+        close = getattr(reports, "close", None)
+        if close is not None:
+            close()
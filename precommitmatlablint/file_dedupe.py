@@ -0,0 +1,294 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from precommitmatlablint.linter_results import LinterReport
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Files that must be hashed are hashed on this many threads
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+# Streamed files are taken this many at a time, so that those to hash are hashed together
+HASH_CHUNK_FILES = 64
+# The reports of this many recently linted files are kept for duplicates still to come
+MAX_RETAINED_REPORTS = 4096
+# Duplicates are looked for among this many recently seen files, paths and contents
+MAX_TRACKED_FILES = 50_000
+
+
+def hash_file(path: Path) -> Optional[bytes]:
+    """Return a digest of the file's contents, or None if it cannot be read.
+
+    The file is read in chunks into one reused buffer; hashing releases the GIL, so several files
+    can be hashed at once on a thread pool. Files are not mapped into memory, as a file truncated
+    while mapped kills the process with SIGBUS.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                digest.update(view[:size])
+    except OSError:
+        return None
+    return digest.digest()
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_hashing(
+    function: Callable[[T], R], items: Sequence[T], executor: Optional[Executor] = None
+) -> List[R]:
+    """Apply a function that hashes files to each item, on a pool of threads if there are several.
+
+    Parameters
+    ----------
+    function: callable
+                    Hashes the file of one item
+    items: sequence
+    executor: Executor, optional
+                    The threads to hash on. A pool of HASH_WORKERS threads is used if not supplied.
+
+    Returns
+    -------
+    list
+                    The results, in the order of the items
+    """
+    if len(items) > 1 and executor is not None:
+        return list(executor.map(function, items))
+    if len(items) > 1 and HASH_WORKERS > 1:
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash") as pool:
+            return list(pool.map(function, items))
+    return [function(item) for item in items]
+
+
+def hash_files(paths: Sequence[Path], executor: Optional[Executor] = None) -> List[Optional[bytes]]:
+    """Return the digests of several files, in order, as hash_file() does, hashing them at once."""
+    return map_hashing(hash_file, paths, executor)
+
+
+class Deduplicator:
+    """Lints each distinct file once, however many paths lead to it, and gives every path a report.
+
+    Paths resolving to the same file, and files with the same name and the same contents, share one
+    lint. The name is part of the key because mlint checks a function's name against its file name.
+    Contents are only hashed once a second file of the same name and size turns up, so a run without
+    duplicates hashes nothing.
+
+    Only the most recent reports, and the paths, sizes and digests of the most recent files, are
+    kept, so memory does not grow with the number of files or findings. A duplicate turning up after
+    its original's report or entries were dropped is linted again. filter() and expand() may run on
+    different threads.
+    """
+
+    # Returns the digests of several files' contents, or None for those that cannot be read
+    _digests: Callable[[Sequence[Path]], List[Optional[bytes]]]
+
+    # Real path of each file seen, to the path that is linted for it
+    _real_paths: "OrderedDict[str, Path]"
+    # Name and size of each file seen, to the first such file while it is the only one and has not
+    # been hashed, and to None after
+    _sizes: "OrderedDict[Tuple[str, int], Optional[Path]]"
+    # Name, size and content digest, to the path that is linted for them
+    _contents: "OrderedDict[Tuple[str, int, bytes], Path]"
+    # Paths yielded for linting whose reports have not come back yet
+    _pending: Set[Path]
+    # Duplicates waiting for the report of the path linted for them
+    _waiting: Dict[Path, List[Path]]
+    _reports: "OrderedDict[Path, LinterReport]"
+    # Reports of duplicates whose linted path was already reported, ready to be yielded
+    _ready: List[LinterReport]
+    duplicate_count: int
+    # Guards the state shared between filter() and expand()
+    _lock: threading.Lock
+
+    def __init__(self, digests: Callable[[Sequence[Path]], List[Optional[bytes]]] = hash_files):
+        """
+        Parameters
+        ----------
+        digests: callable
+                    Returns the digests of several files' contents, in order, or None for those
+                    that cannot be read, e.g. StatIndex.digests() to reuse the digests of unchanged
+                    files. Defaults to hash_files().
+        """
+        self._digests = digests
+        self._real_paths = OrderedDict()
+        self._sizes = OrderedDict()
+        self._contents = OrderedDict()
+        self._pending = set()
+        self._waiting = {}
+        self._reports = OrderedDict()
+        self._ready = []
+        self.duplicate_count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, filepaths: Iterable[Path]) -> Iterator[Path]:
+        """Yield the paths that need linting, holding back duplicates of paths already yielded.
+
+        The paths are taken HASH_CHUNK_FILES at a time, and the files of each chunk that need
+        comparing by content are hashed together.
+        """
+        iterator = iter(filepaths)
+        while True:
+            chunk = list(islice(iterator, HASH_CHUNK_FILES))
+            if not chunk:
+                return
+            yield from self._filter_chunk(chunk)
+
+    def _filter_chunk(self, filepaths: List[Path]) -> Iterator[Path]:
+        stats = [self._stat(filepath) for filepath in filepaths]
+        digests = self._hash_candidates(filepaths, stats)
+        for filepath, (real_path, size) in zip(filepaths, stats):
+            original = self._find_original(filepath, real_path, size, digests)
+            is_duplicate = True
+            with self._lock:
+                report = self._reports.get(original) if original is not None else None
+                if report is not None:
+                    self._ready.append(self._copy_report(report, filepath))
+                elif original is not None and original in self._pending:
+                    self._waiting.setdefault(original, []).append(filepath)
+                else:
+                    self._pending.add(filepath)
+                    is_duplicate = False
+                if is_duplicate:
+                    self.duplicate_count += 1
+            if not is_duplicate:
+                yield filepath
+
+    def expand(self, reports: Iterable[LinterReport]) -> Iterator[LinterReport]:
+        """Yield the linter's reports, each followed by copies for the duplicates of its file."""
+        for report in reports:
+            with self._lock:
+                ready = self._take_ready()
+                self._pending.discard(report.source_file)
+                self._reports[report.source_file] = report
+                if len(self._reports) > MAX_RETAINED_REPORTS:
+                    self._reports.popitem(last=False)
+                duplicates = self._waiting.pop(report.source_file, [])
+            yield from ready
+            yield report
+            for duplicate in duplicates:
+                yield self._copy_report(report, duplicate)
+        with self._lock:
+            ready = self._take_ready()
+        yield from ready
+
+    @staticmethod
+    def _stat(filepath: Path) -> Tuple[str, Optional[int]]:
+        """Return the real path of a file, and its size or None if it cannot be read."""
+        real_path = os.path.realpath(filepath)
+        try:
+            return real_path, os.stat(real_path).st_size
+        except OSError:
+            return real_path, None
+
+    def _hash_candidates(
+        self, filepaths: List[Path], stats: List[Tuple[str, Optional[int]]]
+    ) -> Dict[Path, Optional[bytes]]:
+        """Hash the files of a chunk that share their name and size with another file, at once."""
+        size_keys: List[Optional[Tuple[str, int]]] = []
+        counts: Dict[Tuple[str, int], int] = {}
+        real_paths: Set[str] = set()
+        for filepath, (real_path, size) in zip(filepaths, stats):
+            if size is None or real_path in self._real_paths or real_path in real_paths:
+                size_keys.append(None)
+                continue
+            real_paths.add(real_path)
+            size_key = (filepath.name, size)
+            size_keys.append(size_key)
+            counts[size_key] = counts.get(size_key, 0) + 1
+
+        candidates: Dict[Path, None] = {}
+        for filepath, size_key in zip(filepaths, size_keys):
+            if size_key is not None and (size_key in self._sizes or counts[size_key] > 1):
+                first = self._sizes.get(size_key)
+                if first is not None:
+                    candidates[first] = None
+                candidates[filepath] = None
+        paths = list(candidates)
+        return dict(zip(paths, self._digests(paths))) if paths else {}
+
+    def _digest(self, filepath: Path, digests: Dict[Path, Optional[bytes]]) -> Optional[bytes]:
+        if filepath in digests:
+            return digests[filepath]
+        return self._digests([filepath])[0]
+
+    def _find_original(
+        self,
+        filepath: Path,
+        real_path: str,
+        size: Optional[int],
+        digests: Dict[Path, Optional[bytes]],
+    ) -> Optional[Path]:
+        """Return the path already linted for the same file or contents, or None if it is new.
+
+        digests holds the digests hashed ahead for the chunk of the file.
+        """
+        original = self._real_paths.get(real_path)
+        if original is not None:
+            self._real_paths.move_to_end(real_path)
+            return original
+        self._remember(self._real_paths, real_path, filepath)
+
+        if size is None:
+            # Leave it to the linter to report files that cannot be read
+            return None
+        size_key = (filepath.name, size)
+        if size_key not in self._sizes:
+            self._remember(self._sizes, size_key, filepath)
+            return None
+
+        first = self._sizes[size_key]
+        self._remember(self._sizes, size_key, None)
+        if first is not None:
+            first_digest = self._digest(first, digests)
+            if first_digest is not None:
+                self._remember(self._contents, (*size_key, first_digest), first)
+        digest = self._digest(filepath, digests)
+        if digest is None:
+            return None
+        content_key = (*size_key, digest)
+        original = self._contents.get(content_key, filepath)
+        self._remember(self._contents, content_key, original)
+        if original == filepath:
+            return None
+        self._real_paths[real_path] = original
+        return original
+
+    @staticmethod
+    def _remember(entries: "OrderedDict[Any, Any]", key: Any, value: Any) -> None:
+        """Set an entry as the most recent one, dropping the oldest once there are too many."""
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > MAX_TRACKED_FILES:
+            entries.popitem(last=False)
+
+    def _take_ready(self) -> List[LinterReport]:
+        ready, self._ready = self._ready, []
+        return ready
+
+    @staticmethod
+    def _copy_report(report: LinterReport, source_file: Path) -> LinterReport:
+        return LinterReport(source_file=source_file, records=list(report.records))
@@ -0,0 +1,246 @@
+import os
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Pattern, Tuple
+
+from precommitmatlablint.file_watcher import is_matlab_file
+
+GITIGNORE_FILE_NAME = ".gitignore"
+GIT_FOLDER_NAME = ".git"
+
+
+@dataclass
+class IgnorePattern:
+    """One line of a .gitignore file, as a regular expression over paths relative to the root."""
+
+    regex: Pattern[str]
+    negated: bool
+    dir_only: bool
+
+    @classmethod
+    def parse(cls, line: str, base: str = "") -> Optional["IgnorePattern"]:
+        """Parse a .gitignore line, returning None for blank lines and comments.
+
+        Parameters
+        ----------
+        line: str
+                    The pattern line
+        base: str
+                    The folder holding the .gitignore file, relative to the scanned root, with a
+                    trailing '/' (or empty for the root itself)
+        """
+        line = line.rstrip("\n\r")
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        if not line or line.startswith("#"):
+            return None
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        # A pattern with a slash anywhere but the end is relative to its .gitignore, otherwise it
+        # matches at any depth
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = re.escape(base) + ("" if anchored else "(?:.*/)?")
+        return cls(re.compile(f"^{prefix}{translate_glob(line)}$"), negated, dir_only)
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        return (is_dir or not self.dir_only) and self.regex.match(relative_path) is not None
+
+
+def translate_glob(pattern: str) -> str:
+    """Translate a .gitignore glob into a regular expression; only '**' crosses folders."""
+    parts: List[str] = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        elif char == "[":
+            end = pattern.find("]", index + 2)
+            if end < 0:
+                parts.append(re.escape(char))
+            else:
+                content = pattern[index + 1 : end]
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                parts.append(f"[{content.replace(chr(92), chr(92) * 2)}]")
+                index = end
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return "".join(parts)
+
+
+def is_ignored(patterns: List[IgnorePattern], relative_path: str, is_dir: bool) -> bool:
+    """Apply patterns in order; as in git, the last matching pattern decides."""
+    ignored = False
+    for pattern in patterns:
+        if pattern.negated == ignored and pattern.matches(relative_path, is_dir):
+            ignored = not pattern.negated
+    return ignored
+
+
+def read_ignore_file(ignore_file: Path, base: str) -> List[IgnorePattern]:
+    try:
+        lines = ignore_file.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return []
+    patterns = [IgnorePattern.parse(line, base) for line in lines]
+    return [p for p in patterns if p is not None]
+
+
+def parse_exclude_patterns(excludes: List[str]) -> List[IgnorePattern]:
+    """Parse .gitignore-style exclude patterns, relative to the scanned root."""
+    patterns = [IgnorePattern.parse(e) for e in excludes]
+    return [p for p in patterns if p is not None]
+
+
+def scan_matlab_files(root: Path, excludes: Optional[List[str]] = None) -> Iterator[Path]:
+    """Walk a folder tree with os.scandir, yielding MATLAB files as they are found.
+
+    The .gitignore files met along the way are honoured, and ignored folders are never entered.
+
+    Parameters
+    ----------
+    root: Path
+                The folder to scan
+    excludes: list of str, optional
+                Additional .gitignore-style patterns, relative to root, of files and folders to skip
+    """
+    exclude_patterns = parse_exclude_patterns(excludes or [])
+    pending: List[Tuple[Path, str, List[IgnorePattern]]] = [(root, "", [])]
+    while pending:
+        folder, relative_folder, patterns = pending.pop()
+        gitignore = folder / GITIGNORE_FILE_NAME
+        if gitignore.is_file():
+            patterns = patterns + read_ignore_file(gitignore, relative_folder)
+        try:
+            with os.scandir(folder) as iterator:
+                entries = sorted(iterator, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subfolders: List[Tuple[Path, str, List[IgnorePattern]]] = []
+        for entry in entries:
+            relative_path = relative_folder + entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and entry.name == GIT_FOLDER_NAME:
+                continue
+            if is_ignored(exclude_patterns, relative_path, is_dir) or is_ignored(
+                patterns, relative_path, is_dir
+            ):
+                continue
+            if is_dir:
+                subfolders.append((Path(entry.path), relative_path + "/", patterns))
+            elif is_matlab_file(Path(entry.name)) and entry.is_file():
+                yield Path(entry.path)
+        # Reversed so that folders are visited in name order
+        pending.extend(reversed(subfolders))
+
+
+def is_git_work_tree(root: Path) -> bool:
+    if shutil.which("git") is None:
+        return False
+    completed_process = subprocess.run(
+        ["git", "-C", str(root), "rev-parse", "--is-inside-work-tree"],
+        capture_output=True,
+        text=True,
+    )
+    return completed_process.returncode == 0 and completed_process.stdout.strip() == "true"
+
+
+def list_git_matlab_files(root: Path, excludes: Optional[List[str]] = None) -> Iterator[Path]:
+    """Yield the tracked and untracked, not ignored, MATLAB files under root, as git lists them.
+
+    Paths are read from git while it is still running, so they can be linted before the listing is
+    complete.
+    """
+    exclude_patterns = parse_exclude_patterns(excludes or [])
+    process = subprocess.Popen(
+        [
+            "git",
+            "-C",
+            str(root),
+            "ls-files",
+            "-z",
+            "--cached",
+            "--others",
+            "--exclude-standard",
+            "--",
+            "*.m",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        for relative_path in read_null_separated(process.stdout):
+            if exclude_patterns and any(
+                is_ignored(exclude_patterns, prefix, is_dir=prefix != relative_path)
+                for prefix in iter_path_prefixes(relative_path)
+            ):
+                continue
+            path = root / relative_path
+            # Files deleted from the work tree but not yet from the index are still listed
+            if path.is_file():
+                yield path
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        if process.stdout is not None:
+            process.stdout.close()
+
+
+def read_null_separated(stream: Optional[IO[bytes]], chunk_size: int = 64 * 1024) -> Iterator[str]:
+    if stream is None:
+        return
+    remainder = b""
+    while True:
+        chunk = stream.read1(chunk_size) if hasattr(stream, "read1") else stream.read(chunk_size)
+        if not chunk:
+            break
+        *items, remainder = (remainder + chunk).split(b"\0")
+        for item in items:
+            yield os.fsdecode(item)
+    if remainder:
+        yield os.fsdecode(remainder)
+
+
+def iter_path_prefixes(relative_path: str) -> Iterator[str]:
+    """Yield 'a', 'a/b', 'a/b/c.m' for 'a/b/c.m', so excluded folders exclude their contents."""
+    parts = relative_path.split("/")
+    for index in range(1, len(parts) + 1):
+        yield "/".join(parts[:index])
+
+
+def find_matlab_files(root: Path, excludes: Optional[List[str]] = None) -> Iterator[Path]:
+    """Yield the MATLAB files under root, listed by git in a work tree and scanned for otherwise."""
+    root = root.absolute()
+    if is_git_work_tree(root):
+        return list_git_matlab_files(root, excludes)
+    return scan_matlab_files(root, excludes)
@@ -0,0 +1,189 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import IO, Optional
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """An advisory lock held on a file, shared between processes.
+
+    The lock is re-entrant for the thread that acquired it, so code holding the lock can call other
+    code that acquires it again. Other threads, other FileLock instances and other processes are
+    excluded. Once fully acquired, the lock may be released from any thread, which lets it be handed
+    over along with a resource.
+    """
+
+    lock_file: Path
+    _handle: Optional[IO[bytes]]
+    _depth: int
+    _owner: Optional[int]
+    _thread_lock: threading.Lock
+
+    def __init__(self, lock_file: Path):
+        self.lock_file = lock_file
+        self._handle = None
+        self._depth = 0
+        self._owner = None
+        self._thread_lock = threading.Lock()
+
+    def is_locked(self) -> bool:
+        return self._depth > 0
+
+    def is_owned(self) -> bool:
+        """Return whether the calling thread holds the lock."""
+        return self._depth > 0 and self._owner == threading.get_ident()
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """Acquire the lock.
+
+        Parameters
+        ----------
+        blocking: bool
+                    Whether to wait for the lock to become available
+        timeout: float, optional
+                    The maximum number of seconds to wait when blocking. Waits indefinitely if not
+                    supplied.
+
+        Returns
+        -------
+        bool
+            True if the lock was acquired
+        """
+        if self.is_owned():
+            self._depth += 1
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._thread_lock.acquire(
+            blocking, -1 if timeout is None or not blocking else timeout
+        ):
+            return False
+
+        try:
+            self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+            handle = self.lock_file.open("a+b")
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+        try:
+            if blocking and deadline is None:
+                _lock(handle, blocking=True)
+            else:
+                delay = 0.001
+                while not _lock(handle, blocking=False):
+                    if not blocking or deadline is None or time.monotonic() >= deadline:
+                        handle.close()
+                        self._thread_lock.release()
+                        return False
+                    time.sleep(delay)
+                    delay = min(delay * 2, 0.05)
+        except BaseException:
+            handle.close()
+            self._thread_lock.release()
+            raise
+
+        self._handle = handle
+        self._owner = threading.get_ident()
+        self._depth = 1
+        return True
+
+    def release(self) -> None:
+        if self._depth == 0:
+            raise RuntimeError(f"The lock on {self.lock_file} is not held")
+
+        self._depth -= 1
+        if self._depth > 0:
+            return
+
+        self._owner = None
+        try:
+            if self._handle is not None:
+                try:
+                    _unlock(self._handle)
+                finally:
+                    self._handle.close()
+                    self._handle = None
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def _lock(handle: IO[bytes], blocking: bool) -> bool:
+    """Lock an open file, returning False if it is held elsewhere and blocking is False."""
+    if sys.platform == "win32":
+        handle.seek(0)
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                # LK_LOCK only retries for ~10 seconds before raising, so wait in our own loop
+                # instead
+                time.sleep(0.01)
+    else:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(handle.fileno(), flags)
+            return True
+        except BlockingIOError:
+            return False
+
+
+def _unlock(handle: IO[bytes]) -> None:
+    if sys.platform == "win32":
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def get_lock_file(target_file: Path) -> Path:
+    """Return the path of the lock file that guards updates to the target file."""
+    return target_file.with_name(target_file.name + ".lock")
+
+
+def atomic_write_text(target_file: Path, text: str) -> None:
+    """Replace a file's contents so that readers see either the old or the new ones, never a mix.
+
+    The text is written to a temporary file in the same folder, flushed to disk and then renamed
+    over the target.
+    """
+    target_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(
+        prefix=f".{target_file.name}.", suffix=".tmp", dir=target_file.parent
+    )
+    temp_file = Path(temp_name)
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for attempt in range(10):
+            try:
+                os.replace(temp_file, target_file)
+                break
+            except PermissionError:
+                # On Windows the rename fails while a reader has the target open
+                if sys.platform != "win32" or attempt == 9:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+    finally:
+        temp_file.unlink(missing_ok=True)
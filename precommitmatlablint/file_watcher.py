@@ -0,0 +1,354 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+MATLAB_FILE_SUFFIX = ".m"
+DEFAULT_POLL_INTERVAL = 0.25
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+INOTIFY_EVENT = struct.Struct("iIII")
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+)
+
+
+def is_matlab_file(path: Path) -> bool:
+    return path.suffix == MATLAB_FILE_SUFFIX
+
+
+def walk_folders(root: Path) -> Iterator[Tuple[Path, List[os.DirEntry]]]:
+    """Yield each folder under root, root included, with its entries, skipping hidden folders."""
+    pending: List[Path] = [root]
+    while pending:
+        folder = pending.pop()
+        try:
+            with os.scandir(folder) as iterator:
+                entries = list(iterator)
+        except OSError:
+            continue
+        yield folder, entries
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                pending.append(Path(entry.path))
+
+
+class FileWatcher(ABC):
+    """Tracks the MATLAB files under a set of folders, plus named files, and reports their changes.
+
+    Subclasses implement wait_for_changes(); the set of known files is kept up to date as changes
+    are reported.
+    """
+
+    folders: List[Path]
+    named_files: Set[Path]
+    _files: Set[Path]
+
+    def __init__(self, paths: List[Path]):
+        """
+        Parameters
+        ----------
+        paths: list of Path
+                    The folders and files to watch
+        """
+        self.folders = [p.absolute() for p in paths if p.is_dir()]
+        self.named_files = {p.absolute() for p in paths if not p.is_dir()}
+        self._files = set()
+
+    def files(self) -> Set[Path]:
+        """Return the MATLAB files that currently exist under the watched paths."""
+        return set(self._files)
+
+    def is_watched(self, path: Path) -> bool:
+        if path in self.named_files:
+            return True
+        return is_matlab_file(path) and any(folder in path.parents for folder in self.folders)
+
+    @abstractmethod
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait until watched files are created, modified or deleted, and return their paths.
+
+        Parameters
+        ----------
+        timeout: float, optional
+                    The most seconds to wait. Waits indefinitely if not supplied.
+
+        Returns
+        -------
+        set of Path
+                    The changed files; empty if the timeout expired first
+        """
+
+    def _update_files(self, changed: Set[Path]) -> Set[Path]:
+        for path in changed:
+            if path.is_file():
+                self._files.add(path)
+            else:
+                self._files.discard(path)
+        return changed
+
+    def close(self) -> None:
+        """Release the resources held by the watcher."""
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PollingWatcher(FileWatcher):
+    """Finds changes by periodically comparing file modification times and sizes.
+
+    Folder listings are only read again when a folder's own modification time changes, so each poll
+    costs one stat call per watched file and folder.
+    """
+
+    interval: float
+    _file_stats: Dict[Path, Tuple[int, int]]
+    _folder_mtimes: Dict[Path, int]
+
+    def __init__(self, paths: List[Path], interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Parameters
+        ----------
+        paths: list of Path
+                    The folders and files to watch
+        interval: float
+                    Seconds between polls
+        """
+        super().__init__(paths)
+        self.interval = interval
+        self._file_stats = {}
+        self._folder_mtimes = {}
+        for folder in self.folders:
+            self._scan_folder(folder)
+        for path in self.named_files:
+            self._stat_file(path)
+        self._files = set(self._file_stats)
+
+    def _scan_folder(self, root: Path) -> Set[Path]:
+        """Record the folders and files under root, returning the files that are new or changed."""
+        changed: Set[Path] = set()
+        for folder, entries in walk_folders(root):
+            try:
+                self._folder_mtimes[folder] = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+            for entry in entries:
+                path = Path(entry.path)
+                if is_matlab_file(path) and path not in self._file_stats and self._stat_file(path):
+                    changed.add(path)
+        return changed
+
+    def _stat_file(self, path: Path) -> bool:
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return False
+        self._file_stats[path] = (stat_result.st_mtime_ns, stat_result.st_size)
+        return True
+
+    def poll(self) -> Set[Path]:
+        """Check every watched folder and file once, returning the files that changed."""
+        changed: Set[Path] = set()
+        for folder, mtime in list(self._folder_mtimes.items()):
+            try:
+                current = os.stat(folder).st_mtime_ns
+            except OSError:
+                del self._folder_mtimes[folder]
+                continue
+            if current != mtime:
+                # Files were added, removed or renamed; pick up the new ones
+                changed |= self._scan_folder(folder)
+        for path, stats in list(self._file_stats.items()):
+            if path in changed:
+                continue
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                del self._file_stats[path]
+                changed.add(path)
+                continue
+            current_stats = (stat_result.st_mtime_ns, stat_result.st_size)
+            if current_stats != stats:
+                self._file_stats[path] = current_stats
+                changed.add(path)
+        for path in self.named_files - set(self._file_stats):
+            if self._stat_file(path):
+                changed.add(path)
+        return self._update_files(changed)
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.poll()
+            if changed:
+                return changed
+            remaining = (
+                self.interval
+                if deadline is None
+                else min(self.interval, deadline - time.monotonic())
+            )
+            if remaining <= 0:
+                return set()
+            time.sleep(remaining)
+
+
+class InotifyWatcher(FileWatcher):
+    """Receives changes from the Linux kernel through inotify, so waiting costs nothing at all."""
+
+    _fd: int
+    _watch_folders: Dict[int, Path]
+    _libc: ctypes.CDLL
+
+    def __init__(self, paths: List[Path]):
+        """
+        Parameters
+        ----------
+        paths: list of Path
+                    The folders and files to watch
+
+        Raises
+        ------
+        OSError
+                    If inotify is not available
+        """
+        super().__init__(paths)
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._fd = fd
+        self._watch_folders = {}
+        try:
+            for folder in self.folders:
+                self._files |= self._add_tree(folder)
+            for path in self.named_files:
+                self._add_watch(path.parent)
+                if path.is_file():
+                    self._files.add(path)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, folder: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Unable to watch {folder}: {os.strerror(errno)}")
+        self._watch_folders[wd] = folder
+
+    def _add_tree(self, root: Path) -> Set[Path]:
+        """Watch root and every folder below it, returning the MATLAB files found."""
+        found: Set[Path] = set()
+        for folder, entries in walk_folders(root):
+            try:
+                self._add_watch(folder)
+            except FileNotFoundError:
+                continue
+            found.update(
+                Path(e.path) for e in entries if is_matlab_file(Path(e.path)) and e.is_file()
+            )
+        return found
+
+    def _read_events(self) -> Set[Path]:
+        changed: Set[Path] = set()
+        while True:
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, name_length = INOTIFY_EVENT.unpack_from(buffer, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(buffer[offset : offset + name_length].rstrip(b"\0"))
+                offset += name_length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, so compare against a fresh walk of every watched folder
+                    changed |= self._rescan()
+                    continue
+                folder = self._watch_folders.get(wd)
+                if folder is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self._watch_folders[wd]
+                    continue
+                path = folder / name
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and any(
+                        f in path.parents or f == path for f in self.folders
+                    ):
+                        changed |= self._add_tree(path)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        changed |= {f for f in self._files if path in f.parents}
+                elif name and self.is_watched(path):
+                    changed.add(path)
+        return changed
+
+    def _rescan(self) -> Set[Path]:
+        found: Set[Path] = set()
+        for folder in self.folders:
+            found |= self._add_tree(folder)
+        found |= {p for p in self.named_files if p.is_file()}
+        return found | self._files
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return set()
+            changed = self._read_events()
+            if changed:
+                return self._update_files(changed)
+
+    def close(self) -> None:
+        if getattr(self, "_fd", -1) >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_file_watcher(
+    paths: List[Path],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    logger: Optional[logging.Logger] = None,
+) -> FileWatcher:
+    """Return an inotify watcher where the platform supports it, and a polling watcher otherwise."""
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    try:
+        return InotifyWatcher(paths)
+    except (OSError, AttributeError) as err:
+        # AttributeError: the C library has no inotify functions
+        logger.info(f"Falling back to polling for file changes: {err}")
+        return PollingWatcher(paths, interval=poll_interval)
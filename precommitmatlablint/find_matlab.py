@@ -3,12 +3,22 @@ import os
 import re
 import sys
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 
-from precommitmatlablint.linter_handle import MatlabHandle, MatlabHandleList
+from precommitmatlablint.backend_probe import BENCHMARK_REPEATS, MLINT_BACKEND
+from precommitmatlablint.linter_handle import LinterOptions, MatlabHandle, MatlabHandleList
 from precommitmatlablint.return_code import ReturnCode
 
+MATHWORKS_REGISTRY_ROOT = r"HKEY_LOCAL_MACHINE\SOFTWARE\MathWorks"
+
+# Which releases may lend their mlint to a release without a usable one: only the same release, the
+# same or a newer one, or any release
+BORROW_SAME = "same"
+BORROW_NEWER = "newer"
+BORROW_ANY = "any"
+BORROW_MLINT_POLICIES = (BORROW_SAME, BORROW_NEWER, BORROW_ANY)
+
 
 def get_matlab_root(platform: str) -> Path:
     """Return the MATLAB install root folder path, e.g. C:\\Program Files\\MATLAB on Windows
@@ -32,6 +42,68 @@ def get_matlab_root(platform: str) -> Path:
     return root_paths[platform]
 
 
+def get_matlab_search_roots(platform: str) -> List[str]:
+    """Return the locations that are scanned for MATLAB installs.
+
+    Besides folders, on Windows this includes the MathWorks registry key.
+
+    Parameters
+    ----------
+    platform: str
+              The value of sys.platform
+
+    Returns
+    -------
+    list of str
+    """
+    search_roots: List[str] = [str(get_matlab_root(platform))]
+    if "win32" == platform:
+        search_roots.append(MATHWORKS_REGISTRY_ROOT)
+    return search_roots
+
+
+def get_search_root_mtime(search_root: str) -> Optional[int]:
+    """Return the modification time (in ns) of a search root, or None if it does not exist.
+
+    This is a single cheap stat call (or registry key query), so it can be done on every run to tell
+    whether a search root needs to be scanned again.
+    """
+    if MATHWORKS_REGISTRY_ROOT == search_root:
+        return get_matlab_registry_mtime()
+
+    try:
+        return os.stat(search_root).st_mtime_ns
+    except OSError:
+        return None
+
+
+def find_matlab_home_paths(search_root: str, platform: str) -> List[Path]:
+    """Return the MATLAB home folder paths found under a single search root.
+
+    Parameters
+    ----------
+    search_root: str
+                A folder path, or the MathWorks registry key on Windows
+    platform: str
+                The value of sys.platform
+
+    Returns
+    -------
+    list of Path
+    """
+    if MATHWORKS_REGISTRY_ROOT == search_root:
+        return get_matlab_registry_installs()
+
+    root_path = Path(search_root)
+    pattern = r"MATLAB_R\d+\w" if "darwin" == platform else r"R\d+\w"
+    matlab_home_paths: List[Path] = []
+    if root_path.exists():
+        matlab_home_paths = [
+            d for d in root_path.iterdir() if d.is_dir() and re.match(pattern, d.stem)
+        ]
+    return sorted(matlab_home_paths, reverse=True)
+
+
 def get_matlab_installs() -> MatlabHandleList:
     """Return a list of all MATLAB home folder paths based on matching the release name pattern in the folder name.
 
@@ -41,26 +113,82 @@ def get_matlab_installs() -> MatlabHandleList:
                  A list of all discovered MATLAB handles
     """
     this_platform = sys.platform
-    matlab_home_paths: List[Path] = []
-    root_path = get_matlab_root(this_platform)
-    if "win32" == this_platform:
-        if root_path.exists():
-            matlab_home_paths = [d for d in root_path.iterdir() if d.is_dir() and re.match(r"R\d+\w", d.stem)]
-            matlab_home_paths = sorted(matlab_home_paths, reverse=True)
-        matlab_home_paths = sorted(list(set(sorted(matlab_home_paths + get_matlab_registry_installs()))), reverse=True)
-    elif "darwin" == this_platform:
-        matlab_home_paths = [d for d in root_path.iterdir() if d.is_dir() and re.match(r"MATLAB_R\d+\w", d.stem)]
-        matlab_home_paths = sorted(matlab_home_paths, reverse=True)
-    elif "linux" == this_platform:
-        if root_path.exists():
-            matlab_home_paths = [d for d in root_path.iterdir() if d.is_dir() and re.match(r"R\d+\w", d.stem)]
-            matlab_home_paths = sorted(matlab_home_paths, reverse=True)
+    matlab_home_paths: Set[Path] = set()
+    for search_root in get_matlab_search_roots(this_platform):
+        matlab_home_paths.update(find_matlab_home_paths(search_root, this_platform))
 
     handle_list = MatlabHandleList()
-    handle_list.update(matlab_home_paths)
+    handle_list.update(sorted(matlab_home_paths, reverse=True))
     return handle_list
 
 
+def refresh_matlab_installs(
+    handle_list: MatlabHandleList,
+    search_roots: Optional[List[str]] = None,
+    platform: Optional[str] = None,
+    logger: Optional[logging.Logger] = None,
+) -> List[str]:
+    """Rescan only the search roots that changed since the handle list was last refreshed.
+
+    Each search root's modification time is compared against the one recorded in the handle list.
+    Installing or removing a MATLAB release adds or removes an entry in its search root, which
+    updates that time, so unchanged roots can be skipped without listing their contents.
+
+    Parameters
+    ----------
+    handle_list: MatlabHandleList
+                            The handle list to update in place
+    search_roots: list of str, optional
+                            The search roots to check. Defaults to get_matlab_search_roots() for
+                            this platform.
+    platform: str, optional
+                            The value of sys.platform
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    list of str
+                The search roots that were rescanned
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if platform is None:
+        platform = sys.platform
+    if search_roots is None:
+        search_roots = get_matlab_search_roots(platform)
+
+    current_mtimes: Dict[str, Optional[int]] = {r: get_search_root_mtime(r) for r in search_roots}
+    stale_roots: List[str] = handle_list.find_stale_search_roots(current_mtimes)
+
+    for search_root in stale_roots:
+        logger.info(f"Scanning {search_root} for MATLAB installs")
+        handle_list.update(find_matlab_home_paths(search_root, platform))
+        # Record the time observed before scanning, so that a change made during the scan is picked
+        # up next run
+        handle_list.set_search_root_mtime(search_root, current_mtimes[search_root])
+
+    if MATHWORKS_REGISTRY_ROOT in stale_roots:
+        # Registry entries can point anywhere, so every handle has to be checked
+        handle_list.prune()
+    elif len(stale_roots) > 0:
+        handle_list.prune([Path(r) for r in stale_roots])
+
+    return stale_roots
+
+
+def get_matlab_registry_mtime() -> Optional[int]:
+    """Return the last write time (ns since 1601) of the MathWorks registry key, or None."""
+    import winreg
+
+    try:
+        hklm = winreg.ConnectRegistry(None, winreg.HKEY_LOCAL_MACHINE)
+        with winreg.OpenKey(hklm, r"SOFTWARE\MathWorks") as mathworks_key:
+            _, _, last_write_time = winreg.QueryInfoKey(mathworks_key)
+            return int(last_write_time) * 100
+    except OSError:
+        return None
+
+
 def get_matlab_registry_installs() -> List[Path]:
     import winreg
 
@@ -125,12 +253,30 @@ def get_matlab_registry_installs() -> List[Path]:
     return sorted(matlab_home_paths)
 
 
+def load_matlab_handle_list(cache_file: Optional[Path], logger: logging.Logger) -> MatlabHandleList:
+    """Load the cached MATLAB handles, rescanning search roots that changed."""
+    handle_list: MatlabHandleList = MatlabHandleList(cache_file=cache_file, logger=logger)
+    handle_list.load()
+    # Only the search roots that changed since the last run are scanned, which on a first run is all
+    # of them
+    search_roots: List[str] = get_matlab_search_roots(sys.platform)
+    if handle_list.find_stale_search_roots({r: get_search_root_mtime(r) for r in search_roots}):
+        with handle_list.lock():
+            # Parallel hook processes queue up here; all but the first will find the scan already
+            # done
+            handle_list.load()
+            refresh_matlab_installs(handle_list, search_roots=search_roots, logger=logger)
+            handle_list.save()
+    return handle_list
+
+
 def find_matlab(
     matlab_home_path: Optional[Path] = None,
     matlab_version: Optional[str] = None,
     matlab_release_name: Optional[str] = None,
     cache_file: Optional[Path] = None,
     logger: Optional[logging.Logger] = None,
+    on_found: Optional[Callable[[MatlabHandle], None]] = None,
 ) -> Tuple[Optional[MatlabHandle], ReturnCode]:
     """Find the path to a MATLAB executable by providing a path for validation, release name, or version.
 
@@ -148,6 +294,11 @@ def find_matlab(
 
     logger: logging.Logger, optional
 
+    on_found: callable, optional
+                                            Called with the handle as soon as it is known, before
+                                            the handle cache is saved, so that slow work such as
+                                            starting MATLAB can begin early.
+
     Returns
     -------
     handle: MatlabHandle, optional
@@ -157,15 +308,7 @@ def find_matlab(
     if logger is None:
         logger = logging.getLogger(__name__)
 
-    handle_list: MatlabHandleList = MatlabHandleList(cache_file=cache_file, logger=logger)
-    handle_list.load()
-    if len(handle_list) == 0:
-        # If we haven't previously cached any installs, go find all that are present on the system
-        logger.info("No prior MATLAB installs have been cached.")
-        installs = get_matlab_installs()
-        handle_list.handles.extend(installs.handles)
-        handle_list.has_changes = True
-
+    handle_list = load_matlab_handle_list(cache_file, logger)
     handle: Optional[MatlabHandle] = None
     if matlab_home_path is not None:
         logger.info(f"MATLAB home path {matlab_home_path} exists")
@@ -179,7 +322,12 @@ def find_matlab(
             test_handle = MatlabHandle(home_path=matlab_home_path, exe_path=exe_path, base_exe_path=base_exe_path)
             handle = test_handle if test_handle.is_initialized() else None
             if handle is not None:
-                handle_list.append(handle)
+                with handle_list.lock():
+                    # A parallel hook process may have cached the same install meanwhile
+                    handle_list.load()
+                    if handle_list.find_home_path(matlab_home_path) is None:
+                        handle_list.append(handle)
+                    handle_list.save()
 
     else:
         if matlab_release_name is not None:
@@ -190,9 +338,182 @@ def find_matlab(
             logger.info(f"Attempting to locate a handle to MATLAB {matlab_version}")
             handle = handle_list.find_version(matlab_version)
 
+    if handle is not None and on_found is not None:
+        on_found(handle)
+
     logger.info(f"Saving MATLAB handle list to {handle_list.cache_file}")
     handle_list.save()
 
+    # Backends are probed once per install change; later runs pick the fastest one from the cached
+    # results
+    if handle is not None and handle.needs_probe():
+        logger.info(f"Probing the lint backends of {handle.home_path}")
+        handle = handle_list.probe(handle)
+
     return_code = ReturnCode.OK if handle is not None else ReturnCode.FAIL
     logger.info(f"MATLAB handle found: {return_code.name}")
     return handle, return_code
+
+
+def find_matlab_releases(
+    release_names: Sequence[str],
+    cache_file: Optional[Path] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Tuple[List[MatlabHandle], ReturnCode]:
+    """Find the MATLAB installs of several releases, loading and scanning the handle cache once.
+
+    Parameters
+    ----------
+    release_names: list of str
+                        The desired MATLAB releases, e.g. ["R2021a", "R2023b"]
+    cache_file: Path, optional
+
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    handles: list of MatlabHandle
+                        A handle per release, in the order of release_names
+    return_code: ReturnCode
+                        FAIL if any of the releases is not installed
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    handle_list = load_matlab_handle_list(cache_file, logger)
+    handles: List[MatlabHandle] = []
+    missing: List[str] = []
+    for release_name in release_names:
+        logger.info(f"Attempting to locate a handle to MATLAB {release_name}")
+        handle = handle_list.find_release(release_name)
+        if handle is None:
+            missing.append(release_name)
+        else:
+            handles.append(handle)
+
+    logger.info(f"Saving MATLAB handle list to {handle_list.cache_file}")
+    handle_list.save()
+
+    handles = [handle_list.probe(h) if h.needs_probe() else h for h in handles]
+    if missing:
+        logger.error(f"Unable to find MATLAB {', '.join(missing)}")
+        return handles, ReturnCode.FAIL
+    return handles, ReturnCode.OK
+
+
+def benchmark_matlab_installs(
+    cache_file: Optional[Path] = None,
+    logger: Optional[logging.Logger] = None,
+    repeats: int = BENCHMARK_REPEATS,
+) -> List[MatlabHandle]:
+    """Benchmark the backends of every cached MATLAB install, saving the results in the cache.
+
+    Parameters
+    ----------
+    cache_file: Path, optional
+
+    logger: logging.Logger, optional
+
+    repeats: int
+                        How many times each backend lints the sample corpus once warm
+
+    Returns
+    -------
+    list of MatlabHandle
+                        The benchmarked handles
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    handle_list = load_matlab_handle_list(cache_file, logger)
+    benchmarked: List[MatlabHandle] = []
+    for handle in list(handle_list.handles):
+        logger.info(f"Benchmarking the lint backends of {handle.home_path}")
+        benchmarked.append(handle_list.benchmark(handle, repeats))
+    return benchmarked
+
+
+def parse_release_name(release_name: str) -> Optional[Tuple[int, str]]:
+    """Return the year and half of a release name such as R2021a, or None if it is not one."""
+    match = re.fullmatch(
+        r"R(?P<year>\d{4})(?P<half>[ab])", release_name.strip(), flags=re.IGNORECASE
+    )
+    if match is None:
+        return None
+    return int(match.group("year")), match.group("half").lower()
+
+
+def get_release_distance(release_name: str, target_release_name: str) -> Optional[int]:
+    """Return how many releases release_name comes after the target release, negative if before.
+
+    Returns None if either is not a release name.
+    """
+    release = parse_release_name(release_name)
+    target = parse_release_name(target_release_name)
+    if release is None or target is None:
+        return None
+
+    def index(year_half: Tuple[int, str]) -> int:
+        return 2 * year_half[0] + (1 if year_half[1] == "b" else 0)
+
+    return index(release) - index(target)
+
+
+def find_mlint_donor(
+    matlab_handle: MatlabHandle,
+    options: LinterOptions,
+    policy: str = BORROW_NEWER,
+    cache_file: Optional[Path] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Optional[MatlabHandle]:
+    """Find another cached install whose mlint works and accepts the options, to lend its mlint.
+
+    Installs of the same release are preferred, then the nearest newer releases and, if the policy
+    allows it, the nearest older ones. Installs whose backends were not probed yet are probed as
+    they are considered.
+
+    Parameters
+    ----------
+    matlab_handle: MatlabHandle
+                        The handle to the install without a usable mlint
+    options: LinterOptions
+                        The options mlint has to accept
+    policy: str
+                        One of BORROW_MLINT_POLICIES
+    cache_file: Path, optional
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    MatlabHandle, optional
+                        The handle to the install to borrow mlint from, if any
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if policy not in BORROW_MLINT_POLICIES:
+        raise ValueError(f"Unknown mlint borrowing policy '{policy}'")
+
+    handle_list = MatlabHandleList(cache_file=cache_file, logger=logger)
+    handle_list.load()
+    candidates: List[Tuple[Tuple[int, int], MatlabHandle]] = []
+    for handle in handle_list.handles:
+        if handle.home_path == matlab_handle.home_path:
+            continue
+        distance = get_release_distance(handle.release, matlab_handle.release)
+        if (
+            distance is None
+            or (distance != 0 and policy == BORROW_SAME)
+            or (distance < 0 and policy == BORROW_NEWER)
+        ):
+            continue
+        # Same release first, then newer releases, nearest first, then older releases, nearest first
+        candidates.append(((0 if distance >= 0 else 1, abs(distance)), handle))
+
+    for _, handle in sorted(candidates, key=lambda c: c[0]):
+        if handle.needs_probe():
+            handle = handle_list.probe(handle)
+        if handle.select_backend(options) == MLINT_BACKEND:
+            return handle
+
+    logger.info(f"No other MATLAB install could lend its mlint to MATLAB {matlab_handle.release}")
+    return None
@@ -1,15 +1,74 @@
 import argparse
+import json
 import logging
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, closing
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional, TextIO, TypeVar, cast
 
-from collections.abc import Sequence
+from collections.abc import Iterable, Iterator, Sequence
 
-from precommitmatlablint.find_matlab import find_matlab
-from precommitmatlablint.linter_handle import LinterOptions, MatlabHandle
+from precommitmatlablint.backend_probe import MATLAB_BACKEND, MLINT_BACKEND
+from precommitmatlablint.cost_model import LintCostModel
+from precommitmatlablint.failure_history import FailureHistory, stop_at_first_failure
+from precommitmatlablint.file_dedupe import Deduplicator, hash_files
+from precommitmatlablint.file_discovery import find_matlab_files
+from precommitmatlablint.file_watcher import create_file_watcher
+from precommitmatlablint.find_matlab import (
+    BORROW_MLINT_POLICIES,
+    benchmark_matlab_installs,
+    find_matlab,
+    find_matlab_releases,
+    find_mlint_donor,
+)
+from precommitmatlablint.lint_pipeline import LintPipeline
+from precommitmatlablint.lint_scheduler import BatchScheduler, get_file_size
+from precommitmatlablint.lint_watcher import LintWatcher
+from precommitmatlablint.linter_handle import (
+    DeadlineExceeded,
+    Linter,
+    LinterOptions,
+    MatlabHandle,
+    MLintHandle,
+)
+from precommitmatlablint.linter_results import ALLOWED_MCCABE_IDS, LinterRecord, LinterReport
+from precommitmatlablint.matlab_workers import DEFAULT_MAX_JOBS_PER_WORKER, MatlabWorkerPool
+from precommitmatlablint.prechecks import Prechecks
+from precommitmatlablint.process_slots import (
+    DEFAULT_MAX_MATLAB_PROCESSES,
+    DEFAULT_MAX_MLINT_PROCESSES,
+    ProcessSlotPool,
+)
+from precommitmatlablint.report_writers import (
+    REPORT_WRITERS,
+    BufferedTextStream,
+    Reporter,
+    ReportWriter,
+    create_report_writer,
+)
+from precommitmatlablint.result_cache import LintResultCache, get_options_key
 from precommitmatlablint.return_code import ReturnCode
+from precommitmatlablint.run_records import RunRecorder, RunRecordStore, compute_run_digest
+from precommitmatlablint.sharding import (
+    Shard,
+    merge_reports,
+    parse_shard,
+    read_ndjson_report,
+    select_shard,
+)
+from precommitmatlablint.stat_index import StatIndex
 
-ALLOWED_MCCABE_IDS = {"CABE", "MCABE"}
+# What the files left unchecked at the end of a time budget mean for the result: nothing, a warning
+# or a failure
+OVER_BUDGET_PASS = "pass"
+OVER_BUDGET_WARN = "warn"
+OVER_BUDGET_FAIL = "fail"
+OVER_BUDGET_POLICIES = (OVER_BUDGET_PASS, OVER_BUDGET_WARN, OVER_BUDGET_FAIL)
 
 
 def is_existent_file(potential_file: Path) -> bool:
@@ -31,9 +90,67 @@ def extract_folder_path_option(path_string: Optional[str]) -> Optional[Path]:
     return potential_folder if potential_folder.exists() and potential_folder.is_dir() else None
 
 
+StoreT = TypeVar(
+    "StoreT", LintCostModel, FailureHistory, LintResultCache, RunRecordStore, StatIndex
+)
+
+
+def load_store(
+    store: Optional[StoreT], store_class: type[StoreT], used: bool = True
+) -> Optional[StoreT]:
+    """Return the store supplied, else, if it is used, the one saved in the HOME directory."""
+    if store is None and used:
+        store = store_class()
+        store.load()
+    return store
+
+
+@dataclass
+class RunStores:
+    """The state a lint run reads from, and saves to, the user's HOME directory."""
+
+    cost_model: LintCostModel
+    failure_history: Optional[FailureHistory] = None
+    result_cache: Optional[LintResultCache] = None
+    run_records: Optional[RunRecordStore] = None
+    stat_index: Optional[StatIndex] = None
+
+    @classmethod
+    def load(
+        cls,
+        cost_model: Optional[LintCostModel] = None,
+        failure_history: Optional[FailureHistory] = None,
+        result_cache: Optional[LintResultCache] = None,
+        run_records: Optional[RunRecordStore] = None,
+        stat_index: Optional[StatIndex] = None,
+        fail_fast: bool = False,
+        use_result_cache: bool = True,
+    ) -> "RunStores":
+        """Return the stores supplied, loading those that are not but are used by the run."""
+        return cls(
+            cost_model=cast(LintCostModel, load_store(cost_model, LintCostModel)),
+            # Only fail-fast runs order files by their history, so other runs leave it alone
+            failure_history=load_store(failure_history, FailureHistory) if fail_fast else None,
+            result_cache=load_store(result_cache, LintResultCache, use_result_cache),
+            run_records=load_store(run_records, RunRecordStore, use_result_cache),
+            stat_index=load_store(stat_index, StatIndex, use_result_cache),
+        )
+
+    def save(self) -> None:
+        self.cost_model.save()
+        if self.failure_history is not None:
+            self.failure_history.save()
+        if self.result_cache is not None:
+            self.result_cache.save()
+        if self.run_records is not None:
+            self.run_records.save()
+        if self.stat_index is not None:
+            self.stat_index.save()
+
+
 def validate_matlab(
     matlab_handle: MatlabHandle,
-    filepaths: list[Path],
+    filepaths: Iterable[Path],
     fail_warnings: bool,
     enable_cyc: bool,
     enable_mod_cyc: bool,
@@ -41,6 +158,34 @@ def validate_matlab(
     use_factory_default: bool,
     checkcode_config_file: Optional[Path] = None,
     logger: Optional[logging.Logger] = None,
+    max_matlab_processes: int = DEFAULT_MAX_MATLAB_PROCESSES,
+    max_mlint_processes: int = DEFAULT_MAX_MLINT_PROCESSES,
+    matlab_workers: int = 0,
+    matlab_worker_max_jobs: int = DEFAULT_MAX_JOBS_PER_WORKER,
+    matlab_worker_max_memory_growth: Optional[int] = None,
+    report_format: str = "text",
+    output_file: Optional[Path] = None,
+    quiet: bool = False,
+    summary: bool = False,
+    jobs: int = 1,
+    cost_model: Optional[LintCostModel] = None,
+    precheck: bool = True,
+    fast_feedback: bool = False,
+    borrow_mlint: Optional[str] = None,
+    fail_fast: bool = False,
+    failure_history: Optional[FailureHistory] = None,
+    worker_pool: Optional[MatlabWorkerPool] = None,
+    use_result_cache: bool = True,
+    result_cache: Optional[LintResultCache] = None,
+    run_records: Optional[RunRecordStore] = None,
+    stat_index: Optional[StatIndex] = None,
+    shard: Optional[Shard] = None,
+    shard_by_size: bool = False,
+    time_budget: Optional[float] = None,
+    over_budget: str = OVER_BUDGET_WARN,
+    finish_unchecked: Optional[Callable[[MatlabHandle, list[Path]], None]] = None,
+    record_failures: bool = True,
+    save_stores: bool = True,
 ) -> ReturnCode:
     """Validate a list of MATLAB source files using MATLAB's checkcode function.
 
@@ -49,8 +194,9 @@ def validate_matlab(
 
     matlab_handle: MatlabHandle
                             The handle to the MATLAB instance
-    filepaths: list of Path
-                            The list of m-file file paths
+    filepaths: iterable of Path
+                            The m-file file paths. Files from an iterable other than a list are
+                            linted as they arrive, e.g. while a folder tree is still being scanned.
     fail_warnings: bool
                             Whether to treat warnings as errors
     enable_mod_cyc: bool
@@ -64,14 +210,98 @@ def validate_matlab(
     checkcode_config_file: Path, optional
                             An absolute path to a checkcode config file
     logger: logging.Logger, optional
+    max_matlab_processes: int
+                            The maximum number of MATLAB processes run at once by all hook processes
+                            (0 for no limit)
+    max_mlint_processes: int
+                            The maximum number of mlint processes run at once by all hook processes
+                            (0 for no limit)
+    matlab_workers: int
+                            When linting through MATLAB, the number of persistent MATLAB workers to
+                            lint with (0 to run a single MATLAB process for all files)
+    matlab_worker_max_jobs: int
+                            Restart a MATLAB worker after this many jobs (0 for never)
+    matlab_worker_max_memory_growth: int, optional
+                            Restart a MATLAB worker once its memory use grew by this many bytes
+    report_format: str
+                            The output format, one of report_writers.REPORT_WRITERS
+    output_file: Path, optional
+                            The file to write the output to, instead of stdout
+    quiet: bool
+                            Do not write the individual file reports
+    summary: bool
+                            Write the number of issues found per checkcode ID after the reports
+    jobs: int
+                            The number of mlint processes this call lints with at once
+    cost_model: LintCostModel, optional
+                            The observed lint durations used to size and order batches. Loaded from,
+                            and saved to, the user's HOME directory if not supplied.
+    precheck: bool
+                            Run the in-process pre-checks first. Files holding no code then skip the
+                            linter.
+    fast_feedback: bool
+                            If the pre-checks find definite errors, report those and do not run the
+                            linter at all
+    borrow_mlint: str, optional
+                            If MATLAB has no usable mlint, borrow the mlint of another cached
+                            install allowed by this policy, one of
+                            find_matlab.BORROW_MLINT_POLICIES, rather than launching MATLAB
+    fail_fast: bool
+                            Lint the files most likely to fail first, and stop at the first file
+                            with a failure
+    failure_history: FailureHistory, optional
+                            The files that failed in earlier runs, used to order files in fail-fast
+                            mode. Loaded from, and saved to, the user's HOME directory if not
+                            supplied. Only fail-fast runs use or update it.
+    worker_pool: MatlabWorkerPool, optional
+                            MATLAB workers already starting up, see start_matlab_warm_up(). They
+                            lint the files if they are linted through MATLAB. The caller closes
+                            them.
+    use_result_cache: bool
+                            Reuse the records of files whose name and contents were linted before
+                            with the same linter and options, instead of linting them again. A run
+                            of exactly the same files as a complete earlier run replays that run's
+                            reports without linting anything.
+    result_cache: LintResultCache, optional
+                            The records of earlier runs. Loaded from, and saved to, the user's HOME
+                            directory if not supplied and use_result_cache is set.
+    run_records: RunRecordStore, optional
+                            The reports of recent complete runs, by run digest. Loaded from, and
+                            saved to, the user's HOME directory if not supplied and use_result_cache
+                            is set.
+    stat_index: StatIndex, optional
+                            The content digests of files by their stat, so that unchanged files are
+                            not read to find their records. Loaded from, and saved to, the user's
+                            HOME directory if not supplied and use_result_cache is set.
+    shard: (int, int), optional
+                            Lint only this shard of the files, as its 1-based index and the number
+                            of shards. The JSON output records the shard, for merge_reports() to
+                            check that no shard is missing.
+    shard_by_size: bool
+                            Balance the shards by file size rather than by the number of files, see
+                            select_shard()
+    time_budget: float, optional
+                            Seconds after which no more files are linted and running linters are
+                            killed. Smaller files are linted first, so that as many as possible are
+                            checked in time.
+    over_budget: str
+                            What the files left unchecked at the end of the time budget mean for the
+                            result: nothing ('pass'), a warning ('warn') or a failure ('fail')
+    finish_unchecked: callable, optional
+                            Called with the handle and the files left unchecked at the end of the
+                            time budget, e.g. to lint them in the background
+    record_failures: bool
+                            Update the failure history with the reports of this run. Without it, a
+                            fail-fast run only reads the history to order its files.
+    save_stores: bool
+                            Save the stores once the run is done. Callers sharing the stores among
+                            several runs save them once, after the last run.
     Returns
     -------
     ReturnCode
     """
     if logger is None:
         logger = logging.getLogger(__name__)
-    return_code = ReturnCode.OK
-    m_lint_handle = matlab_handle.get_mlint_handle()
     options = LinterOptions(
         fail_warnings=fail_warnings,
         enable_cyc=enable_cyc,
@@ -79,27 +309,713 @@ def validate_matlab(
         ignore_ok_pragmas=ignore_ok_pragmas,
         use_factory_default=use_factory_default,
         checkcode_config_file=checkcode_config_file,
+        max_matlab_processes=max_matlab_processes,
+        max_mlint_processes=max_mlint_processes,
+        deadline=time.monotonic() + time_budget if time_budget is not None else None,
     )
-    if m_lint_handle and m_lint_handle.is_valid():
-        linter_reports = m_lint_handle.lint(filepaths=filepaths, options=options)
-    else:
-        linter_reports = matlab_handle.lint(filepaths=filepaths, options=options)
-
-    if len(linter_reports) > 0:
-        all_records = [record for report in linter_reports for record in report.records]
-        if len(all_records) > 0:
-            print("mlint found issues:")
-        for report in linter_reports:
-            print(report.source_file)
-            for record in report.records:
-                if return_code == ReturnCode.OK and record.id not in ALLOWED_MCCABE_IDS:
-                    return_code = ReturnCode.FAIL
-                print(record)
+    stores = RunStores.load(
+        cost_model=cost_model,
+        failure_history=failure_history,
+        result_cache=result_cache,
+        run_records=run_records,
+        stat_index=stat_index,
+        fail_fast=fail_fast,
+        use_result_cache=use_result_cache,
+    )
+    m_lint_handle, mlint_donor = select_mlint_handle(matlab_handle, options, borrow_mlint, logger)
+    use_workers = m_lint_handle is None and (matlab_workers > 0 or worker_pool is not None)
+    filepaths = select_files(filepaths, shard, shard_by_size, stores.failure_history, time_budget)
+
+    replayed_reports: Optional[Iterator[LinterReport]] = None
+    run_recorder: Optional[RunRecorder] = None
+    if stores.run_records is not None:
+        # The digest covers the whole set of files, so streamed files are collected first
+        filepaths = list(filepaths)
+        run_key = json.dumps(
+            [
+                get_options_key(get_linter_key(matlab_handle, m_lint_handle, use_workers), options),
+                matlab_handle.version,
+                precheck,
+                fast_feedback,
+                fail_fast,
+            ]
+        )
+        replayed_reports, run_recorder = replay_run(
+            stores.run_records, filepaths, run_key, stores.stat_index
+        )
+
+    prechecks = Prechecks() if precheck else None
+    error_reports: list[LinterReport] = []
+    if replayed_reports is None and prechecks is not None and fast_feedback:
+        filepaths = list(filepaths)
+        error_reports = prechecks.find_errors(filepaths)
+
+    unchecked_files: list[Path] = []
+    with ExitStack() as stack:
+        linter_reports: Iterable[LinterReport]
+        if replayed_reports is not None:
+            logger.info(
+                "The same files were linted with the same linter and options before; replaying "
+                "that run"
+            )
+            linter_reports = replayed_reports
+        elif error_reports:
+            logger.info("The pre-checks found errors; skipping the linter")
+            linter_reports = error_reports
+        else:
+            if use_workers and worker_pool is None:
+                worker_pool = stack.enter_context(
+                    create_matlab_worker_pool(
+                        matlab_handle,
+                        matlab_workers,
+                        max_matlab_processes,
+                        matlab_worker_max_jobs,
+                        matlab_worker_max_memory_growth,
+                        logger,
+                    )
+                )
+            linter_reports = stack.enter_context(
+                closing(
+                    lint_files(
+                        matlab_handle,
+                        create_scheduler(
+                            matlab_handle,
+                            m_lint_handle,
+                            worker_pool,
+                            jobs,
+                            stores.cost_model,
+                            logger,
+                        ),
+                        filepaths,
+                        options,
+                        result_cache=stores.result_cache,
+                        stat_index=stores.stat_index,
+                        prechecks=prechecks,
+                        in_order=fail_fast or time_budget is not None,
+                        unchecked=unchecked_files,
+                        logger=logger,
+                    )
+                )
+            )
+        writer = open_report_writer(
+            stack,
+            report_format,
+            output_file,
+            shard=list(shard) if shard is not None else None,
+            borrowed_mlint=(
+                {"release": mlint_donor.release, "home_path": str(mlint_donor.home_path)}
+                if mlint_donor is not None
+                else None
+            ),
+        )
+        return_code = report_run(
+            Reporter(writer, quiet=quiet, summary=summary),
+            linter_reports,
+            fail_fast=fail_fast,
+            failure_history=stores.failure_history if record_failures else None,
+            run_recorder=run_recorder,
+            unchecked_files=unchecked_files,
+            time_budget=time_budget,
+            over_budget=over_budget,
+            logger=logger,
+        )
+    if unchecked_files and finish_unchecked is not None:
+        finish_unchecked(matlab_handle, unchecked_files)
+    # A run cut short is not complete, so it is not replayed later
+    if run_recorder is not None and stores.run_records is not None and not unchecked_files:
+        run_recorder.store(stores.run_records)
+    if save_stores:
+        stores.save()
 
     logger.info("MATLAB lint result: %s", return_code)
     return return_code
 
 
+def validate_matlab_matrix(
+    matlab_handles: Sequence[MatlabHandle],
+    filepaths: Iterable[Path],
+    logger: Optional[logging.Logger] = None,
+    report_format: str = "text",
+    output_file: Optional[Path] = None,
+    quiet: bool = False,
+    summary: bool = False,
+    fail_fast: bool = False,
+    use_result_cache: bool = True,
+    cost_model: Optional[LintCostModel] = None,
+    failure_history: Optional[FailureHistory] = None,
+    result_cache: Optional[LintResultCache] = None,
+    run_records: Optional[RunRecordStore] = None,
+    stat_index: Optional[StatIndex] = None,
+    shard: Optional[Shard] = None,
+    shard_by_size: bool = False,
+    time_budget: Optional[float] = None,
+    over_budget: str = OVER_BUDGET_WARN,
+    finish_unchecked: Optional[Callable[[MatlabHandle, list[Path]], None]] = None,
+    **lint_options: Any,
+) -> ReturnCode:
+    """Validate MATLAB source files under several MATLAB releases at once.
+
+    Each release lints the files on its own thread through validate_matlab(), and the releases share
+    the file digests, the result cache and the cost model, which are saved once all are done. The
+    output holds one report per file, in which each record names the releases that found it, and
+    the verdict fails if the files fail under any release. Files left unchecked by any release are
+    reported as unchecked.
+
+    Parameters
+    ----------
+    matlab_handles: list of MatlabHandle
+                            The handles to the MATLAB installs to lint with
+    filepaths: iterable of Path
+                            The m-file file paths
+    lint_options:
+                            Passed on to validate_matlab() for every release, e.g. fail_warnings,
+                            enable_cyc, enable_mod_cyc, ignore_ok_pragmas, use_factory_default and
+                            jobs
+
+    See validate_matlab() for the other parameters.
+
+    Returns
+    -------
+    ReturnCode
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    stores = RunStores.load(
+        cost_model=cost_model,
+        failure_history=failure_history,
+        result_cache=result_cache,
+        run_records=run_records,
+        stat_index=stat_index,
+        fail_fast=fail_fast,
+        use_result_cache=use_result_cache,
+    )
+    filepaths = list(select_files(filepaths, shard, shard_by_size))
+    if stores.stat_index is not None:
+        # Hash the files once, before all releases look their digests up at the same time
+        stores.stat_index.digests(filepaths)
+
+    release_names = [h.release or h.version or str(h.home_path) for h in matlab_handles]
+    unchecked_by_release: list[list[Path]] = [[] for _ in matlab_handles]
+    with tempfile.TemporaryDirectory(prefix="lint-matlab-matrix-") as folder:
+
+        def lint_release(index: int) -> ReturnCode:
+            def collect_unchecked(matlab_handle: MatlabHandle, unchecked: list[Path]) -> None:
+                unchecked_by_release[index].extend(unchecked)
+                if finish_unchecked is not None:
+                    finish_unchecked(matlab_handle, unchecked)
+
+            return validate_matlab(
+                matlab_handles[index],
+                filepaths,
+                logger=logger,
+                report_format="ndjson",
+                output_file=Path(folder, f"{index}.ndjson"),
+                fail_fast=fail_fast,
+                cost_model=stores.cost_model,
+                # The history only orders the files of each release; a file failing under one
+                # release must stay a failure when another release passes it, so only the merged
+                # reports update it
+                failure_history=stores.failure_history,
+                record_failures=False,
+                use_result_cache=use_result_cache,
+                result_cache=stores.result_cache,
+                run_records=stores.run_records,
+                stat_index=stores.stat_index,
+                time_budget=time_budget,
+                # The merged report applies the policy to the files any release left unchecked
+                over_budget=OVER_BUDGET_PASS,
+                finish_unchecked=collect_unchecked,
+                save_stores=False,
+                **lint_options,
+            )
+
+        with ThreadPoolExecutor(
+            max_workers=len(matlab_handles), thread_name_prefix="lint-release"
+        ) as executor:
+            # A release may fail for more than its records, e.g. for files it left unchecked
+            release_return_codes = list(executor.map(lint_release, range(len(matlab_handles))))
+        release_outputs = [Path(folder, f"{index}.ndjson") for index in range(len(matlab_handles))]
+
+        linter_reports: Iterable[LinterReport] = merge_release_reports(
+            release_names, release_outputs
+        )
+        with ExitStack() as stack:
+            writer = open_report_writer(
+                stack,
+                report_format,
+                output_file,
+                releases=release_names,
+                shard=list(shard) if shard is not None else None,
+            )
+            return_code = report_run(
+                Reporter(writer, quiet=quiet, summary=summary),
+                linter_reports,
+                fail_fast=fail_fast,
+                failure_history=stores.failure_history,
+                unchecked_files=list(dict.fromkeys(f for u in unchecked_by_release for f in u)),
+                time_budget=time_budget,
+                over_budget=over_budget,
+                logger=logger,
+            )
+            return_code = max(return_code, *release_return_codes)
+    stores.save()
+
+    logger.info("MATLAB lint result under %s: %s", ", ".join(release_names), return_code)
+    return return_code
+
+
+def merge_release_reports(
+    release_names: Sequence[str], report_files: Sequence[Path]
+) -> Iterator[LinterReport]:
+    """Combine the NDJSON reports of files linted under several releases into one report per file.
+
+    A record found under several releases appears once, its message prefixed with the names of those
+    releases. Files are reported in the order they first appear; only their records are held in
+    memory.
+    """
+    order: dict[str, None] = {}
+    findings: dict[str, dict[tuple[str, str, int, tuple[int, ...]], list[str]]] = {}
+    for release_name, report_file in zip(release_names, report_files):
+        for report in read_ndjson_report(report_file):
+            key = str(report.source_file)
+            order.setdefault(key, None)
+            for record in report.records:
+                record_key = (record.id, record.message, record.line, tuple(record.columns))
+                findings.setdefault(key, {}).setdefault(record_key, []).append(release_name)
+
+    for key in order:
+        file_findings = sorted(
+            findings.pop(key, {}).items(), key=lambda f: (f[0][2], f[0][3], f[0][0])
+        )
+        records = [
+            LinterRecord(
+                id=record_id,
+                message=f"[{', '.join(releases)}] {message}",
+                line=line,
+                columns=list(columns),
+            )
+            for (record_id, message, line, columns), releases in file_findings
+        ]
+        yield LinterReport(source_file=Path(key), records=records)
+
+
+def apply_over_budget_policy(
+    unchecked_files: list[Path],
+    time_budget: Optional[float],
+    over_budget: str,
+    reporter: Reporter,
+    logger: logging.Logger,
+) -> None:
+    """Report the files left unchecked by the time budget, failing the verdict if the policy says
+    so."""
+    message = (
+        f"{len(unchecked_files)} file(s) were not checked within the time budget of {time_budget} "
+        "s:" + "".join(f"\n\t{f}" for f in unchecked_files)
+    )
+    if over_budget == OVER_BUDGET_FAIL:
+        logger.error(message)
+    elif over_budget == OVER_BUDGET_WARN:
+        logger.warning(message)
+    else:
+        logger.info(message)
+    reporter.add_unchecked(unchecked_files, fail=over_budget == OVER_BUDGET_FAIL)
+
+
+def select_files(
+    filepaths: Iterable[Path],
+    shard: Optional[Shard] = None,
+    shard_by_size: bool = False,
+    failure_history: Optional[FailureHistory] = None,
+    time_budget: Optional[float] = None,
+) -> Iterable[Path]:
+    """Return the files of a shard in the order to lint them.
+
+    The files most likely to fail come first if there is a failure history, else the smallest files
+    if there is a time budget.
+    """
+    if shard is not None:
+        filepaths = select_shard(filepaths, shard, by_size=shard_by_size)
+    if failure_history is not None:
+        return failure_history.prioritize(filepaths)
+    if time_budget is not None:
+        return sorted(filepaths, key=get_file_size)
+    return filepaths
+
+
+def replay_run(
+    run_records: RunRecordStore,
+    filepaths: list[Path],
+    run_key: str,
+    stat_index: Optional[StatIndex],
+) -> tuple[Optional[Iterator[LinterReport]], Optional[RunRecorder]]:
+    """Return the reports of an earlier run of the same files and run key, if there is one, else a
+    recorder for the reports of this run, if it can be recorded."""
+    run_digest = compute_run_digest(filepaths, run_key, stat_index)
+    if run_digest is None:
+        return None, None
+    replayed_reports = run_records.replay(run_digest, filepaths)
+    if replayed_reports is not None:
+        return replayed_reports, None
+    return None, RunRecorder(run_digest)
+
+
+def open_report_writer(
+    stack: ExitStack,
+    report_format: str,
+    output_file: Optional[Path],
+    **metadata: Any,
+) -> ReportWriter:
+    """Return the writer of a report format, writing to the output file if there is one, else to
+    stdout. The file is closed with the stack. The metadata given that is not None is recorded."""
+    stream: TextIO = (
+        stack.enter_context(output_file.open("w", encoding="utf-8"))
+        if output_file is not None
+        else sys.stdout
+    )
+    writer = create_report_writer(report_format, cast(TextIO, BufferedTextStream(stream)))
+    writer.metadata.update((key, value) for key, value in metadata.items() if value is not None)
+    return writer
+
+
+def report_run(
+    reporter: Reporter,
+    linter_reports: Iterable[LinterReport],
+    fail_fast: bool = False,
+    failure_history: Optional[FailureHistory] = None,
+    run_recorder: Optional[RunRecorder] = None,
+    unchecked_files: Sequence[Path] = (),
+    time_budget: Optional[float] = None,
+    over_budget: str = OVER_BUDGET_WARN,
+    logger: Optional[logging.Logger] = None,
+) -> ReturnCode:
+    """Write the reports of a run as they arrive, then the files it left unchecked, and return its
+    verdict. With fail_fast, the reports stop after the first failure. The failure history and the
+    run recorder see every report written."""
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if fail_fast:
+        linter_reports = stop_at_first_failure(linter_reports)
+    reporter.begin()
+    for report in linter_reports:
+        reporter.add(report)
+        if failure_history is not None:
+            failure_history.update(report)
+        if run_recorder is not None:
+            run_recorder.add(report)
+    # The files are known once the linter is done
+    if unchecked_files:
+        apply_over_budget_policy(list(unchecked_files), time_budget, over_budget, reporter, logger)
+    return reporter.finish()
+
+
+def select_mlint_handle(
+    matlab_handle: MatlabHandle,
+    options: LinterOptions,
+    borrow_mlint: Optional[str],
+    logger: logging.Logger,
+) -> tuple[Optional[MLintHandle], Optional[MatlabHandle]]:
+    """Return the mlint to lint with, or None if the files have to be linted through MATLAB, and the
+    install the mlint is borrowed from, if it is not MATLAB's own.
+
+    The release whose mlint is used is logged, as a warning if it is borrowed from another install.
+    """
+    if matlab_handle.select_backend(options) == MLINT_BACKEND:
+        logger.info(f"Linting with the mlint of MATLAB {matlab_handle.release}")
+        return matlab_handle.get_mlint_handle(), None
+
+    if borrow_mlint is not None:
+        mlint_donor = find_mlint_donor(matlab_handle, options, borrow_mlint, logger=logger)
+        if mlint_donor is not None:
+            logger.warning(
+                f"MATLAB {matlab_handle.release} has no usable mlint; linting with the mlint of "
+                f"MATLAB {mlint_donor.release} at {mlint_donor.home_path}"
+            )
+            return mlint_donor.get_mlint_handle(), mlint_donor
+
+    logger.info(f"Linting through MATLAB {matlab_handle.release}")
+    return None, None
+
+
+def create_matlab_worker_pool(
+    matlab_handle: MatlabHandle,
+    matlab_workers: int,
+    max_matlab_processes: int,
+    matlab_worker_max_jobs: int,
+    matlab_worker_max_memory_growth: Optional[int],
+    logger: logging.Logger,
+) -> MatlabWorkerPool:
+    return MatlabWorkerPool.from_handle(
+        matlab_handle,
+        matlab_workers,
+        max_jobs_per_worker=matlab_worker_max_jobs,
+        max_memory_growth=matlab_worker_max_memory_growth,
+        slot_pool=ProcessSlotPool.for_matlab(max_matlab_processes),
+        logger=logger,
+    )
+
+
+def get_linter_key(
+    matlab_handle: MatlabHandle, m_lint_handle: Optional[MLintHandle], use_workers: bool
+) -> str:
+    """Return the name the cost model and the result cache know the selected linter by."""
+    if m_lint_handle is not None:
+        return str(m_lint_handle.exe_path)
+    if use_workers:
+        return f"matlab-worker:{matlab_handle.exe_path}"
+    return f"matlab:{matlab_handle.exe_path}"
+
+
+def create_scheduler(
+    matlab_handle: MatlabHandle,
+    m_lint_handle: Optional[MLintHandle],
+    worker_pool: Optional[MatlabWorkerPool],
+    jobs: int,
+    cost_model: LintCostModel,
+    logger: logging.Logger,
+) -> Optional[BatchScheduler]:
+    """Return the scheduler linting with mlint if there is one, else with the MATLAB workers if
+    there are any, else None: the files are then linted by a single MATLAB process."""
+    linter_key = get_linter_key(matlab_handle, m_lint_handle, worker_pool is not None)
+    if m_lint_handle is not None:
+        return BatchScheduler(
+            m_lint_handle, linter_key, jobs=jobs, cost_model=cost_model, logger=logger
+        )
+    if worker_pool is not None:
+        # One scheduled batch is one worker job, so the cost model times exactly what a worker does
+        return BatchScheduler(
+            worker_pool,
+            linter_key,
+            jobs=worker_pool.size,
+            cost_model=cost_model,
+            max_batch_files=worker_pool.batch_size,
+            logger=logger,
+        )
+    return None
+
+
+def start_matlab_warm_up(
+    matlab_handle: MatlabHandle,
+    options: LinterOptions,
+    borrow_mlint: Optional[str],
+    matlab_workers: int,
+    matlab_worker_max_jobs: int,
+    matlab_worker_max_memory_growth: Optional[int],
+    logger: logging.Logger,
+) -> Optional[MatlabWorkerPool]:
+    """If the files will be linted through MATLAB workers, start and return them now, else None.
+
+    MATLAB takes seconds to start, which this overlaps with the work done before linting: saving the
+    handle cache, resolving the file paths and running the pre-checks. The decision is made from the
+    cached backend probe results alone; an install that still needs probing, or may borrow an mlint,
+    is not started speculatively. Without matlab_workers, the files are linted by a single MATLAB
+    process that is not started ahead.
+    """
+    if matlab_workers <= 0 or matlab_handle.needs_probe() or borrow_mlint is not None:
+        return None
+    if matlab_handle.select_backend(options) != MATLAB_BACKEND:
+        return None
+
+    logger.info(f"Starting MATLAB {matlab_handle.release} while the files are prepared")
+    worker_pool = create_matlab_worker_pool(
+        matlab_handle,
+        matlab_workers,
+        options.max_matlab_processes,
+        matlab_worker_max_jobs,
+        matlab_worker_max_memory_growth,
+        logger,
+    )
+    worker_pool.warm_up_in_background()
+    return worker_pool
+
+
+def lint_pipeline(
+    scheduler: BatchScheduler,
+    filepaths: Iterable[Path],
+    options: LinterOptions,
+    result_cache: Optional[LintResultCache],
+    in_order: bool = False,
+    logger: Optional[logging.Logger] = None,
+    stat_index: Optional[StatIndex] = None,
+    unchecked: Optional[list[Path]] = None,
+) -> Iterator[LinterReport]:
+    """Lint files through the staged pipeline, reporting how many were found in the result cache.
+
+    The files of a list are split into batches of even estimated duration a window of prepared
+    files at a time; the files of any other iterable are batched as they come. With in_order, a list
+    is streamed too, so that files are linted in list order. The files left unchecked at the
+    deadline of the options are added to unchecked.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    pipeline = LintPipeline(scheduler, result_cache, logger=logger, stat_index=stat_index)
+    yield from pipeline.lint(
+        filepaths, options, balance=isinstance(filepaths, list) and not in_order
+    )
+    if pipeline.cache_hits > 0:
+        logger.info(f"Reused the cached results of {pipeline.cache_hits} unchanged file(s)")
+    if unchecked is not None:
+        unchecked.extend(pipeline.unchecked)
+
+
+def lint_files(
+    matlab_handle: MatlabHandle,
+    scheduler: Optional[BatchScheduler],
+    filepaths: Iterable[Path],
+    options: LinterOptions,
+    result_cache: Optional[LintResultCache] = None,
+    stat_index: Optional[StatIndex] = None,
+    prechecks: Optional[Prechecks] = None,
+    in_order: bool = False,
+    unchecked: Optional[list[Path]] = None,
+    logger: Optional[logging.Logger] = None,
+) -> Iterator[LinterReport]:
+    """Lint files, yielding their reports in input order as they become available.
+
+    Files the pre-checks find to hold no code skip the linter, and copies of the same file are
+    linted once. The others are linted through the pipeline of the scheduler, see lint_pipeline(),
+    or without a scheduler by a single MATLAB process.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    deduplicator = Deduplicator(stat_index.digests if stat_index is not None else hash_files)
+    if prechecks is not None:
+        code_files = prechecks.filter(filepaths)
+        # Keep lists as lists, so that their batches can be balanced up front
+        filepaths = list(code_files) if isinstance(filepaths, list) else code_files
+    # Vendored copies of the same file are linted once
+    unique_files = deduplicator.filter(filepaths)
+    filepaths = list(unique_files) if isinstance(filepaths, list) else unique_files
+
+    with closing(
+        lint_pipeline(
+            scheduler,
+            filepaths,
+            options,
+            result_cache,
+            in_order=in_order,
+            logger=logger,
+            stat_index=stat_index,
+            unchecked=unchecked,
+        )
+        if scheduler is not None
+        else lint_through_matlab(matlab_handle, filepaths, options, unchecked)
+    ) as linted_reports:
+        linter_reports: Iterable[LinterReport] = deduplicator.expand(linted_reports)
+        if prechecks is not None:
+            linter_reports = prechecks.merge(linter_reports)
+        yield from linter_reports
+    if deduplicator.duplicate_count > 0:
+        logger.info(f"Linted {deduplicator.duplicate_count} duplicate file(s) only once")
+
+
+def lint_through_matlab(
+    matlab_handle: MatlabHandle,
+    filepaths: Iterable[Path],
+    options: LinterOptions,
+    unchecked: Optional[list[Path]] = None,
+) -> Iterator[LinterReport]:
+    """Lint files with a single MATLAB process. The files are added to unchecked if the deadline of
+    the options passes first."""
+    matlab_files = list(filepaths)
+    # Starting MATLAB takes seconds, so skip it when the pre-checks left nothing to lint
+    if not matlab_files:
+        return
+    try:
+        linter_reports = matlab_handle.lint(filepaths=matlab_files, options=options)
+    except DeadlineExceeded:
+        if unchecked is not None:
+            unchecked.extend(matlab_files)
+        return
+    yield from linter_reports
+
+
+def watch_matlab(
+    matlab_handle: MatlabHandle,
+    paths: list[Path],
+    fail_warnings: bool,
+    enable_cyc: bool,
+    enable_mod_cyc: bool,
+    ignore_ok_pragmas: bool,
+    use_factory_default: bool,
+    checkcode_config_file: Optional[Path] = None,
+    logger: Optional[logging.Logger] = None,
+    max_matlab_processes: int = DEFAULT_MAX_MATLAB_PROCESSES,
+    max_mlint_processes: int = DEFAULT_MAX_MLINT_PROCESSES,
+    jobs: int = 1,
+    borrow_mlint: Optional[str] = None,
+) -> ReturnCode:
+    """Lint the MATLAB files under a set of paths, then re-lint them as they change, until stopped.
+
+    Parameters
+    ----------
+
+    matlab_handle: MatlabHandle
+                            The handle to the MATLAB instance
+    paths: list of Path
+                            The folders and m-files to watch
+    fail_warnings: bool
+                            Whether to treat warnings as errors
+    enable_mod_cyc: bool
+                            Enable display of modified cyclomaticity complexity calculations for each file.
+    enable_cyc: bool
+                            Enable display of McCabe cyclomaticity camplexity calculations for each file.
+    ignore_ok_pragmas: bool
+                            Ignore %#ok checkcode suppression pragmas
+    use_factory_default: bool
+                            Ignore any checkcode config files and use factory defaults
+    checkcode_config_file: Path, optional
+                            An absolute path to a checkcode config file
+    logger: logging.Logger, optional
+    max_matlab_processes: int
+                            The maximum number of MATLAB processes run at once by all hook processes
+                            (0 for no limit)
+    max_mlint_processes: int
+                            The maximum number of mlint processes run at once by all hook processes
+                            (0 for no limit)
+    jobs: int
+                            The number of mlint processes this call lints with at once
+    borrow_mlint: str, optional
+                            If MATLAB has no usable mlint, borrow the mlint of another cached
+                            install allowed by this policy, one of
+                            find_matlab.BORROW_MLINT_POLICIES, rather than launching MATLAB
+    Returns
+    -------
+    ReturnCode
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    options = LinterOptions(
+        fail_warnings=fail_warnings,
+        enable_cyc=enable_cyc,
+        enable_mod_cyc=enable_mod_cyc,
+        ignore_ok_pragmas=ignore_ok_pragmas,
+        use_factory_default=use_factory_default,
+        checkcode_config_file=checkcode_config_file,
+        max_matlab_processes=max_matlab_processes,
+        max_mlint_processes=max_mlint_processes,
+    )
+    cost_model = LintCostModel()
+    cost_model.load()
+
+    linter: Linter = matlab_handle
+    m_lint_handle, _ = select_mlint_handle(matlab_handle, options, borrow_mlint, logger)
+    if m_lint_handle is not None:
+        linter = BatchScheduler(
+            m_lint_handle,
+            str(m_lint_handle.exe_path),
+            jobs=jobs,
+            cost_model=cost_model,
+            logger=logger,
+        )
+    else:
+        logger.warning("mlint is not usable; every change starts MATLAB")
+
+    with create_file_watcher(paths, logger=logger) as file_watcher:
+        LintWatcher(linter, options, file_watcher, sys.stdout, logger=logger).run()
+    cost_model.save()
+    return ReturnCode.OK
+
+
 def inspect_linter_result(linter_results: list[dict[str, Any]]) -> ReturnCode:
     """Inspect a given linter result to determine if it indicates a failure.
     Parameters
@@ -130,8 +1046,252 @@ def print_linter_result(filepath: Path, linter_result: list[dict[str, Any]]):
             print(f"\tLine {line_number} (Column [{column_range[0]}-{column_range[1]}]): {message}")
 
 
+def write_backend_benchmarks(matlab_handles: Sequence[MatlabHandle], stream: TextIO) -> None:
+    """Write the benchmark results of each install's lint backends, one line per backend."""
+    for handle in matlab_handles:
+        stream.write(f"MATLAB {handle.release or handle.version} ({handle.home_path})\n")
+        for name, backend in sorted(handle.backends.items()):
+            benchmark = backend.benchmark
+            if not backend.available:
+                stream.write(f"    {name}: unavailable\n")
+            elif benchmark is None:
+                stream.write(f"    {name}: failed to lint the sample corpus\n")
+            else:
+                stream.write(
+                    f"    {name}: cold {benchmark.cold_seconds:.3f} s, warm "
+                    f"{benchmark.warm_seconds:.3f} s, startup {benchmark.startup_seconds:.3f} s, "
+                    f"{benchmark.files_per_second:.1f} files/s ({benchmark.file_count} files)\n"
+                )
+
+
+def bench_backends(
+    output_file: Optional[Path] = None, logger: Optional[logging.Logger] = None
+) -> ReturnCode:
+    """Benchmark the lint backends of every MATLAB install and write the results.
+
+    The results are stored in the handle cache, where later runs use them to pick the fastest
+    backend.
+
+    Returns
+    -------
+    ReturnCode
+        FAIL if no MATLAB install was found
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    matlab_handles = benchmark_matlab_installs(logger=logger)
+    if not matlab_handles:
+        logger.error("Unable to find any MATLAB install to benchmark")
+        return ReturnCode.FAIL
+
+    with ExitStack() as stack:
+        stream: TextIO = (
+            stack.enter_context(output_file.open("w", encoding="utf-8"))
+            if output_file is not None
+            else sys.stdout
+        )
+        write_backend_benchmarks(matlab_handles, stream)
+    return ReturnCode.OK
+
+
+def merge_main(argv: Sequence[str]) -> int:
+    """Parse the arguments of the merge subcommand and combine the reports of sharded runs."""
+    logger = logging.getLogger(__name__)
+    parser = argparse.ArgumentParser(
+        prog="lint-matlab merge",
+        description="Combine the JSON reports of runs with --shard into the output and "
+        "exit code of a single run.",
+    )
+    parser.add_argument(
+        "--format",
+        action="store",
+        choices=sorted(REPORT_WRITERS),
+        default="text",
+        help="The output format.",
+    )
+    parser.add_argument(
+        "--output",
+        action="store",
+        type=Path,
+        default=None,
+        help="Write the output to this file instead of stdout.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not write the individual file reports; the exit code still reports the result.",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Write the number of issues found per checkcode ID after the reports.",
+    )
+    parser.add_argument(
+        "--logging-level",
+        action="store",
+        help="The logging.Level value to set.",
+        default=logging.WARNING,
+        type=int,
+    )
+    parser.add_argument("report_files", nargs="+", type=Path)
+    args = parser.parse_args(argv)
+    logger.setLevel(args.logging_level)
+
+    return merge_reports(
+        args.report_files,
+        report_format=args.format,
+        output_file=args.output.absolute() if args.output is not None else None,
+        quiet=args.quiet,
+        summary=args.summary,
+        logger=logger,
+    )
+
+
+def get_background_lint_command(
+    matlab_handle: MatlabHandle, filepaths: list[Path], args: argparse.Namespace
+) -> list[str]:
+    """Return a command line linting files with this run's MATLAB and options, silently."""
+    command: list[str] = [
+        sys.executable,
+        "-m",
+        "precommitmatlablint.lint_matlab",
+        f"--matlab-home-path={matlab_handle.home_path}",
+        f"--max-matlab-processes={args.max_matlab_processes}",
+        f"--max-mlint-processes={args.max_mlint_processes}",
+        f"--matlab-workers={args.matlab_workers}",
+        f"--jobs={args.jobs}",
+        "--quiet",
+    ]
+    flags = {
+        "--treat-warning-as-error": args.treat_warning_as_error,
+        "--enable-modified-cyclomaticity": args.enable_modified_cyclomaticity,
+        "--enable-cyclomaticity": args.enable_cyclomaticity,
+        "--ignore-ok-pragmas": args.ignore_ok_pragmas,
+        "--use-default-checkcode-config": args.use_default_checkcode_config,
+        "--no-precheck": args.no_precheck,
+    }
+    command.extend(flag for flag, is_set in flags.items() if is_set)
+    if args.checkcode_config_file:
+        command.append(f"--checkcode-config-file={Path(args.checkcode_config_file).absolute()}")
+    if args.borrow_mlint is not None:
+        command.append(f"--borrow-mlint={args.borrow_mlint}")
+    command.extend(str(f) for f in filepaths)
+    return command
+
+
+def start_background_lint(command: list[str], logger: logging.Logger) -> None:
+    """Start a process that outlives this one, e.g. to fill the result cache after the hook ends."""
+    kwargs: dict[str, Any] = {}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **kwargs,
+        )
+    except OSError as err:
+        logger.warning(f"Unable to start linting in the background: {err}")
+        return
+    logger.info(f"Linting the unchecked files in background process {process.pid}")
+
+
+def find_matlab_handles(
+    matlab_home_path: Optional[Path],
+    matlab_version: Optional[str],
+    release_names: Sequence[str],
+    on_found: Callable[[MatlabHandle], None],
+    logger: logging.Logger,
+) -> tuple[list[MatlabHandle], ReturnCode]:
+    """Return the MATLAB installs main() lints with: one per release if several releases are given,
+    else the one found by find_matlab(), which on_found is called with.
+
+    If none are found, the list is empty and the return code is the result of the run.
+    """
+    if len(release_names) > 1:
+        matlab_handles, return_code = find_matlab_releases(release_names, logger=logger)
+        if ReturnCode.FAIL == return_code:
+            # A verdict under fewer releases than asked for would pass files that were never
+            # linted under the missing ones
+            logger.error("Unable to lint under every requested MATLAB release")
+            return [], ReturnCode.FAIL
+        return matlab_handles, ReturnCode.OK
+
+    matlab_handle, return_code = find_matlab(
+        matlab_home_path=matlab_home_path,
+        matlab_version=matlab_version,
+        matlab_release_name=release_names[0] if release_names else None,
+        logger=logger,
+        on_found=on_found,
+    )
+    if ReturnCode.FAIL == return_code or matlab_handle is None:
+        logger.error("Unable to find MATLAB")
+        # We do not want to cause pre-commit/prek to fail if MATLAB is not found.
+        return [], ReturnCode.OK
+    return [matlab_handle], ReturnCode.OK
+
+
+def get_filepaths(args: argparse.Namespace, logger: logging.Logger) -> Iterable[Path]:
+    """Return the files to lint that main() was given: those under --all, else those supplied."""
+    if args.all is not None:
+        if args.filepaths:
+            logger.warning("Ignoring the supplied files, since --all was given")
+        return find_matlab_files(Path(args.all).resolve(), excludes=args.exclude)
+    if not args.filepaths:
+        logger.info("No files were supplied.")
+        return []
+    filepaths = [Path(f).resolve() for f in args.filepaths]
+    logger.info("Supplied files:")
+    for file in filepaths:
+        logger.info(f"\t{file}")
+    return filepaths
+
+
+def watch_main(
+    args: argparse.Namespace, matlab_handles: Sequence[MatlabHandle], logger: logging.Logger
+) -> int:
+    """Watch the paths main() was given with the first MATLAB install, see watch_matlab()."""
+    matlab_handle = matlab_handles[0]
+    if len(matlab_handles) > 1:
+        logger.warning(
+            f"Watching with MATLAB {matlab_handle.release} only, since --watch was given"
+        )
+    if args.shard is not None:
+        logger.warning("Ignoring --shard, since --watch was given")
+    watch_paths: list[Path] = [Path(f).resolve() for f in args.filepaths]
+    if args.all is not None or len(watch_paths) == 0:
+        watch_paths = [Path(args.all or ".").resolve()]
+    return watch_matlab(
+        matlab_handle,
+        watch_paths,
+        args.treat_warning_as_error,
+        args.enable_cyclomaticity,
+        args.enable_modified_cyclomaticity,
+        args.ignore_ok_pragmas,
+        args.use_default_checkcode_config,
+        extract_file_path_option(args.checkcode_config_file),
+        logger,
+        max_matlab_processes=args.max_matlab_processes,
+        max_mlint_processes=args.max_mlint_processes,
+        jobs=args.jobs,
+        borrow_mlint=args.borrow_mlint,
+    )
+
+
 def main(argv: Optional[Sequence[str]] = None) -> int:
     logger = logging.getLogger(__name__)
+    # The time budget covers finding MATLAB and the files too
+    start_time = time.monotonic()
+
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) > 0 and argv[0] == "merge":
+        return merge_main(argv[1:])
 
     """Parse commandline arguments and validate the supplied files through MATLAB's checkcode function."""
     parser = argparse.ArgumentParser()
@@ -156,7 +1316,8 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         action="store",
         type=str,
         default=None,
-        help="The release name of MATLAB to use.",
+        help="The release name of MATLAB to use. A comma-separated list, e.g. R2021a,R2023b, lints "
+        "the files under each of the releases at once and fails if they fail under any of them.",
     )
     parser.add_argument(
         "--treat-warning-as-error", action="store_true", help="Treat all warnings as errors"
@@ -188,6 +1349,181 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         help="Ignore any checkcode config file and use factory default settings",
     )
 
+    parser.add_argument(
+        "--max-matlab-processes",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_MATLAB_PROCESSES,
+        help="The maximum number of MATLAB processes that all running hooks may launch at once (0 "
+        "for no limit, the default). Each MATLAB process takes gigabytes of memory and a license, "
+        "so set it on machines short of either; with 1, hooks launching MATLAB take turns.",
+    )
+    parser.add_argument(
+        "--max-mlint-processes",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_MLINT_PROCESSES,
+        help="The maximum number of mlint processes that all running hooks may launch at once (0 "
+        "for no limit).",
+    )
+    parser.add_argument(
+        "--matlab-workers",
+        action="store",
+        type=int,
+        default=0,
+        help="When linting through MATLAB, lint with this many persistent MATLAB workers in "
+        "parallel.",
+    )
+    parser.add_argument(
+        "--matlab-worker-max-jobs",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_JOBS_PER_WORKER,
+        help="Restart a MATLAB worker after it has linted this many batches of files "
+        "(0 for never).",
+    )
+    parser.add_argument(
+        "--matlab-worker-max-memory-growth",
+        action="store",
+        type=int,
+        default=None,
+        help="Restart a MATLAB worker once its memory use has grown by this many megabytes.",
+    )
+    parser.add_argument(
+        "--format",
+        action="store",
+        choices=sorted(REPORT_WRITERS),
+        default="text",
+        help="The output format.",
+    )
+    parser.add_argument(
+        "--output",
+        action="store",
+        type=Path,
+        default=None,
+        help="Write the output to this file instead of stdout.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not write the individual file reports; the exit code still reports the result.",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Write the number of issues found per checkcode ID after the reports.",
+    )
+    parser.add_argument(
+        "--jobs",
+        action="store",
+        type=int,
+        default=1,
+        help="The number of mlint processes to lint with in parallel.",
+    )
+    parser.add_argument(
+        "--borrow-mlint",
+        action="store",
+        default=None,
+        choices=BORROW_MLINT_POLICIES,
+        metavar="POLICY",
+        help="If the chosen MATLAB has no usable mlint, lint with the mlint of another installed "
+        "release instead of launching MATLAB. POLICY allows the same release only ('same'), the "
+        "same or a newer one ('newer') or any release ('any').",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first file with a failure. Files that failed in earlier runs are linted "
+        "first, then the most recently modified ones.",
+    )
+    parser.add_argument(
+        "--no-precheck",
+        action="store_true",
+        help="Do not run the in-process pre-checks; every file goes to the linter.",
+    )
+    parser.add_argument(
+        "--no-result-cache",
+        action="store_true",
+        help="Lint every file, instead of reusing the results of files whose name and contents "
+        "were linted before with the same linter and options.",
+    )
+    parser.add_argument(
+        "--fast-feedback",
+        action="store_true",
+        help="If the in-process pre-checks find definite errors, report only those and skip the "
+        "linter.",
+    )
+    parser.add_argument(
+        "--all",
+        action="store",
+        nargs="?",
+        const=".",
+        default=None,
+        metavar="ROOT",
+        help="Lint every m-file under ROOT (default: the current folder) instead of the supplied "
+        "files. Files ignored by git are skipped.",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="With --all, skip files and folders matching this .gitignore-style pattern, relative "
+        "to ROOT. May be given more than once.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-lint files as they change. Supplied folders are watched for "
+        "m-files.",
+    )
+    parser.add_argument(
+        "--shard",
+        action="store",
+        type=parse_shard,
+        default=None,
+        metavar="INDEX/COUNT",
+        help="Lint only the INDEX-th of COUNT disjoint shards of the files, e.g. 2/4 on the second "
+        "of four CI nodes. Combine the shards' --format=json reports with 'lint-matlab merge'.",
+    )
+    parser.add_argument(
+        "--shard-by-size",
+        action="store_true",
+        help="With --shard, balance the shards by file size instead of by the number of files.",
+    )
+    parser.add_argument(
+        "--time-budget",
+        action="store",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Stop linting after this many seconds, killing the linters still running. Smaller "
+        "files are linted first, and the files left unchecked are listed.",
+    )
+    parser.add_argument(
+        "--over-budget",
+        action="store",
+        choices=OVER_BUDGET_POLICIES,
+        default=OVER_BUDGET_WARN,
+        metavar="POLICY",
+        help="What files left unchecked at the end of --time-budget mean for the result: nothing "
+        "('pass'), a warning ('warn', the default) or a failure ('fail').",
+    )
+    parser.add_argument(
+        "--finish-in-background",
+        action="store_true",
+        help="Lint the files left unchecked at the end of --time-budget in a detached background "
+        "process, so that their results are cached for the next run.",
+    )
+
+    parser.add_argument(
+        "--bench-backends",
+        action="store_true",
+        help="Measure how fast the lint backends of every MATLAB install lint a built-in sample "
+        "corpus, store the results for choosing the fastest backend, and write them instead of "
+        "linting any files.",
+    )
+
     parser.add_argument(
         "--logging-level",
         action="store",
@@ -202,14 +1538,9 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     logger.setLevel(args.logging_level)
 
     logger.info(args)
-    filepaths: list[Path] = []
-    if args.filepaths:
-        filepaths = [Path(f).resolve() for f in args.filepaths]
-        logger.info("Supplied files:")
-        for file in filepaths:
-            logger.info(f"\t{file}")
-    else:
-        logger.info("No files were supplied.")
+
+    if args.bench_backends:
+        return bench_backends(args.output.absolute() if args.output is not None else None, logger)
 
     matlab_home_path: Optional[Path] = extract_folder_path_option(args.matlab_home_path)
 
@@ -224,19 +1555,106 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     ignore_ok_pragmas: bool = args.ignore_ok_pragmas
     fail_warnings: bool = args.treat_warning_as_error
     use_factory_default: bool = args.use_default_checkcode_config
-
-    matlab_handle, return_code = find_matlab(
-        matlab_home_path=matlab_home_path,
-        matlab_version=matlab_version,
-        matlab_release_name=matlab_release_name,
-        logger=logger,
+    matlab_worker_max_memory_growth: Optional[int] = (
+        None
+        if args.matlab_worker_max_memory_growth is None
+        else args.matlab_worker_max_memory_growth * 1024 * 1024
     )
 
-    if ReturnCode.FAIL == return_code or matlab_handle is None:
-        logger.error("Unable to find MATLAB")
-        # We do not want to cause pre-commit/prek to fail if MATLAB is not found.
-        return ReturnCode.OK
-    else:
+    worker_pool: Optional[MatlabWorkerPool] = None
+    # Stops the MATLAB workers started early however main() ends
+    stack = ExitStack()
+
+    def get_time_budget() -> Optional[float]:
+        if args.time_budget is None:
+            return None
+        return max(args.time_budget - (time.monotonic() - start_time), 0.0)
+
+    def finish_in_background(handle: MatlabHandle, unchecked_files: list[Path]) -> None:
+        start_background_lint(get_background_lint_command(handle, unchecked_files, args), logger)
+
+    def warm_up(handle: MatlabHandle) -> None:
+        nonlocal worker_pool
+        if args.watch:
+            return
+        options = LinterOptions(
+            fail_warnings=fail_warnings,
+            enable_cyc=enable_cyc,
+            enable_mod_cyc=enable_mod_cyc,
+            ignore_ok_pragmas=ignore_ok_pragmas,
+            use_factory_default=use_factory_default,
+            checkcode_config_file=checkcode_config_file,
+            max_matlab_processes=args.max_matlab_processes,
+            max_mlint_processes=args.max_mlint_processes,
+        )
+        worker_pool = start_matlab_warm_up(
+            handle,
+            options,
+            args.borrow_mlint,
+            args.matlab_workers,
+            args.matlab_worker_max_jobs,
+            matlab_worker_max_memory_growth,
+            logger,
+        )
+        if worker_pool is not None:
+            stack.enter_context(worker_pool)
+
+    release_names: list[str] = []
+    if matlab_release_name is not None:
+        release_names = [name.strip() for name in matlab_release_name.split(",") if name.strip()]
+    if len(release_names) > 1 and (
+        args.matlab_home_path is not None or args.matlab_version is not None
+    ):
+        parser.error(
+            "--matlab-home-path and --matlab-version select a single MATLAB; they cannot be "
+            "combined with several releases in --matlab-release-name"
+        )
+    with stack:
+        # MATLAB is started as soon as the handle is known, so that its startup overlaps with
+        # everything below
+        matlab_handles, return_code = find_matlab_handles(
+            matlab_home_path, matlab_version, release_names, warm_up, logger
+        )
+
+        filepaths = get_filepaths(args, logger)
+
+        if len(matlab_handles) == 0:
+            return return_code
+        matlab_handle = matlab_handles[0]
+        if args.watch:
+            return watch_main(args, matlab_handles, logger)
+        if len(matlab_handles) > 1:
+            return validate_matlab_matrix(
+                matlab_handles,
+                filepaths,
+                logger,
+                report_format=args.format,
+                output_file=args.output.absolute() if args.output is not None else None,
+                quiet=args.quiet,
+                summary=args.summary,
+                fail_fast=args.fail_fast,
+                use_result_cache=not args.no_result_cache,
+                shard=args.shard,
+                shard_by_size=args.shard_by_size,
+                time_budget=get_time_budget(),
+                over_budget=args.over_budget,
+                finish_unchecked=finish_in_background if args.finish_in_background else None,
+                fail_warnings=fail_warnings,
+                enable_cyc=enable_cyc,
+                enable_mod_cyc=enable_mod_cyc,
+                ignore_ok_pragmas=ignore_ok_pragmas,
+                use_factory_default=use_factory_default,
+                checkcode_config_file=checkcode_config_file,
+                max_matlab_processes=args.max_matlab_processes,
+                max_mlint_processes=args.max_mlint_processes,
+                matlab_workers=args.matlab_workers,
+                matlab_worker_max_jobs=args.matlab_worker_max_jobs,
+                matlab_worker_max_memory_growth=matlab_worker_max_memory_growth,
+                jobs=args.jobs,
+                precheck=not args.no_precheck,
+                fast_feedback=args.fast_feedback,
+                borrow_mlint=args.borrow_mlint,
+            )
         return validate_matlab(
             matlab_handle,
             filepaths,
@@ -247,6 +1665,27 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
             use_factory_default,
             checkcode_config_file,
             logger,
+            max_matlab_processes=args.max_matlab_processes,
+            max_mlint_processes=args.max_mlint_processes,
+            matlab_workers=args.matlab_workers,
+            matlab_worker_max_jobs=args.matlab_worker_max_jobs,
+            matlab_worker_max_memory_growth=matlab_worker_max_memory_growth,
+            report_format=args.format,
+            output_file=args.output.absolute() if args.output is not None else None,
+            quiet=args.quiet,
+            summary=args.summary,
+            jobs=args.jobs,
+            precheck=not args.no_precheck,
+            fast_feedback=args.fast_feedback,
+            borrow_mlint=args.borrow_mlint,
+            fail_fast=args.fail_fast,
+            worker_pool=worker_pool,
+            use_result_cache=not args.no_result_cache,
+            shard=args.shard,
+            shard_by_size=args.shard_by_size,
+            time_budget=get_time_budget(),
+            over_budget=args.over_budget,
+            finish_unchecked=finish_in_background if args.finish_in_background else None,
         )
 
 
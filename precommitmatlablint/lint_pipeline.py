@@ -0,0 +1,389 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from precommitmatlablint.file_dedupe import HASH_CHUNK_FILES, HASH_WORKERS, hash_files
+from precommitmatlablint.lint_scheduler import STREAM_BATCHES_AHEAD, BatchScheduler, get_file_size
+from precommitmatlablint.linter_handle import DeadlineExceeded, LinterOptions
+from precommitmatlablint.linter_results import LinterReport
+from precommitmatlablint.result_cache import LintResultCache, get_options_key
+from precommitmatlablint.stat_index import StatIndex
+
+# The queue between two stages holds at most this many files, and at most this many files are
+# between the first stage and the caller at once, so every stage waits for the slowest one instead
+# of running ahead of it
+DEFAULT_QUEUE_SIZE = 256
+# How often a stage blocked on a full or empty queue checks whether the pipeline was stopped
+POLL_SECONDS = 0.1
+
+
+@dataclass
+class PipelineItem:
+    """A file on its way through the pipeline, identified by its position in the input."""
+
+    index: int
+    filepath: Path
+    size: int = 0
+    cache_key: Optional[str] = None
+
+
+class PipelineStopped(Exception):
+    """Raised within a stage to end it once the caller stopped taking reports."""
+
+
+# Marks the end of the files in a queue between stages
+_END = None
+
+
+class LintPipeline:
+    """Lints files in concurrent stages connected by bounded queues.
+
+    1. Prepare: stat each file, hash its contents and look up its records in the result cache. 2.
+    Batch: group the cache misses into batches, sized by the scheduler's cost model. 3. Execute:
+    lint the batches on the scheduler's workers through its linter, which parses its own output. 4.
+    Report: the caller takes the reports, in input order.
+
+    Files found in the result cache skip stages 2 and 3. While the first batches of misses are
+    linted, later files are still being hashed, and a caller that is slow to take reports only
+    stalls the stages once the queues fill.
+
+    Once the deadline of the options passes, files are no longer hashed or linted, and the linters
+    kill the batches still running. Such files get no report; they are listed in unchecked instead.
+    """
+
+    scheduler: BatchScheduler
+    result_cache: Optional[LintResultCache]
+    queue_size: int
+    stat_index: Optional[StatIndex]
+    cache_hits: int
+    unchecked: List[Path]
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        scheduler: BatchScheduler,
+        result_cache: Optional[LintResultCache] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        logger: Optional[logging.Logger] = None,
+        stat_index: Optional[StatIndex] = None,
+    ):
+        """
+        Parameters
+        ----------
+        scheduler: BatchScheduler
+                        Sizes the batches, and lints them through its linter on its workers
+        result_cache: LintResultCache, optional
+                        The records of earlier runs to reuse, and to add the new results to
+        queue_size: int
+                        The capacity of the queues between stages
+        logger: logging.Logger, optional
+        stat_index: StatIndex, optional
+                        The digests of files hashed before, to look up instead of reading unchanged
+                        files again
+        """
+        self.scheduler = scheduler
+        self.result_cache = result_cache
+        self.queue_size = max(queue_size, 1)
+        self.stat_index = stat_index
+        self.cache_hits = 0
+        self.unchecked = []
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def lint(
+        self, filepaths: Iterable[Path], options: LinterOptions, balance: bool = False
+    ) -> Iterator[LinterReport]:
+        """Lint files, yielding their reports in input order.
+
+        Parameters
+        ----------
+        filepaths: iterable of Path
+                        The files to lint, consumed on a thread of the pipeline while earlier files
+                        are linted
+        options: LinterOptions
+        balance: bool
+                        Split the misses among each queue_size prepared files into batches of even
+                        estimated duration, rather than closing each batch as soon as it is large
+                        enough
+
+        Returns
+        -------
+        iterator of LinterReport
+        """
+        run = _PipelineRun(self, options, balance)
+        try:
+            yield from run.reports(filepaths)
+        finally:
+            run.stop()
+            self.cache_hits += run.cache_hits
+            self.unchecked.extend(run.unchecked)
+
+
+class _PipelineRun:
+    """The threads, queues and state of one LintPipeline.lint() call."""
+
+    def __init__(self, pipeline: LintPipeline, options: LinterOptions, balance: bool):
+        self.scheduler = pipeline.scheduler
+        self.result_cache = pipeline.result_cache
+        self.stat_index = pipeline.stat_index
+        self.options = options
+        self.balance = balance
+        self.balance_window = pipeline.queue_size
+        self.options_key = get_options_key(self.scheduler.linter_key, options)
+        self.cache_hits = 0
+        self.unchecked: List[Path] = []
+        self.prepared: "queue.Queue[Optional[PipelineItem]]" = queue.Queue(
+            maxsize=pipeline.queue_size
+        )
+        # Reports or unchecked files by input position, the number of files once known, or the error
+        # that ended a stage
+        self.done: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        # Balancing needs a window of files prepared before its batches, and cache hits behind the
+        # window may hold up its reports, so it cannot bound the files in flight
+        self.in_flight: Optional[threading.Semaphore] = (
+            None if balance else threading.Semaphore(pipeline.queue_size)
+        )
+        self.batches_ahead = threading.Semaphore(self.scheduler.jobs * STREAM_BATCHES_AHEAD)
+        self.stopped = threading.Event()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.scheduler.jobs, thread_name_prefix="lint-execute"
+        )
+        # The files to look up in the result cache are hashed on these threads, a chunk at a time;
+        # a chunk never holds more files than may be in flight
+        self.hash_executor = ThreadPoolExecutor(
+            max_workers=HASH_WORKERS, thread_name_prefix="lint-hash"
+        )
+        self.hash_chunk_files = min(HASH_CHUNK_FILES, pipeline.queue_size)
+        self.futures: Set["Future[List[LinterReport]]"] = set()
+        self.running_batches = 0
+        self.futures_lock = threading.Lock()
+        self.threads: List[threading.Thread] = []
+
+    def reports(self, filepaths: Iterable[Path]) -> Iterator[LinterReport]:
+        self.threads = [
+            threading.Thread(
+                target=self._run_stage, args=(self._prepare, filepaths), name="lint-prepare"
+            ),
+            threading.Thread(target=self._run_stage, args=(self._batch,), name="lint-batch"),
+        ]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+        pending: Dict[int, Union[LinterReport, Path]] = {}
+        next_index = 0
+        total: Optional[int] = None
+        while total is None or next_index < total:
+            kind, value = self.done.get()
+            if kind == "error":
+                raise value
+            if kind == "total":
+                total = value
+            else:
+                index, result = value
+                pending[index] = result
+            while next_index in pending:
+                result = pending.pop(next_index)
+                next_index += 1
+                if self.in_flight is not None:
+                    self.in_flight.release()
+                if isinstance(result, LinterReport):
+                    yield result
+                else:
+                    self.unchecked.append(result)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        with self.futures_lock:
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+        for thread in self.threads:
+            thread.join()
+        self.hash_executor.shutdown(wait=True)
+        self.executor.shutdown(wait=True)
+
+    def _run_stage(self, stage, *args) -> None:
+        try:
+            stage(*args)
+        except PipelineStopped:
+            pass
+        except BaseException as err:  # Raised again on the caller's thread
+            self.stopped.set()
+            self.done.put(("error", err))
+
+    def _wait(self, semaphore: threading.Semaphore) -> None:
+        while not semaphore.acquire(timeout=POLL_SECONDS):
+            if self.stopped.is_set():
+                raise PipelineStopped()
+
+    def _put(self, item: Optional[PipelineItem]) -> None:
+        while True:
+            if self.stopped.is_set():
+                raise PipelineStopped()
+            try:
+                self.prepared.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, timeout: Optional[float] = None) -> Optional[PipelineItem]:
+        """Take the next prepared file, waiting for at most timeout seconds if given."""
+        while True:
+            if self.stopped.is_set():
+                raise PipelineStopped()
+            try:
+                if timeout == 0:
+                    return self.prepared.get_nowait()
+                return self.prepared.get(
+                    timeout=POLL_SECONDS if timeout is None else min(timeout, POLL_SECONDS)
+                )
+            except queue.Empty:
+                if timeout is not None:
+                    raise
+
+    def _has_idle_worker(self) -> bool:
+        with self.futures_lock:
+            return self.running_batches < self.scheduler.jobs
+
+    def _prepare(self, filepaths: Iterable[Path]) -> None:
+        """Stage 1: stat and hash each file, and report those with cached records straight away."""
+        count = 0
+        chunk: List[PipelineItem] = []
+        try:
+            for index, filepath in enumerate(filepaths):
+                if self.in_flight is not None:
+                    self._wait(self.in_flight)
+                count = index + 1
+                if self._past_deadline():
+                    self.done.put(("unchecked", (index, filepath)))
+                    continue
+                chunk.append(PipelineItem(index, filepath, get_file_size(filepath)))
+                if self.result_cache is None or len(chunk) >= self.hash_chunk_files:
+                    self._prepare_chunk(chunk)
+                    chunk = []
+            self._prepare_chunk(chunk)
+        finally:
+            # Stop the producer of the files, e.g. a file listing process, if the pipeline stopped
+            # early
+            close = getattr(filepaths, "close", None)
+            if close is not None:
+                close()
+        self._put(_END)
+        self.done.put(("total", count))
+
+    def _prepare_chunk(self, items: List[PipelineItem]) -> None:
+        """Hash a chunk of files at once, then pass on those without cached records to be linted."""
+        if self.result_cache is not None and items:
+            paths = [item.filepath for item in items]
+            digests = (
+                self.stat_index.digests(paths, self.hash_executor)
+                if self.stat_index is not None
+                else hash_files(paths, self.hash_executor)
+            )
+        else:
+            digests = [None] * len(items)
+        for item, digest in zip(items, digests):
+            if self.result_cache is not None and digest is not None:
+                item.cache_key = LintResultCache.make_key(self.options_key, item.filepath, digest)
+                records = self.result_cache.get(item.cache_key)
+                if records is not None:
+                    self.cache_hits += 1
+                    report = LinterReport(source_file=item.filepath, records=records)
+                    self.done.put(("report", (item.index, report)))
+                    continue
+            self._put(item)
+
+    def _batch(self) -> None:
+        """Stage 2: group the files to lint into batches and hand each to a worker."""
+        if self.balance:
+            # Each window of files is balanced on its own, so the first batches start once the first
+            # window is prepared rather than every file
+            at_end = False
+            while not at_end:
+                items: List[PipelineItem] = []
+                while len(items) < self.balance_window:
+                    item = self._get()
+                    if item is _END:
+                        at_end = True
+                        break
+                    items.append(item)
+                for batch in self.scheduler.plan([(item.filepath, item.size) for item in items]):
+                    self._submit([items[i] for i in batch.indices])
+            return
+
+        target_seconds = self.scheduler.get_stream_batch_seconds()
+        batch: List[PipelineItem] = []
+        batch_seconds = 0.0
+        while True:
+            try:
+                if not batch:
+                    item = self._get()
+                else:
+                    item = self._get(timeout=0 if self._has_idle_worker() else POLL_SECONDS)
+            except queue.Empty:
+                # Nothing more is ready yet; rather than leave a worker idle, lint what there is
+                if self._has_idle_worker():
+                    self._submit(batch)
+                    batch, batch_seconds = [], 0.0
+                continue
+            if item is _END:
+                break
+            batch.append(item)
+            batch_seconds += self.scheduler.cost_model.estimate_file(
+                self.scheduler.linter_key, item.filepath, item.size
+            )
+            if len(batch) >= self.scheduler.max_batch_files or batch_seconds >= target_seconds:
+                self._submit(batch)
+                batch, batch_seconds = [], 0.0
+        if batch:
+            self._submit(batch)
+
+    def _past_deadline(self) -> bool:
+        return self.options.deadline_passed()
+
+    def _submit(self, batch: List[PipelineItem]) -> None:
+        """Stage 3: lint a batch on the next free worker, then pass its reports on to the caller."""
+        if self._past_deadline():
+            for item in batch:
+                self.done.put(("unchecked", (item.index, item.filepath)))
+            return
+        self._wait(self.batches_ahead)
+        with self.futures_lock:
+            future = self.executor.submit(
+                self.scheduler.lint_batch, [(i.filepath, i.size) for i in batch], self.options
+            )
+            self.futures.add(future)
+            self.running_batches += 1
+
+        def finish(future: "Future[List[LinterReport]]") -> None:
+            with self.futures_lock:
+                self.futures.discard(future)
+                self.running_batches -= 1
+            self.batches_ahead.release()
+            if future.cancelled():
+                return
+            error = future.exception()
+            if isinstance(error, DeadlineExceeded):
+                for item in batch:
+                    self.done.put(("unchecked", (item.index, item.filepath)))
+                return
+            if error is not None:
+                self.stopped.set()
+                self.done.put(("error", error))
+                return
+            # lint_batch() matched the reports to the files by their source file, and gave files
+            # the linter skipped a failing report, which is not cached
+            for item, report in zip(batch, future.result()):
+                if (
+                    self.result_cache is not None
+                    and item.cache_key is not None
+                    and not report.is_missing()
+                ):
+                    self.result_cache.put(item.cache_key, report.records)
+                self.done.put(("report", (item.index, report)))
+
+        future.add_done_callback(finish)
@@ -0,0 +1,272 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from precommitmatlablint.cost_model import LintCostModel
+from precommitmatlablint.linter_handle import Linter, LinterOptions
+from precommitmatlablint.linter_results import LinterReport
+
+# Keeps command lines well below the operating system limits
+DEFAULT_MAX_BATCH_FILES = 200
+# Splitting work into more batches than workers lets fast workers pick up the slack of slow ones, as
+# long as the extra process startups stay a small fraction of the total
+BATCHES_PER_WORKER = 4
+MAX_STARTUP_FRACTION = 0.1
+# When streaming, this many batches per worker may be queued ahead of the one being reported
+STREAM_BATCHES_AHEAD = 2
+
+
+@dataclass
+class Batch:
+    """A group of files linted by one linter process, identified by their positions in the input."""
+
+    indices: List[int] = field(default_factory=list)
+    estimated_seconds: float = 0.0
+
+
+def plan_batches(
+    estimates: Sequence[float],
+    workers: int,
+    startup_seconds: float,
+    max_batch_files: int = DEFAULT_MAX_BATCH_FILES,
+) -> List[Batch]:
+    """Split files into batches of estimated durations as even as possible, longest batch first.
+
+    Files are assigned longest first, each to the batch with the least estimated work so far (the
+    LPT rule), so a single giant file ends up alone in a batch that starts first instead of being
+    left for last.
+
+    Parameters
+    ----------
+    estimates: sequence of float
+                        The estimated lint seconds of each file, excluding process startup
+    workers: int
+                        The number of batches that run at once
+    startup_seconds: float
+                        The estimated startup overhead of one linter process
+    max_batch_files: int
+                        The maximum number of files in one batch
+
+    Returns
+    -------
+    list of Batch
+    """
+    if len(estimates) == 0:
+        return []
+
+    workers = max(workers, 1)
+    total_seconds = sum(estimates)
+    batch_count = max(workers, math.ceil(len(estimates) / max(max_batch_files, 1)))
+    if workers > 1:
+        # Use more batches than workers while the added startups stay cheap compared to the work
+        affordable = int(total_seconds * MAX_STARTUP_FRACTION / max(startup_seconds, 1e-6))
+        batch_count = max(batch_count, min(workers * BATCHES_PER_WORKER, affordable))
+    batch_count = min(batch_count, len(estimates))
+
+    batches = [Batch() for _ in range(batch_count)]
+    heap: List[Tuple[float, int, int]] = [(0.0, 0, index) for index in range(batch_count)]
+    for file_index in sorted(range(len(estimates)), key=lambda i: estimates[i], reverse=True):
+        # Among batches with equal work, prefer the one with fewer files to respect max_batch_files
+        seconds, file_count, batch_index = heapq.heappop(heap)
+        batch = batches[batch_index]
+        batch.indices.append(file_index)
+        batch.estimated_seconds = seconds + estimates[file_index]
+        if len(batch.indices) < max_batch_files:
+            heapq.heappush(heap, (batch.estimated_seconds, file_count + 1, batch_index))
+        if len(heap) == 0:
+            batches.append(Batch())
+            heap.append((0.0, 0, len(batches) - 1))
+
+    batches = [b for b in batches if len(b.indices) > 0]
+    for batch in batches:
+        batch.indices.sort()
+    return sorted(batches, key=lambda b: b.estimated_seconds, reverse=True)
+
+
+class BatchScheduler(Linter):
+    """Lints files in parallel batches through another linter, sized by a learned cost model.
+
+    Each batch's duration is fed back into the cost model, so estimates improve from run to run.
+    """
+
+    linter: Linter
+    linter_key: str
+    jobs: int
+    cost_model: LintCostModel
+    max_batch_files: int
+    _model_lock: threading.Lock
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        linter: Linter,
+        linter_key: str,
+        jobs: int = 1,
+        cost_model: Optional[LintCostModel] = None,
+        max_batch_files: int = DEFAULT_MAX_BATCH_FILES,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        linter: Linter
+                        The linter that lints each batch
+        linter_key: str
+                        Identifies the linter in the cost model, e.g. the path of its executable
+        jobs: int
+                        The number of batches linted at once
+        cost_model: LintCostModel, optional
+                        The cost model to use and update. A new, empty one is used if not supplied.
+        max_batch_files: int
+                        The maximum number of files in one batch
+        logger: logging.Logger, optional
+        """
+        self.linter = linter
+        self.linter_key = linter_key
+        self.jobs = max(jobs, 1)
+        self.cost_model = cost_model if cost_model is not None else LintCostModel()
+        self.max_batch_files = max_batch_files
+        self._model_lock = threading.Lock()
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def plan(self, files: List[Tuple[Path, int]]) -> List[Batch]:
+        """Split (path, size) files into batches of even estimated duration, longest batch first."""
+        estimates: List[float] = [
+            self.cost_model.estimate_file(self.linter_key, f, s) for f, s in files
+        ]
+        startup_seconds, _ = self.cost_model.get_linter_costs(self.linter_key)
+        batches = plan_batches(estimates, self.jobs, startup_seconds, self.max_batch_files)
+        self._logger.debug(
+            f"Linting {len(files)} files in {len(batches)} batches on {self.jobs} workers "
+            f"(estimated startup {startup_seconds:.3f}s, work {sum(estimates):.3f}s)"
+        )
+        return batches
+
+    def get_stream_batch_seconds(self) -> float:
+        """Return the estimated duration at which a batch of streamed files is closed.
+
+        Without the full list, batches cannot be balanced up front. Instead each batch is closed
+        once its estimated duration makes the process startup a small fraction of it.
+        """
+        startup_seconds, _ = self.cost_model.get_linter_costs(self.linter_key)
+        return startup_seconds / MAX_STARTUP_FRACTION
+
+    def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
+        sizes: List[int] = [get_file_size(f) for f in filepaths]
+        batches = self.plan(list(zip(filepaths, sizes)))
+
+        def lint_batch(batch: Batch) -> List[LinterReport]:
+            return self.lint_batch([(filepaths[i], sizes[i]) for i in batch.indices], options)
+
+        reports: List[Optional[LinterReport]] = [None] * len(filepaths)
+        if self.jobs == 1 or len(batches) == 1:
+            batch_reports = [lint_batch(b) for b in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                # Batches are submitted longest first, and the executor starts them in that order
+                batch_reports = list(executor.map(lint_batch, batches))
+
+        # lint_batch() returns one report per file of the batch, in order
+        for batch, these_reports in zip(batches, batch_reports):
+            for index, report in zip(batch.indices, these_reports):
+                reports[index] = report
+
+        return [
+            r if r is not None else LinterReport.missing(filepaths[i])
+            for i, r in enumerate(reports)
+        ]
+
+    def lint_stream(
+        self, filepaths: Iterable[Path], options: LinterOptions
+    ) -> Iterator[LinterReport]:
+        """Lint files while they are still being produced, yielding their reports in input order.
+
+        Each batch is handed to a worker as soon as it is closed, see get_stream_batch_seconds().
+        """
+        target_seconds = self.get_stream_batch_seconds()
+
+        def iter_batches() -> Iterator[List[Tuple[Path, int]]]:
+            batch: List[Tuple[Path, int]] = []
+            batch_seconds = 0.0
+            for filepath in filepaths:
+                size = get_file_size(filepath)
+                batch.append((filepath, size))
+                batch_seconds += self.cost_model.estimate_file(self.linter_key, filepath, size)
+                if len(batch) >= self.max_batch_files or batch_seconds >= target_seconds:
+                    yield batch
+                    batch = []
+                    batch_seconds = 0.0
+            if batch:
+                yield batch
+
+        if self.jobs == 1:
+            for batch in iter_batches():
+                yield from self.lint_batch(batch, options)
+            return
+
+        pending: Deque["Future[List[LinterReport]]"] = deque()
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            try:
+                for batch in iter_batches():
+                    pending.append(executor.submit(self.lint_batch, batch, options))
+                    # Bound the work queued ahead, so reports keep flowing out while files keep
+                    # flowing in
+                    while len(pending) > self.jobs * STREAM_BATCHES_AHEAD or (
+                        pending and pending[0].done()
+                    ):
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def lint_batch(
+        self, files: List[Tuple[Path, int]], options: LinterOptions
+    ) -> List[LinterReport]:
+        """Lint one batch of (path, size) files and record how long it took.
+
+        Returns one report per file, in order, see match_reports().
+        """
+        start = time.perf_counter()
+        filepaths = [f for f, _ in files]
+        reports = self.linter.lint(filepaths, options)
+        seconds = time.perf_counter() - start
+        with self._model_lock:
+            self.cost_model.observe_batch(self.linter_key, files, seconds)
+        return match_reports(filepaths, reports)
+
+
+def match_reports(filepaths: Sequence[Path], reports: Iterable[LinterReport]) -> List[LinterReport]:
+    """Return one report per file, in order, taking each from the reports by its source file.
+
+    Reports are matched by their source file rather than their position, so a linter skipping a
+    file cannot shift the reports of the others. Files without a report get a failing one, see
+    LinterReport.missing(), rather than passing unchecked.
+    """
+    indices_by_file: Dict[Path, List[int]] = {}
+    for index, filepath in enumerate(filepaths):
+        indices_by_file.setdefault(filepath, []).append(index)
+    matched: List[Optional[LinterReport]] = [None] * len(filepaths)
+    for report in reports:
+        indices = indices_by_file.get(report.source_file)
+        if indices:
+            matched[indices.pop(0)] = report
+    return [
+        r if r is not None else LinterReport.missing(filepaths[i]) for i, r in enumerate(matched)
+    ]
+
+
+def get_file_size(filepath: Path) -> int:
+    try:
+        return os.stat(filepath).st_size
+    except OSError:
+        return 0
@@ -0,0 +1,276 @@
+import inspect
+import logging
+import threading
+import weakref
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Generator, Iterable, Iterator, Optional, cast
+
+from precommitmatlablint.cost_model import LintCostModel
+from precommitmatlablint.find_matlab import find_matlab
+from precommitmatlablint.lint_matlab import (
+    RunStores,
+    create_matlab_worker_pool,
+    create_scheduler,
+    lint_files,
+    select_mlint_handle,
+)
+from precommitmatlablint.lint_pipeline import POLL_SECONDS
+from precommitmatlablint.lint_scheduler import BatchScheduler
+from precommitmatlablint.linter_handle import LinterOptions, MatlabHandle
+from precommitmatlablint.linter_results import LinterReport
+from precommitmatlablint.matlab_workers import DEFAULT_MAX_JOBS_PER_WORKER, MatlabWorkerPool
+from precommitmatlablint.prechecks import Prechecks
+from precommitmatlablint.result_cache import LintResultCache
+from precommitmatlablint.stat_index import StatIndex
+
+
+class LintSession:
+    """Lints MATLAB files many times with one install and options, for tools embedding the linter.
+
+    The linter is chosen once, and the cost model, result cache, stat index and, when linting
+    through MATLAB, the persistent MATLAB workers are kept for the life of the session, so each call
+    only pays for the files it lints. Nothing is written to stdout. lint() may be called from
+    several threads at once. close() stops the lint() iterators still in use, saves the caches and
+    stops the MATLAB workers; a session is also a context manager that closes itself.
+    """
+
+    matlab_handle: MatlabHandle
+    options: LinterOptions
+    precheck: bool
+    cost_model: LintCostModel
+    result_cache: Optional[LintResultCache]
+    stat_index: Optional[StatIndex]
+    worker_pool: Optional[MatlabWorkerPool]
+    scheduler: BatchScheduler
+    _active_calls: int
+    _closed: bool
+    _condition: threading.Condition
+    _iterators: "weakref.WeakSet[Generator[LinterReport, None, None]]"
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        matlab_handle: MatlabHandle,
+        options: Optional[LinterOptions] = None,
+        jobs: int = 1,
+        matlab_workers: int = 1,
+        matlab_worker_max_jobs: int = DEFAULT_MAX_JOBS_PER_WORKER,
+        matlab_worker_max_memory_growth: Optional[int] = None,
+        borrow_mlint: Optional[str] = None,
+        precheck: bool = True,
+        use_result_cache: bool = True,
+        cost_model: Optional[LintCostModel] = None,
+        result_cache: Optional[LintResultCache] = None,
+        stat_index: Optional[StatIndex] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        matlab_handle: MatlabHandle
+                            The handle to the MATLAB install to lint with, see find()
+        options: LinterOptions, optional
+                            The checkcode options of every call. Defaults to no extra checks and no
+                            warnings as errors.
+        jobs: int
+                            The number of mlint processes each call lints with at once
+        matlab_workers: int
+                            When linting through MATLAB, the number of persistent MATLAB workers
+                            shared by all calls
+        matlab_worker_max_jobs: int
+                            Restart a MATLAB worker after this many jobs (0 for never)
+        matlab_worker_max_memory_growth: int, optional
+                            Restart a MATLAB worker once its memory use grew by this many bytes
+        borrow_mlint: str, optional
+                            If MATLAB has no usable mlint, borrow the mlint of another cached
+                            install allowed by this policy, one of
+                            find_matlab.BORROW_MLINT_POLICIES, rather than linting through MATLAB
+        precheck: bool
+                            Run the in-process pre-checks first. Files holding no code then skip the
+                            linter.
+        use_result_cache: bool
+                            Reuse the records of files whose name and contents were linted before
+                            with the same linter and options
+        cost_model: LintCostModel, optional
+                            The observed lint durations used to size batches. Loaded from the user's
+                            HOME directory if not supplied.
+        result_cache: LintResultCache, optional
+                            The records of earlier runs. Loaded from the user's HOME directory if
+                            not supplied and use_result_cache is set.
+        stat_index: StatIndex, optional
+                            The content digests of files by their stat. Loaded from the user's HOME
+                            directory if not supplied and use_result_cache is set.
+        logger: logging.Logger, optional
+        """
+        self.matlab_handle = matlab_handle
+        self.options = (
+            options
+            if options is not None
+            else LinterOptions(
+                fail_warnings=False,
+                enable_cyc=False,
+                enable_mod_cyc=False,
+                ignore_ok_pragmas=False,
+                use_factory_default=False,
+            )
+        )
+        self.precheck = precheck
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+        stores = RunStores.load(
+            cost_model=cost_model,
+            result_cache=result_cache,
+            stat_index=stat_index,
+            use_result_cache=use_result_cache,
+        )
+        self.cost_model = stores.cost_model
+        self.result_cache = stores.result_cache
+        self.stat_index = stores.stat_index
+        self.worker_pool = None
+
+        m_lint_handle, _ = select_mlint_handle(
+            matlab_handle, self.options, borrow_mlint, self._logger
+        )
+        if m_lint_handle is None:
+            self.worker_pool = create_matlab_worker_pool(
+                matlab_handle,
+                max(matlab_workers, 1),
+                self.options.max_matlab_processes,
+                matlab_worker_max_jobs,
+                matlab_worker_max_memory_growth,
+                self._logger,
+            )
+            self.worker_pool.warm_up_in_background()
+        # Linting with mlint or the workers, there is always a scheduler
+        self.scheduler = cast(
+            BatchScheduler,
+            create_scheduler(
+                matlab_handle, m_lint_handle, self.worker_pool, jobs, self.cost_model, self._logger
+            ),
+        )
+
+        self._active_calls = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._iterators = weakref.WeakSet()
+
+    @classmethod
+    def find(
+        cls,
+        matlab_home_path: Optional[Path] = None,
+        matlab_version: Optional[str] = None,
+        matlab_release_name: Optional[str] = None,
+        cache_file: Optional[Path] = None,
+        **kwargs: Any,
+    ) -> "LintSession":
+        """Open a session with the MATLAB install that find_matlab() finds.
+
+        The other arguments are passed on to LintSession().
+
+        Raises FileNotFoundError if there is no such install.
+        """
+        matlab_handle, _ = find_matlab(
+            matlab_home_path=matlab_home_path,
+            matlab_version=matlab_version,
+            matlab_release_name=matlab_release_name,
+            cache_file=cache_file,
+            logger=kwargs.get("logger"),
+        )
+        if matlab_handle is None:
+            raise FileNotFoundError("Unable to find MATLAB")
+        return cls(matlab_handle, **kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def lint(self, filepaths: Iterable[Path]) -> Iterator[LinterReport]:
+        """Lint files, yielding their reports in input order as they become available.
+
+        Raises ValueError if the session is closed, also on the first report asked for. Closing the
+        session stops an iterator already started, which then reports no more files.
+        """
+        self._check_open()
+        reports = self._lint(filepaths)
+        self._iterators.add(reports)
+        return reports
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise ValueError("The lint session is closed")
+
+    def _lint(self, filepaths: Iterable[Path]) -> Generator[LinterReport, None, None]:
+        with self._condition:
+            # The session may have closed between lint() and the first report being asked for
+            self._check_open()
+            self._active_calls += 1
+        try:
+            with closing(
+                lint_files(
+                    self.matlab_handle,
+                    self.scheduler,
+                    filepaths,
+                    self.options,
+                    result_cache=self.result_cache,
+                    stat_index=self.stat_index,
+                    prechecks=Prechecks() if self.precheck else None,
+                    logger=self._logger,
+                )
+            ) as linter_reports:
+                for report in linter_reports:
+                    yield report
+                    # A call in progress stops at its next report once the session closes
+                    if self._closed:
+                        return
+        finally:
+            with self._condition:
+                self._active_calls -= 1
+                self._condition.notify_all()
+
+    def save(self) -> None:
+        """Save the cost model and caches, which close() also does."""
+        self.cost_model.save()
+        if self.result_cache is not None:
+            self.result_cache.save()
+        if self.stat_index is not None:
+            self.stat_index.save()
+
+    def close(self) -> None:
+        """Stop the lint() iterators still in use, save the caches and stop the MATLAB workers.
+
+        Iterators waiting to be asked for their next report are closed. Those busy linting on
+        another thread stop at their next report, which close() waits for. Closing a closed session
+        does nothing.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+        while True:
+            with self._condition:
+                if self._active_calls == 0:
+                    break
+                waiting = [
+                    reports
+                    for reports in self._iterators
+                    if inspect.getgeneratorstate(reports) == inspect.GEN_SUSPENDED
+                ]
+            for reports in waiting:
+                try:
+                    reports.close()
+                except ValueError:
+                    # Another thread asked for its next report meanwhile
+                    pass
+            with self._condition:
+                self._condition.wait_for(lambda: self._active_calls == 0, timeout=POLL_SECONDS)
+        try:
+            self.save()
+        finally:
+            if self.worker_pool is not None:
+                self.worker_pool.close()
+
+    def __enter__(self) -> "LintSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,135 @@
+import io
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, TextIO
+
+from precommitmatlablint.file_watcher import FileWatcher
+from precommitmatlablint.linter_handle import Linter, LinterOptions
+from precommitmatlablint.linter_results import LinterReport
+from precommitmatlablint.report_writers import TextReportWriter
+
+# Saves closer together than this are linted as one batch
+DEFAULT_DEBOUNCE_SECONDS = 0.1
+# A steady stream of saves is still linted at least this often
+MAX_DEBOUNCE_SECONDS = 1.0
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+
+class LintWatcher:
+    """Keeps the lint reports of a set of watched files up to date as the files change.
+
+    Reports are held in memory, so a change only costs linting the files that changed. On a terminal
+    the reports of every file with issues are redrawn in place after each update; other streams get
+    the reports of the changed files.
+    """
+
+    linter: Linter
+    options: LinterOptions
+    file_watcher: FileWatcher
+    stream: TextIO
+    debounce: float
+    reports: Dict[Path, LinterReport]
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        linter: Linter,
+        options: LinterOptions,
+        file_watcher: FileWatcher,
+        stream: TextIO,
+        debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        linter: Linter
+                        The linter that lints changed files
+        options: LinterOptions
+        file_watcher: FileWatcher
+                        The watcher reporting file changes
+        stream: TextIO
+                        Where the reports are written
+        debounce: float
+                        Seconds without further changes before a batch of changes is linted
+        logger: logging.Logger, optional
+        """
+        self.linter = linter
+        self.options = options
+        self.file_watcher = file_watcher
+        self.stream = stream
+        self.debounce = debounce
+        self.reports = {}
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait for a change, then collect more until none arrived for the debounce period."""
+        changed = self.file_watcher.wait_for_changes(timeout)
+        deadline = time.monotonic() + MAX_DEBOUNCE_SECONDS
+        while changed and time.monotonic() < deadline:
+            more = self.file_watcher.wait_for_changes(self.debounce)
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def update(self, changed: Set[Path]) -> List[LinterReport]:
+        """Lint the changed files that still exist and forget those that were deleted.
+
+        Returns
+        -------
+        list of LinterReport
+                    The new reports of the changed files
+        """
+        existing: List[Path] = sorted(p for p in changed if p.is_file())
+        for path in changed.difference(existing):
+            self.reports.pop(path, None)
+
+        new_reports: List[LinterReport] = []
+        if existing:
+            new_reports = self.linter.lint(filepaths=existing, options=self.options)
+            for path, report in zip(existing, new_reports):
+                self.reports[path] = report
+        return new_reports
+
+    def render(self, new_reports: List[LinterReport], seconds: float) -> None:
+        files_with_records = [
+            self.reports[p] for p in sorted(self.reports) if self.reports[p].has_records()
+        ]
+        record_count = sum(len(r.records) for r in files_with_records)
+        status = (
+            f"Watching {len(self.reports)} file(s): {record_count} issue(s) in "
+            f"{len(files_with_records)} file(s). Linted {len(new_reports)} file(s) in "
+            f"{seconds:.2f}s.\n"
+        )
+
+        buffer = io.StringIO()
+        writer = TextReportWriter(buffer)
+        if self.stream.isatty():
+            buffer.write(CLEAR_SCREEN)
+            for report in files_with_records:
+                writer.write_report(report)
+        else:
+            for report in new_reports:
+                writer.write_report(report)
+        buffer.write(status)
+        self.stream.write(buffer.getvalue())
+        self.stream.flush()
+
+    def run_once(self, changed: Set[Path]) -> None:
+        start = time.perf_counter()
+        new_reports = self.update(changed)
+        self.render(new_reports, time.perf_counter() - start)
+
+    def run(self) -> None:
+        """Lint every watched file, then re-lint changed files until interrupted."""
+        self.run_once(self.file_watcher.files())
+        try:
+            while True:
+                changed = self.wait_for_changes()
+                if changed:
+                    self._logger.debug(f"Re-linting {len(changed)} changed file(s)")
+                    self.run_once(changed)
+        except KeyboardInterrupt:
+            pass
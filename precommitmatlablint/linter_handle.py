@@ -1,19 +1,53 @@
 import json
+import locale
 import logging
+import os
 import re
 import subprocess
 import sys
-from dataclasses import dataclass, asdict
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from functools import partial
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Optional, Protocol, List, Tuple, Dict, Any
+from typing import Optional, Protocol, List, Tuple, Dict, Any, Union, Iterator
 
 import yaml
 from defusedxml import ElementTree as ElementTree
 
+from precommitmatlablint.backend_probe import (
+    BENCHMARK_REPEATS,
+    CHECKCODE_FLAGS,
+    MATLAB_BACKEND,
+    MLINT_BACKEND,
+    BackendCapabilities,
+    benchmark_linter,
+    flag_name,
+    probe_mlint,
+    select_backend,
+    write_sample_corpus,
+)
+from precommitmatlablint.file_lock import FileLock, atomic_write_text, get_lock_file
 from precommitmatlablint.linter_results import LinterReport, LinterRecord
+from precommitmatlablint.mlint_parser import (
+    MlintItem,
+    build_reports,
+    iter_mlint_output,
+    iter_reports,
+    read_mlint_output,
+)
+from precommitmatlablint.process_slots import (
+    DEFAULT_MAX_MATLAB_PROCESSES,
+    DEFAULT_MAX_MLINT_PROCESSES,
+    ProcessSlotPool,
+)
 from precommitmatlablint.return_code import ReturnCode
-from precommitmatlablint.utility import construct_matlab_script
+from precommitmatlablint.utility import (
+    construct_matlab_script,
+    construct_matlab_worker_script,
+    get_state_file,
+)
 
 
 @dataclass(frozen=True)
@@ -24,6 +58,37 @@ class LinterOptions:
     ignore_ok_pragmas: bool
     use_factory_default: bool
     checkcode_config_file: Optional[Path] = None
+    # Limits on how many processes of each kind may run at once across all hook processes; zero
+    # means no limit
+    max_matlab_processes: int = DEFAULT_MAX_MATLAB_PROCESSES
+    max_mlint_processes: int = DEFAULT_MAX_MLINT_PROCESSES
+    # The time.monotonic() time by which linting must end; linters kill whatever is still running
+    # then
+    deadline: Optional[float] = None
+
+    def get_seconds_left(self) -> Optional[float]:
+        """Return the seconds left until the deadline, or None if there is none.
+
+        Raises DeadlineExceeded if the deadline has passed.
+        """
+        if self.deadline is None:
+            return None
+        seconds_left = self.deadline - time.monotonic()
+        if seconds_left <= 0:
+            raise DeadlineExceeded()
+        return seconds_left
+
+    def deadline_passed(self) -> bool:
+        """Return whether the deadline has passed; never if there is none."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+class DeadlineExceeded(Exception):
+    """Raised by a linter that did not lint its files because the options' deadline passed."""
+
+
+class LinterError(RuntimeError):
+    """Raised by a linter whose process failed, so that none of its reports can be trusted."""
 
 
 class Linter(Protocol):
@@ -38,65 +103,89 @@ class MLintHandle(Linter):
         return self.exe_path.exists()
 
     def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
-        linter_reports: List[LinterReport]
+        return list(self.iter_lint(filepaths, options))
 
+    def iter_lint(self, filepaths: List[Path], options: LinterOptions) -> Iterator[LinterReport]:
+        """Lint files, parsing mlint's output as it runs and yielding each report once complete.
+
+        Neither the whole output nor a list of its lines is ever held in memory.
+        """
         arguments = MLintHandle.construct_command_arguments(
             filepaths=filepaths,
             options=options,
         )
         command = [str(self.exe_path), *arguments]
-
-        completed_process = subprocess.run(command, capture_output=True, text=True)
-
-        stderr = completed_process.stderr
-
-        linter_reports = self.parse_mlint_output(stderr, filepaths)
-
-        return linter_reports
-
-    @classmethod
-    def parse_mlint_output(cls, stderr: str, file_list: List[Path]) -> List[LinterReport]:
-        linter_reports: List[LinterReport] = []
-        if len(stderr) > 0:
-            lines: List[str] = stderr.splitlines()
-            lines = [line.strip() for line in lines]
-
-            if len(file_list) == 1:
-                this_report = LinterReport(source_file=file_list[0])
-                for line in lines:
-                    this_report.records.append(LinterRecord.from_mlint(mlint_message=line))
-                linter_reports.append(this_report)
-            elif len(file_list) > 1:
-                boundary_indices = [
-                    idx for (idx, line) in enumerate(lines) if line.startswith("===")
-                ]
-
-                for idx, boundary_index in enumerate(boundary_indices):
-                    # Each boundary line is of the form '============ <file path> ============'
-                    file_path: str = lines[boundary_index].strip("=").strip()
-                    this_report = LinterReport(source_file=Path(file_path))
-
-                    start_index = boundary_index + 1
-                    end_index = (
-                        len(lines)
-                        if idx == len(boundary_indices) - 1
-                        else boundary_indices[idx + 1]
+        # The output is parsed as bytes, so only the fields of each record are decoded
+        encoding = locale.getpreferredencoding(False)
+
+        with ProcessSlotPool.for_mlint(options.max_mlint_processes).slot():
+            seconds_left = options.get_seconds_left()
+            process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            killed_at_deadline = threading.Event()
+
+            def kill_at_deadline() -> None:
+                killed_at_deadline.set()
+                process.kill()
+
+            watchdog = (
+                threading.Timer(seconds_left, kill_at_deadline)
+                if seconds_left is not None
+                else None
+            )
+            if watchdog is not None:
+                watchdog.start()
+            try:
+                output_seen = False
+
+                def iter_items() -> Iterator[MlintItem]:
+                    nonlocal output_seen
+                    for item in read_mlint_output(process.stderr, encoding):
+                        output_seen = True
+                        yield item
+
+                # The last report is held back until mlint's exit status is known, so a failed run
+                # never reads as complete
+                last_report: Optional[LinterReport] = None
+                for report in iter_reports(iter_items(), filepaths):
+                    if killed_at_deadline.is_set():
+                        # The report may be cut short
+                        break
+                    if last_report is not None:
+                        yield last_report
+                    last_report = report
+                return_code = process.wait()
+                if killed_at_deadline.is_set():
+                    raise DeadlineExceeded()
+                if return_code != 0:
+                    raise LinterError(f"{self.exe_path} exited with status {return_code}")
+                if last_report is None and output_seen:
+                    # Several files are always separated by boundaries, so this is not lint output
+                    raise LinterError(
+                        f"{self.exe_path} wrote output without any file boundaries for "
+                        f"{len(filepaths)} files"
                     )
+                if last_report is not None:
+                    yield last_report
+                else:
+                    # Files without any issues produce no output at all
+                    yield from (LinterReport(source_file=file) for file in filepaths)
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+                if process.stderr is not None:
+                    process.stderr.close()
 
-                    records = [
-                        LinterRecord.from_mlint(mlint_message=line)
-                        for line in lines[start_index:end_index]
-                        if line
-                    ]
-                    this_report.records.extend(records)
-
-                    linter_reports.append(this_report)
-        else:
-            for file in file_list:
-                this_report = LinterReport(source_file=file)
-                linter_reports.append(this_report)
-
-        return linter_reports
+    @classmethod
+    def parse_mlint_output(
+        cls, stderr: Union[str, bytes], file_list: List[Path], encoding: str = "utf-8"
+    ) -> List[LinterReport]:
+        if len(stderr) == 0:
+            return [LinterReport(source_file=file) for file in file_list]
+        # Each boundary line is of the form '============ <file path> ============'
+        return build_reports(iter_mlint_output(stderr, encoding), file_list)
 
     @classmethod
     def construct_command_arguments(
@@ -133,6 +222,9 @@ class MatlabHandle(Linter):
     base_exe_path: Path
     version: str = ""
     release: str = ""
+    # The install's modification time (see get_install_mtime) when its backends were last probed
+    probed_mtime: int = 0
+    backends: Dict[str, BackendCapabilities] = field(default_factory=dict)
 
     def __post_init__(self):
         if len(self.version) == 0 and len(self.release) == 0:
@@ -178,19 +270,133 @@ class MatlabHandle(Linter):
             )
         )
 
+    def get_install_mtime(self) -> int:
+        """Return the latest modification time, in ns, of the home folder, MATLAB and mlint."""
+        mtimes: List[int] = []
+        for path in (self.home_path, self.exe_path, self.get_mlint_handle().exe_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                pass
+        return max(mtimes, default=0)
+
+    def needs_probe(self) -> bool:
+        """Whether the backends were never probed, or the install changed since they were."""
+        return len(self.backends) == 0 or self.probed_mtime != self.get_install_mtime()
+
+    def probe_backends(self) -> None:
+        """Find out which backends of this install work, what they accept and how fast they start.
+
+        mlint is launched on an empty file. MATLAB takes seconds to start, so it is only launched
+        when mlint does not work; otherwise it is recorded as available without a measured cold
+        start, which ranks it after mlint.
+        """
+        logger = logging.getLogger(__name__)
+        mlint = probe_mlint(self.get_mlint_handle().exe_path)
+        matlab = BackendCapabilities(
+            MATLAB_BACKEND, available=self.is_valid(), flags=self.get_checkcode_flags()
+        )
+        if matlab.available and not mlint.available:
+            try:
+                start = time.perf_counter()
+                _, return_code = self.run("quit")
+                matlab.cold_start_seconds = time.perf_counter() - start
+                matlab.available = ReturnCode.OK == return_code
+            except OSError as err:
+                logger.warning(f"Unable to launch MATLAB at {self.exe_path}: {err}")
+                matlab.available = False
+
+        self.backends = {b.name: b for b in (mlint, matlab)}
+        self.probed_mtime = self.get_install_mtime()
+        for backend in self.backends.values():
+            logger.info(
+                f"Probed the {backend.name} backend of {self.home_path}: "
+                f"available={backend.available}, cold start={backend.cold_start_seconds}, "
+                f"flags={backend.flags}"
+            )
+
+    def benchmark_backends(self, repeats: int = BENCHMARK_REPEATS) -> None:
+        """Lint the sample corpus with each available backend, recording how fast it is.
+
+        The cold and warm latency, startup overhead and throughput are kept with the probe results.
+
+        The backends are probed first if they need to be. A backend that fails to lint the corpus
+        keeps no benchmark.
+        """
+        logger = logging.getLogger(__name__)
+        if self.needs_probe():
+            self.probe_backends()
+
+        options = LinterOptions(
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+        )
+        linters: Dict[str, Linter] = {MLINT_BACKEND: self.get_mlint_handle(), MATLAB_BACKEND: self}
+        with TemporaryDirectory() as folder:
+            filepaths = write_sample_corpus(Path(folder))
+            empty_file = Path(folder) / "empty.m"
+            empty_file.write_text("")
+            for name, backend in self.backends.items():
+                linter = linters.get(name)
+                backend.benchmark = None
+                if linter is None or not backend.available:
+                    continue
+                logger.info(f"Benchmarking the {name} backend of {self.home_path}")
+                try:
+                    backend.benchmark = benchmark_linter(
+                        partial(linter.lint, options=options), filepaths, empty_file, repeats
+                    )
+                except (OSError, ValueError, KeyError, TypeError, IndexError) as err:
+                    logger.warning(
+                        f"Unable to benchmark the {name} backend of {self.home_path}: {err}"
+                    )
+
+    def select_backend(self, options: LinterOptions) -> str:
+        """Return the fastest backend that works and accepts the options, from the probe results.
+
+        Handles that were never probed use mlint if it exists. If no probed backend fits, MATLAB is
+        tried anyway.
+        """
+        if len(self.backends) == 0:
+            return MLINT_BACKEND if self.get_mlint_handle().is_valid() else MATLAB_BACKEND
+
+        required_flags = {
+            flag_name(a)
+            for a in MLintHandle.construct_command_arguments(filepaths=[], options=options)
+        }
+        return select_backend(self.backends, required_flags) or MATLAB_BACKEND
+
+    @staticmethod
+    def get_checkcode_flags() -> List[str]:
+        """Return the option names that checkcode accepts in every MATLAB release."""
+        return sorted({flag_name(f) for f in CHECKCODE_FLAGS})
+
     def is_initialized(self) -> bool:
         return self.is_valid() and len(self.version) > 0 and len(self.release) > 0
 
     def is_valid(self) -> bool:
         return self.exe_path.exists() and self.exe_path.is_file()
 
-    def run(self, matlab_command: str) -> Tuple[str, ReturnCode]:
+    def run(
+        self,
+        matlab_command: str,
+        slot_pool: Optional[ProcessSlotPool] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[str, ReturnCode]:
         """Run a MATLAB command through this MATLAB instance.
 
         Parameters
         ----------
         matlab_command: str
                             A single-line MATLAB command string
+        slot_pool: ProcessSlotPool, optional
+                            The pool limiting concurrent MATLAB processes. Defaults to
+                            ProcessSlotPool.for_matlab().
+        timeout: float, optional
+                            Seconds after which MATLAB is killed and the command fails
 
         Returns
         -------
@@ -202,9 +408,14 @@ class MatlabHandle(Linter):
         return_code = ReturnCode.FAIL
         if self.is_valid():
             command: List[str] = self._construct_command(matlab_command)
+            if slot_pool is None:
+                slot_pool = ProcessSlotPool.for_matlab()
 
             try:
-                completed_process = subprocess.run(command, text=True, capture_output=True)
+                with slot_pool.slot():
+                    completed_process = subprocess.run(
+                        command, text=True, capture_output=True, timeout=timeout
+                    )
                 completed_process.check_returncode()
 
                 stdout = completed_process.stdout
@@ -213,6 +424,10 @@ class MatlabHandle(Linter):
                 print(f"Failed to run MATLAB command '{matlab_command}': {str(err)}")
         return stdout, return_code
 
+    def get_worker_command(self) -> List[str]:
+        """Return the command line that starts this MATLAB as a persistent checkcode worker."""
+        return self._construct_command(construct_matlab_worker_script())
+
     def _construct_command(self, matlab_command: str) -> List[str]:
         """Construct the command-line command to execute the MATLAB command."""
         major, minor = self._parse_version_string()
@@ -292,8 +507,6 @@ class MatlabHandle(Linter):
         return version, release, return_code
 
     def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
-        linter_reports: List[LinterReport] = []
-
         matlab_script: str = construct_matlab_script(
             filepaths,
             options.fail_warnings,
@@ -306,20 +519,35 @@ class MatlabHandle(Linter):
 
         logger = logging.getLogger(__name__)
         logger.info("Validating MATLAB files using %s", self.exe_path)
-        stdout, return_code = self.run(matlab_script)
+        stdout, return_code = self.run(
+            matlab_script,
+            ProcessSlotPool.for_matlab(options.max_matlab_processes),
+            options.get_seconds_left(),
+        )
+        if ReturnCode.FAIL == return_code and options.deadline_passed():
+            # MATLAB was killed at the deadline, so its output is cut short
+            raise DeadlineExceeded()
 
         checkcode_data = json.loads(stdout)
 
+        return self.reports_from_checkcode(checkcode_data, filepaths)
+
+    @classmethod
+    def reports_from_checkcode(
+        cls, checkcode_data: Any, filepaths: List[Path]
+    ) -> List[LinterReport]:
+        """Convert the decoded JSON output of checkcode(..., '-struct') into one report per file."""
+        linter_reports: List[LinterReport] = []
         if len(filepaths) == 1:
             this_report = LinterReport(source_file=filepaths[0])
-            this_report.records.extend(self._records_from_issues(checkcode_data))
+            this_report.records.extend(cls._records_from_issues(checkcode_data))
 
             linter_reports.append(this_report)
         else:
             for index, this_file in enumerate(filepaths):
                 this_report = LinterReport(source_file=this_file)
                 this_linter_results = checkcode_data[index]
-                this_report.records.extend(self._records_from_issues(this_linter_results))
+                this_report.records.extend(cls._records_from_issues(this_linter_results))
 
                 linter_reports.append(this_report)
 
@@ -336,7 +564,10 @@ class MatlabHandle(Linter):
         return release, version
 
     @staticmethod
-    def _records_from_issues(issues: List[Dict[str, Any]]) -> List[LinterRecord]:
+    def _records_from_issues(issues: "List[Dict[str, Any]] | Dict[str, Any]") -> List[LinterRecord]:
+        if isinstance(issues, dict):
+            # jsonencode writes a single issue as an object rather than a one-element array
+            issues = [issues]
         return [
             LinterRecord(
                 id=issue["id"],
@@ -347,11 +578,12 @@ class MatlabHandle(Linter):
             for issue in issues
         ]
 
-    def to_dict(self) -> Dict[str, str]:
-        output: Dict[str, str] = asdict(self)
+    def to_dict(self) -> Dict[str, Any]:
+        output: Dict[str, Any] = asdict(self)
         for _, (key, value) in enumerate(output.items()):
             if isinstance(value, Path):
                 output[key] = str(value)
+        output["backends"] = [b.to_dict() for b in self.backends.values()]
         return output
 
     def refresh(self) -> None:
@@ -405,12 +637,15 @@ class MatlabHandle(Linter):
         return version, release
 
     @classmethod
-    def from_dict(cls, input_dict: Dict[str, str]) -> "MatlabHandle":
+    def from_dict(cls, input_dict: Dict[str, Any]) -> "MatlabHandle":
         home_path = Path(input_dict.get("home_path", "")).absolute()
         exe_path = Path(input_dict.get("exe_path", "")).absolute()
         base_exe_path = Path(input_dict.get("base_exe_path", "")).absolute()
         version = input_dict.get("version", "")
         release = input_dict.get("release", "")
+        # Older cache files hold no probe results, so their handles are probed again on first use
+        probed_mtime = int(input_dict.get("probed_mtime") or 0)
+        backends = [BackendCapabilities.from_dict(b) for b in input_dict.get("backends") or []]
 
         return MatlabHandle(
             home_path=home_path,
@@ -418,6 +653,8 @@ class MatlabHandle(Linter):
             base_exe_path=base_exe_path,
             version=version,
             release=release,
+            probed_mtime=probed_mtime,
+            backends={b.name: b for b in backends},
         )
 
     @classmethod
@@ -435,22 +672,27 @@ class MatlabHandle(Linter):
 
 class MatlabHandleList:
     handles: List[MatlabHandle]
+    search_roots: Dict[str, int]
     cache_file: Path
     has_changes: bool
     _logger: logging.Logger
+    _lock: FileLock
 
     def __init__(self, cache_file: Optional[Path] = None, logger: Optional[logging.Logger] = None):
         self.handles = []
+        # Maps each scanned search root to its modification time (in ns) at the time it was scanned
+        self.search_roots = {}
         if cache_file:
             self.cache_file = cache_file
         else:
-            self.cache_file = Path(Path.home(), ".pre-commit-matlab-lint.matlab-info-cache.yaml")
+            self.cache_file = get_state_file("matlab-info-cache.yaml")
 
         self.has_changes = False
         if logger:
             self._logger = logger
         else:
             self._logger = logging.getLogger(__name__)
+        self._lock = FileLock(get_lock_file(self.cache_file))
 
     def __len__(self) -> int:
         return len(self.handles)
@@ -458,25 +700,53 @@ class MatlabHandleList:
     def set_logger(self, logger: logging.Logger):
         self._logger = logger
 
+    def lock(self) -> FileLock:
+        """Return the lock that serializes updates to the cache file between processes.
+
+        Holding it around load(), update() and save() keeps parallel hook processes from repeating
+        the same work. Reading the cache file does not need it.
+        """
+        return self._lock
+
     def save(self) -> None:
         if self.has_changes:
-            data: List[Dict[str, str]] = [h.to_dict() for h in self.handles]
+            data: Dict[str, Any] = {
+                "handles": [h.to_dict() for h in self.handles],
+                "search_roots": dict(self.search_roots),
+            }
 
-            with self.cache_file.open("w") as f:
+            with self._lock:
                 self._logger.debug(f"Saving MATLAB handle list to {self.cache_file}")
-                yaml.safe_dump(data, f)
+                # Readers never take the lock, so the file is replaced in one step rather than
+                # rewritten in place
+                atomic_write_text(self.cache_file, yaml.safe_dump(data))
                 self.has_changes = False
 
     def load(self) -> None:
         if self.cache_file.exists():
             self._logger.debug(f"Cache file {self.cache_file} exists.")
             self.clear()
-            with self.cache_file.open("r") as f:
-                data = yaml.safe_load(f)
-                for element in data:
+            try:
+                with self.cache_file.open("r") as f:
+                    data = yaml.safe_load(f)
+            except (OSError, yaml.YAMLError) as err:
+                self._logger.warning(f"Unable to read the cache file {self.cache_file}: {err}")
+                data = None
+
+            if data is not None:
+                # Older cache files hold a bare list of handles and no search root information
+                if isinstance(data, dict):
+                    handle_data = data.get("handles") or []
+                    self.search_roots = {
+                        str(root): int(mtime)
+                        for root, mtime in (data.get("search_roots") or {}).items()
+                    }
+                else:
+                    handle_data = data
+                for element in handle_data:
                     self.append(MatlabHandle.from_dict(element))
 
-                self.has_changes = False
+            self.has_changes = False
 
     def update(self, search_list: "List[Path] | MatlabHandleList") -> None:
         """Add handles to new MATLAB installs"""
@@ -495,9 +765,86 @@ class MatlabHandleList:
                 )
                 self.append(handle)
 
-    def prune(self) -> None:
-        """Remove handles to MATLAB installs that no longer exist on the machine"""
-        remove_list: List[MatlabHandle] = [h for h in self.handles if not h.is_valid()]
+    def probe(self, handle: MatlabHandle) -> MatlabHandle:
+        """Probe the backends of a handle and save the results, unless another process just did.
+
+        Returns
+        -------
+        MatlabHandle
+                    The cached handle for the same install, holding the probe results
+        """
+        with self._lock:
+            self.load()
+            cached_handle = self.find_home_path(handle.home_path)
+            if cached_handle is None:
+                cached_handle = handle
+                self.append(cached_handle)
+            if cached_handle.needs_probe():
+                cached_handle.probe_backends()
+                self.has_changes = True
+            self.save()
+        return cached_handle
+
+    def benchmark(self, handle: MatlabHandle, repeats: int = BENCHMARK_REPEATS) -> MatlabHandle:
+        """Benchmark the backends of a handle and save the results with its cached handle.
+
+        The cache file is only locked to save the results, as benchmarking MATLAB takes a while.
+
+        Returns
+        -------
+        MatlabHandle
+                    The cached handle for the same install, holding the benchmark results
+        """
+        handle.benchmark_backends(repeats)
+        with self._lock:
+            self.load()
+            cached_handle = self.find_home_path(handle.home_path)
+            if cached_handle is None:
+                cached_handle = handle
+                self.append(cached_handle)
+            cached_handle.backends = handle.backends
+            cached_handle.probed_mtime = handle.probed_mtime
+            self.has_changes = True
+            self.save()
+        return cached_handle
+
+    def find_stale_search_roots(self, current_mtimes: Dict[str, Optional[int]]) -> List[str]:
+        """Return the search roots whose modification time changed since they were last scanned.
+
+        Parameters
+        ----------
+        current_mtimes: dict
+                            Maps each search root to its current modification time in ns, or None if
+                            it is absent
+
+        Returns
+        -------
+        list of str
+        """
+        return [
+            root for root, mtime in current_mtimes.items() if self.search_roots.get(root) != mtime
+        ]
+
+    def set_search_root_mtime(self, root: str, mtime: Optional[int]) -> None:
+        if mtime is None:
+            self.search_roots.pop(root, None)
+        else:
+            self.search_roots[root] = mtime
+        self.has_changes = True
+
+    def prune(self, roots: Optional[List[Path]] = None) -> None:
+        """Remove handles to MATLAB installs that no longer exist on the machine
+
+        Parameters
+        ----------
+        roots: list of Path, optional
+                            Only check the handles whose home path lies directly under one of these
+                            folders
+        """
+        candidates: List[MatlabHandle] = self.handles
+        if roots is not None:
+            candidates = [h for h in self.handles if h.home_path.parent in roots]
+        remove_list: List[MatlabHandle] = [h for h in candidates if not h.is_valid()]
         if len(remove_list) > 0:
             self.has_changes = True
 
@@ -521,6 +868,7 @@ class MatlabHandleList:
 
     def clear(self) -> None:
         self.handles.clear()
+        self.search_roots.clear()
 
     def find_release(self, release_name: str) -> Optional[MatlabHandle]:
         """Find the path to a MATLAB executable specified by the release name (e.g. R2021a).
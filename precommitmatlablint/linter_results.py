@@ -1,7 +1,16 @@
 import re
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List
+
+# The McCabe cyclomaticity IDs are informational and do not fail a lint
+ALLOWED_MCCABE_IDS = {"CABE", "MCABE"}
+# Given to a file the linter returned no report for, so that the file fails instead of passing
+MISSING_REPORT_ID = "NOREPORT"
+# The position part of an mlint message, e.g. 'L 12 (C 5-8)'
+MLINT_POSITION_PATTERN = re.compile(
+    r"L\s*(?P<line>\d+)\s*\(C\s*(?P<column_min>\d+)(\-(?P<column_max>\d+)\))?"
+)
 
 
 @dataclass(frozen=True)
@@ -20,6 +29,26 @@ class LinterRecord:
 
         return f"Line {self.line}{column_text}: {self.id}: {self.message}"
 
+    def is_failure(self) -> bool:
+        return self.id not in ALLOWED_MCCABE_IDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "message": self.message,
+            "line": self.line,
+            "columns": list(self.columns),
+        }
+
+    @classmethod
+    def from_dict(cls, input_dict: Dict[str, Any]) -> "LinterRecord":
+        return LinterRecord(
+            id=input_dict.get("id", ""),
+            message=input_dict.get("message", ""),
+            line=int(input_dict.get("line", 0)),
+            columns=[int(c) for c in input_dict.get("columns", [])],
+        )
+
     @classmethod
     def from_mlint(cls, mlint_message: str) -> "LinterRecord":
         mlint_elements = mlint_message.split(":", maxsplit=2)
@@ -27,10 +56,7 @@ class LinterRecord:
         line_and_column = mlint_elements[0] if len(mlint_elements) > 0 else ""
         id: str = mlint_elements[1].strip() if len(mlint_elements) > 1 else ""
         message: str = mlint_elements[2].strip() if len(mlint_elements) > 2 else ""
-        match = re.match(
-            pattern=r".*L\s*(?P<line>\d+)\s*\(C\s*(?P<column_min>\d+)(\-(?P<column_max>\d+)\))?",
-            string=line_and_column,
-        )
+        match = MLINT_POSITION_PATTERN.search(line_and_column)
         line: int = 0
         columns: List[int] = []
         if match:
@@ -52,5 +78,33 @@ class LinterReport:
     source_file: Path = Path()
     records: List[LinterRecord] = field(default_factory=list)
 
+    @classmethod
+    def missing(cls, source_file: Path) -> "LinterReport":
+        """Return a failing report for a file the linter returned no report for."""
+        record = LinterRecord(
+            id=MISSING_REPORT_ID, message="The linter returned no report for this file."
+        )
+        return LinterReport(source_file=source_file, records=[record])
+
+    def is_missing(self) -> bool:
+        """Return whether this is the failing report of a file the linter returned no report for."""
+        return any(record.id == MISSING_REPORT_ID for record in self.records)
+
     def has_records(self) -> bool:
         return bool(self.records)
+
+    def has_failures(self) -> bool:
+        return any(record.is_failure() for record in self.records)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source_file": str(self.source_file),
+            "records": [record.to_dict() for record in self.records],
+        }
+
+    @classmethod
+    def from_dict(cls, input_dict: Dict[str, Any]) -> "LinterReport":
+        return LinterReport(
+            source_file=Path(input_dict.get("source_file", "")),
+            records=[LinterRecord.from_dict(r) for r in input_dict.get("records", [])],
+        )
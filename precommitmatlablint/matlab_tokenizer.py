@@ -0,0 +1,206 @@
+import re
+from enum import Enum
+from typing import Iterator, NamedTuple
+
+KEYWORDS = frozenset(
+    {
+        "break",
+        "case",
+        "catch",
+        "classdef",
+        "continue",
+        "else",
+        "elseif",
+        "end",
+        "for",
+        "function",
+        "global",
+        "if",
+        "otherwise",
+        "parfor",
+        "persistent",
+        "return",
+        "spmd",
+        "switch",
+        "try",
+        "while",
+    }
+)
+
+
+class TokenKind(Enum):
+    IDENTIFIER = "identifier"
+    KEYWORD = "keyword"
+    NUMBER = "number"
+    STRING = "string"
+    OPERATOR = "operator"
+    OPEN = "open"
+    CLOSE = "close"
+    COMMENT = "comment"
+    CONTINUATION = "continuation"
+    NEWLINE = "newline"
+    # The arguments of a command syntax call such as 'hold on', which are plain text rather than
+    # code
+    COMMAND_TEXT = "command_text"
+    UNTERMINATED_STRING = "unterminated_string"
+    INVALID = "invalid"
+
+
+CODE_KINDS = frozenset(
+    set(TokenKind) - {TokenKind.COMMENT, TokenKind.CONTINUATION, TokenKind.NEWLINE}
+)
+# Tokens after which a quote separated by whitespace may still be a transpose operator
+VALUE_KINDS = frozenset({TokenKind.IDENTIFIER, TokenKind.NUMBER, TokenKind.STRING, TokenKind.CLOSE})
+
+
+class Token(NamedTuple):
+    kind: TokenKind
+    text: str
+    line: int
+    column: int
+
+
+# Leading whitespace is consumed along with each token, so it costs no separate match. A quote
+# directly after a value is a transpose; anywhere else it starts a character vector.
+TOKEN_PATTERN = re.compile(
+    r"""
+    [ \t\f\v\r]*
+    (?:
+      (?P<identifier>[A-Za-z][A-Za-z0-9_]*)
+    | (?P<newline>\n)
+    | (?P<comment>%[^\n]*)
+    | (?P<continuation>\.\.\.[^\n]*)
+    | (?P<number>0[xX][0-9A-Fa-f]+(?:[us](?:8|16|32|64))?|0[bB][01]+(?:[us](?:8|16|32|64))?
+        |(?:\d+\.?\d*|\.\d+)(?:[eEdD][+-]?\d+)?[ij]?)
+    | (?P<transpose>(?<=[A-Za-z0-9_)\]}'".])')
+    | (?P<string>'(?:[^'\n]|'')*'|"(?:[^"\n]|"")*")
+    | (?P<unterminated_string>['"][^\n]*)
+    | (?P<operator>==|~=|!=|<=|>=|&&|\|\||\.[*/\\^']|[-+*/\\^<>=&|~:,;.@?])
+    | (?P<open>[(\[{])
+    | (?P<close>[)\]}])
+    | (?P<end_of_text>\Z)
+    | (?P<invalid>.)
+    )
+    """,
+    re.VERBOSE,
+)
+GROUP_KINDS = {
+    "newline": TokenKind.NEWLINE,
+    "comment": TokenKind.COMMENT,
+    "continuation": TokenKind.CONTINUATION,
+    "number": TokenKind.NUMBER,
+    "identifier": TokenKind.IDENTIFIER,
+    "transpose": TokenKind.OPERATOR,
+    "string": TokenKind.STRING,
+    "unterminated_string": TokenKind.UNTERMINATED_STRING,
+    "operator": TokenKind.OPERATOR,
+    "open": TokenKind.OPEN,
+    "close": TokenKind.CLOSE,
+    "invalid": TokenKind.INVALID,
+}
+BLOCK_COMMENT_START = re.compile(r"%\{[ \t\f\v\r]*$")
+BLOCK_COMMENT_LINE = re.compile(r"^[ \t\f\v\r]*%([{}])[ \t\f\v\r]*$", re.MULTILINE)
+# After 'name ', these start an expression rather than command syntax arguments
+COMMAND_SYNTAX_EXCLUDED = re.compile(
+    r"=[^=]|\(|[-+*/\\^<>=&|~:.][ \t]|==|~=|<=|>=|&&|\|\||\.\.\.|$|[,;%\n]"
+)
+COMMAND_SYNTAX_TEXT = re.compile(r"[ \t]+(?:[^,;%'\n]|'[^'\n]*')*")
+
+
+def tokenize(text: str) -> Iterator[Token]:
+    """Split MATLAB source into tokens with a single precompiled pattern.
+
+    Whitespace is dropped and a block comment is returned as a single COMMENT token. Characters that
+    cannot appear in MATLAB code are returned as INVALID tokens rather than raising errors, so the
+    caller decides what to report.
+    """
+    match_token = TOKEN_PATTERN.match
+    # Builds tokens without going through the Python-level NamedTuple constructor
+    new_token = tuple.__new__
+    position = 0
+    line = 1
+    line_start = 0
+    bracket_depth = 0
+    statement_start = True
+    previous_kind = TokenKind.NEWLINE
+    previous_text = ""
+    while True:
+        match = match_token(text, position)
+        group = match.lastgroup
+        if group == "end_of_text":
+            return
+        start, position = match.span(group)
+        token_text = text[start:position]
+        kind = GROUP_KINDS[group]
+
+        if kind is TokenKind.NEWLINE:
+            yield new_token(Token, (kind, token_text, line, start - line_start + 1))
+            line += 1
+            line_start = position
+            statement_start = bracket_depth == 0 and previous_kind is not TokenKind.CONTINUATION
+            previous_kind = kind
+            continue
+
+        if kind is TokenKind.IDENTIFIER:
+            if token_text in KEYWORDS and previous_text != ".":
+                kind = TokenKind.KEYWORD
+        elif kind is TokenKind.OPEN:
+            bracket_depth += 1
+        elif kind is TokenKind.CLOSE:
+            bracket_depth = max(bracket_depth - 1, 0)
+        elif kind is TokenKind.COMMENT:
+            if previous_kind is TokenKind.NEWLINE and BLOCK_COMMENT_START.match(token_text):
+                position = _find_block_comment_end(text, position)
+                token_text = text[start:position]
+        elif kind is TokenKind.UNTERMINATED_STRING:
+            if token_text[0] == "'" and previous_kind in VALUE_KINDS and bracket_depth == 0:
+                # Outside brackets, "a '" is a transpose written with a space
+                kind = TokenKind.OPERATOR
+                token_text = "'"
+                position = start + 1
+        elif kind is TokenKind.INVALID and token_text == "!" and statement_start:
+            # A shell escape runs the rest of the line as an operating system command
+            kind = TokenKind.COMMAND_TEXT
+            position = text.find("\n", start)
+            position = len(text) if position < 0 else position
+            token_text = text[start:position]
+
+        yield new_token(Token, (kind, token_text, line, start - line_start + 1))
+        if kind is TokenKind.COMMENT and "\n" in token_text:
+            line += token_text.count("\n")
+            line_start = start + token_text.rfind("\n") + 1
+
+        if statement_start and kind is TokenKind.IDENTIFIER and bracket_depth == 0:
+            command_text = _match_command_syntax(text, position)
+            if command_text:
+                yield Token(TokenKind.COMMAND_TEXT, command_text, line, position - line_start + 1)
+                position += len(command_text)
+        statement_start = bracket_depth == 0 and (token_text == "," or token_text == ";")
+        previous_kind = kind
+        previous_text = token_text
+
+
+def _find_block_comment_end(text: str, position: int) -> int:
+    """Return the end of the line closing a block comment whose opening line ends at position."""
+    depth = 1
+    for line_match in BLOCK_COMMENT_LINE.finditer(text, position):
+        depth += 1 if line_match.group(1) == "{" else -1
+        if depth == 0:
+            return line_match.end()
+    # An unclosed block comment runs to the end of the file
+    return len(text)
+
+
+def _match_command_syntax(text: str, position: int) -> str:
+    """Return the rest of the statement if its first identifier is used with command syntax."""
+    if position >= len(text) or text[position] not in " \t":
+        return ""
+    argument_start = position
+    while argument_start < len(text) and text[argument_start] in " \t":
+        argument_start += 1
+    if COMMAND_SYNTAX_EXCLUDED.match(text, argument_start):
+        return ""
+    # Command arguments run to the end of the line, or to a comma, semicolon or comment outside
+    # quotes
+    command_match = COMMAND_SYNTAX_TEXT.match(text, position)
+    return command_match.group() if command_match else ""
@@ -0,0 +1,417 @@
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, List, Optional
+
+from precommitmatlablint.file_lock import FileLock
+from precommitmatlablint.linter_handle import DeadlineExceeded, Linter, LinterOptions, MatlabHandle
+from precommitmatlablint.linter_results import LinterReport
+from precommitmatlablint.process_slots import ProcessSlotPool
+from precommitmatlablint.utility import (
+    WORKER_ERROR_PREFIX,
+    WORKER_QUIT_REQUEST,
+    WORKER_RESULT_PREFIX,
+    construct_checkcode_arguments,
+)
+
+DEFAULT_MAX_JOBS_PER_WORKER = 200
+DEFAULT_WORKER_BATCH_SIZE = 25
+DEFAULT_JOB_TIMEOUT = 600.0
+
+
+class MatlabWorkerError(RuntimeError):
+    """Raised when a MATLAB worker crashes, hangs or cannot serve a request."""
+
+
+class MatlabWorker:
+    """A MATLAB process kept running to serve checkcode requests sent over its stdin.
+
+    The request/reply protocol is described in utility.construct_matlab_worker_script().
+    """
+
+    command: List[str]
+    jobs_completed: int
+    baseline_memory: Optional[int]
+    _process: Optional["subprocess.Popen[str]"]
+    _slot: Optional[FileLock]
+
+    def __init__(self, command: List[str], slot: Optional[FileLock] = None):
+        """
+        Parameters
+        ----------
+        command: list of str
+                    The command line that starts the worker
+        slot: FileLock, optional
+                    A process slot held for the worker's lifetime, released when it stops
+        """
+        self.command = command
+        self.jobs_completed = 0
+        self.baseline_memory = None
+        self._process = None
+        self._slot = slot
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def start(self) -> None:
+        """Launch the worker process without waiting for MATLAB to finish starting up."""
+        self._process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def run_job(self, arguments: List[str], timeout: float = DEFAULT_JOB_TIMEOUT) -> Any:
+        """Send one checkcode request and return its decoded JSON result.
+
+        Parameters
+        ----------
+        arguments: list of str
+                        The arguments to pass to checkcode, including file paths
+        timeout: float
+                        Seconds to wait for the reply before the worker is killed
+
+        Returns
+        -------
+        The decoded checkcode output
+        """
+        process = self._process
+        if (
+            process is None
+            or process.stdin is None
+            or process.stdout is None
+            or not self.is_alive()
+        ):
+            raise MatlabWorkerError("The MATLAB worker is not running")
+
+        watchdog = threading.Timer(timeout, process.kill)
+        watchdog.start()
+        try:
+            process.stdin.write(json.dumps(arguments) + "\n")
+            process.stdin.flush()
+            while True:
+                line = process.stdout.readline()
+                if not line:
+                    raise MatlabWorkerError(
+                        f"The MATLAB worker exited with code {process.poll()} before replying"
+                    )
+                if line.startswith(WORKER_RESULT_PREFIX):
+                    result = json.loads(line[len(WORKER_RESULT_PREFIX) :])
+                    break
+                if line.startswith(WORKER_ERROR_PREFIX):
+                    raise MatlabWorkerError(line[len(WORKER_ERROR_PREFIX) :].strip())
+        except OSError as err:
+            raise MatlabWorkerError(f"Lost contact with the MATLAB worker: {err}") from err
+        finally:
+            watchdog.cancel()
+
+        self.jobs_completed += 1
+        if self.baseline_memory is None:
+            # Measure after the first job, once MATLAB has loaded what checkcode needs
+            self.baseline_memory = self.memory_usage()
+        return result
+
+    def memory_usage(self) -> Optional[int]:
+        """Return the worker's resident memory in bytes, where the platform makes that cheap."""
+        if self._process is None or not sys.platform.startswith("linux"):
+            return None
+        try:
+            with open(f"/proc/{self._process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+
+    def memory_growth(self) -> Optional[int]:
+        current = self.memory_usage()
+        if current is None or self.baseline_memory is None:
+            return None
+        return current - self.baseline_memory
+
+    def stop(self, timeout: float = 10.0) -> None:
+        process = self._process
+        if process is not None:
+            try:
+                if process.poll() is None and process.stdin is not None:
+                    process.stdin.write(WORKER_QUIT_REQUEST + "\n")
+                    process.stdin.flush()
+                    process.stdin.close()
+                process.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+                process.wait()
+            finally:
+                if process.stdout is not None:
+                    process.stdout.close()
+            self._process = None
+
+        if self._slot is not None:
+            self._slot.release()
+            self._slot = None
+
+
+class MatlabWorkerPool(Linter):
+    """A set of warm MATLAB workers that lint batches of files in parallel.
+
+    Workers are recycled after a number of jobs or once their memory has grown by a set amount, and
+    replaced if they crash. Each worker holds a MATLAB process slot for as long as it runs, so the
+    pool never exceeds the machine-wide MATLAB process limit; it starts fewer workers when slots are
+    not available.
+    """
+
+    worker_command: List[str]
+    size: int
+    max_jobs_per_worker: int
+    max_memory_growth: Optional[int]
+    batch_size: int
+    job_timeout: float
+    slot_pool: Optional[ProcessSlotPool]
+    _idle_workers: Deque[MatlabWorker]
+    _worker_count: int
+    _workers_changed: threading.Condition
+    _closed: bool
+    _warm_up_thread: Optional[threading.Thread]
+    _logger: logging.Logger
+
+    def __init__(
+        self,
+        worker_command: List[str],
+        size: int,
+        max_jobs_per_worker: int = DEFAULT_MAX_JOBS_PER_WORKER,
+        max_memory_growth: Optional[int] = None,
+        batch_size: int = DEFAULT_WORKER_BATCH_SIZE,
+        job_timeout: float = DEFAULT_JOB_TIMEOUT,
+        slot_pool: Optional[ProcessSlotPool] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        worker_command: list of str
+                            The command line that starts one worker
+        size: int
+                            The number of workers to keep running
+        max_jobs_per_worker: int
+                            Restart a worker after it has served this many jobs (0 for never)
+        max_memory_growth: int, optional
+                            Restart a worker once its resident memory grew by this many bytes since
+                            its first job
+        batch_size: int
+                            The maximum number of files sent to a worker in one job
+        job_timeout: float
+                            Seconds a worker may spend on one job before it is killed
+        slot_pool: ProcessSlotPool, optional
+                            The pool limiting concurrent MATLAB processes. No limit is applied if
+                            not supplied.
+        logger: logging.Logger, optional
+        """
+        self.worker_command = worker_command
+        self.size = max(size, 1)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_memory_growth = max_memory_growth
+        self.batch_size = max(batch_size, 1)
+        self.job_timeout = job_timeout
+        self.slot_pool = slot_pool
+        self._idle_workers = deque()
+        self._worker_count = 0
+        # Notified whenever a worker becomes idle, a worker is retired or the pool closes
+        self._workers_changed = threading.Condition()
+        self._closed = False
+        self._warm_up_thread = None
+        self._logger = logger if logger is not None else logging.getLogger(__name__)
+
+    @classmethod
+    def from_handle(cls, matlab_handle: MatlabHandle, size: int, **kwargs) -> "MatlabWorkerPool":
+        return cls(matlab_handle.get_worker_command(), size, **kwargs)
+
+    def __len__(self) -> int:
+        return self._worker_count
+
+    def warm_up(self) -> None:
+        """Start the workers now, so MATLAB's startup overlaps with the caller's work."""
+        while self._worker_count < self.size:
+            # Only the first worker may wait for a process slot; the others are started if slots are
+            # free
+            if not self._start_worker(blocking=self._worker_count == 0):
+                break
+
+    def warm_up_in_background(self) -> None:
+        """Start the workers from a background thread, so the caller does not wait for a slot.
+
+        Jobs wait for the warm-up to finish before they are handed out.
+        """
+
+        def warm_up() -> None:
+            try:
+                self.warm_up()
+            except OSError as err:
+                # The first job starts a worker again and reports the error
+                self._logger.warning(f"Unable to start a MATLAB worker in advance: {err}")
+
+        self._warm_up_thread = threading.Thread(target=warm_up, name="matlab-warm-up", daemon=True)
+        self._warm_up_thread.start()
+
+    def _wait_for_warm_up(self) -> None:
+        thread = self._warm_up_thread
+        if thread is not None:
+            thread.join()
+
+    def _start_worker(self, blocking: bool) -> bool:
+        slot: Optional[FileLock] = None
+        if self.slot_pool is not None and self.slot_pool.is_limited():
+            slot = self.slot_pool.acquire() if blocking else self.slot_pool.try_acquire()
+            if slot is None:
+                return False
+
+        worker = MatlabWorker(self.worker_command, slot)
+        try:
+            worker.start()
+        except OSError:
+            worker.stop()
+            raise
+        self._logger.debug(f"Started MATLAB worker {worker.pid}")
+        with self._workers_changed:
+            self._worker_count += 1
+            self._idle_workers.append(worker)
+            self._workers_changed.notify()
+        return True
+
+    def _retire_worker(self, worker: MatlabWorker) -> None:
+        self._logger.debug(
+            f"Stopping MATLAB worker {worker.pid} after {worker.jobs_completed} jobs"
+        )
+        worker.stop()
+        with self._workers_changed:
+            self._worker_count -= 1
+            # Jobs waiting for an idle worker start one themselves once none is left
+            self._workers_changed.notify_all()
+
+    def _needs_recycling(self, worker: MatlabWorker) -> bool:
+        if not worker.is_alive():
+            return True
+        if 0 < self.max_jobs_per_worker <= worker.jobs_completed:
+            return True
+        if self.max_memory_growth is not None:
+            growth = worker.memory_growth()
+            if growth is not None and growth > self.max_memory_growth:
+                return True
+        return False
+
+    def _checkout(self) -> MatlabWorker:
+        self._wait_for_warm_up()
+        while True:
+            with self._workers_changed:
+                self._workers_changed.wait_for(
+                    lambda: self._closed or self._idle_workers or self._worker_count == 0
+                )
+                if self._closed:
+                    raise MatlabWorkerError("The MATLAB worker pool is closed")
+                if self._idle_workers:
+                    return self._idle_workers.popleft()
+            self._start_worker(blocking=True)
+
+    def _checkin(self, worker: MatlabWorker) -> None:
+        if self._closed or self._needs_recycling(worker):
+            self._retire_worker(worker)
+            if not self._closed:
+                try:
+                    self._start_worker(blocking=True)
+                except OSError as err:
+                    # Raising here would hide the job's own error; the next job starts a worker
+                    # again if none is left, and reports the error
+                    self._logger.warning(f"Unable to replace MATLAB worker {worker.pid}: {err}")
+        else:
+            with self._workers_changed:
+                self._idle_workers.append(worker)
+                self._workers_changed.notify()
+
+    def run_job(self, arguments: List[str], options: Optional[LinterOptions] = None) -> Any:
+        """Run one checkcode request on the next idle worker, retrying once if the worker crashes.
+
+        A worker still busy at the deadline of options is killed, and DeadlineExceeded raised.
+        """
+        for attempt in range(2):
+            worker = self._checkout()
+            try:
+                seconds_left = options.get_seconds_left() if options is not None else None
+                timeout = (
+                    self.job_timeout
+                    if seconds_left is None
+                    else min(self.job_timeout, seconds_left)
+                )
+                return worker.run_job(arguments, timeout=timeout)
+            except MatlabWorkerError as err:
+                self._logger.warning(f"MATLAB worker {worker.pid} failed: {err}")
+                # Stop it so that _checkin() replaces it rather than handing it out again
+                worker.stop()
+                if options is not None and options.deadline_passed():
+                    # The worker was killed at the deadline rather than crashing, so it is not
+                    # retried
+                    raise DeadlineExceeded() from err
+                if attempt == 1:
+                    raise
+            finally:
+                deadline = options.deadline if options is not None else None
+                if deadline is not None and time.monotonic() >= deadline and not worker.is_alive():
+                    # A worker killed at the deadline is not replaced, as nothing more is linted
+                    self._retire_worker(worker)
+                else:
+                    self._checkin(worker)
+
+    def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
+        options_arguments: List[str] = construct_checkcode_arguments(
+            options.fail_warnings,
+            options.enable_cyc,
+            options.enable_mod_cyc,
+            options.ignore_ok_pragmas,
+            options.use_factory_default,
+            options.checkcode_config_file,
+        )
+        batches: List[List[Path]] = [
+            filepaths[index : index + self.batch_size]
+            for index in range(0, len(filepaths), self.batch_size)
+        ]
+
+        def lint_batch(batch: List[Path]) -> List[LinterReport]:
+            checkcode_data = self.run_job(options_arguments + [str(f) for f in batch], options)
+            return MatlabHandle.reports_from_checkcode(checkcode_data, batch)
+
+        self._wait_for_warm_up()
+        self.warm_up()
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            batch_reports = list(executor.map(lint_batch, batches))
+
+        return [report for reports in batch_reports for report in reports]
+
+    def close(self) -> None:
+        with self._workers_changed:
+            self._closed = True
+            self._workers_changed.notify_all()
+        self._wait_for_warm_up()
+        while True:
+            with self._workers_changed:
+                if not self._idle_workers:
+                    break
+                worker = self._idle_workers.popleft()
+            self._retire_worker(worker)
+
+    def __enter__(self) -> "MatlabWorkerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
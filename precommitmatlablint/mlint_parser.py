@@ -0,0 +1,151 @@
+import re
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Pattern, Sequence, Union
+
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+
+# One line of mlint output, with its line break: a 'L <line> (C <column>[-<column>]): <ID>:
+# <message>' record, a '===== <file path> =====' boundary between files, any other non-blank line,
+# or a blank line. As every line matches from its start, one scan of the whole buffer visits each
+# line once, without splitting it into lines first.
+MLINT_LINE_PATTERN = r"""
+    [ \t]*
+    (?:
+      L[ \t]*(\d+)[ \t]*\(C[ \t]*(\d+)(?:-(\d+))?\)
+      [ \t]*:[ \t]*([^\s:]*)[ \t]*(?::[ \t]*((?:[^\r\n]*[^\s])?))?
+    | ={3,}[ \t]*((?:[^\r\n]*[^\s=])?)[ \t]*={3,}
+    | ([^\s](?:[^\r\n]*[^\s])?)
+    |
+    )
+    [ \t]*\r?(?:\n|\Z)
+"""
+TEXT_PATTERN: Pattern[str] = re.compile(MLINT_LINE_PATTERN, re.VERBOSE)
+BYTES_PATTERN: Pattern[bytes] = re.compile(MLINT_LINE_PATTERN.encode("ascii"), re.VERBOSE)
+
+# mlint's output is read in chunks of this size while it runs
+STDERR_CHUNK_SIZE = 64 * 1024
+
+# A file boundary is yielded as the path of the file whose records follow
+MlintItem = Union[str, LinterRecord]
+
+
+def iter_mlint_output(
+    buffer: Union[str, bytes, bytearray, memoryview], encoding: str = "utf-8"
+) -> Iterator[MlintItem]:
+    """Scan mlint output in one pass, yielding each file boundary's path and each message's record.
+
+    Parameters
+    ----------
+    buffer: str or bytes-like
+                    The complete output, or complete lines of it. Bytes are only decoded field by
+                    field.
+    encoding: str
+                    The encoding of bytes output
+
+    Returns
+    -------
+    iterator of str or LinterRecord
+    """
+    if isinstance(buffer, str):
+        for line, column_min, column_max, record_id, message, file_path, other in map(
+            re.Match.groups, TEXT_PATTERN.finditer(buffer)
+        ):
+            if line is not None:
+                columns = (
+                    [int(column_min)] if column_max is None else [int(column_min), int(column_max)]
+                )
+                yield LinterRecord(record_id, message or "", int(line), columns)
+            elif file_path is not None:
+                yield file_path
+            elif other is not None:
+                # Lines of an unexpected form are parsed as leniently as before
+                yield LinterRecord.from_mlint(mlint_message=other)
+        return
+
+    for line, column_min, column_max, record_id, message, file_path, other in map(
+        re.Match.groups, BYTES_PATTERN.finditer(buffer)
+    ):
+        if line is not None:
+            columns = (
+                [int(column_min)] if column_max is None else [int(column_min), int(column_max)]
+            )
+            yield LinterRecord(
+                record_id.decode(encoding, errors="replace"),
+                message.decode(encoding, errors="replace") if message else "",
+                int(line),
+                columns,
+            )
+        elif file_path is not None:
+            yield file_path.decode(encoding, errors="replace")
+        elif other is not None:
+            yield LinterRecord.from_mlint(mlint_message=other.decode(encoding, errors="replace"))
+
+
+class MlintOutputParser:
+    """Parses mlint output as it arrives in chunks, holding back incomplete lines."""
+
+    encoding: str
+    _remainder: bytes
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self._remainder = b""
+
+    def feed(self, chunk: bytes) -> Iterator[MlintItem]:
+        """Parse the complete lines received so far."""
+        data = self._remainder + chunk if self._remainder else chunk
+        end = data.rfind(b"\n") + 1
+        self._remainder = data[end:]
+        if end > 0:
+            yield from iter_mlint_output(memoryview(data)[:end], self.encoding)
+
+    def close(self) -> Iterator[MlintItem]:
+        """Parse what is left once the output has ended."""
+        remainder, self._remainder = self._remainder, b""
+        if remainder:
+            yield from iter_mlint_output(remainder, self.encoding)
+
+
+def read_mlint_output(
+    stream: Optional[IO[bytes]], encoding: str = "utf-8", chunk_size: int = STDERR_CHUNK_SIZE
+) -> Iterator[MlintItem]:
+    """Parse mlint output from a stream while it is still being written, one chunk at a time."""
+    if stream is None:
+        return
+    parser = MlintOutputParser(encoding)
+    while True:
+        chunk = stream.read1(chunk_size) if hasattr(stream, "read1") else stream.read(chunk_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def iter_reports(items: Iterable[MlintItem], file_list: Sequence[Path]) -> Iterator[LinterReport]:
+    """Group parsed mlint output into one report per file, yielding each once the next begins.
+
+    mlint separates the output of several files by boundaries naming them; a single file's output
+    has none.
+    """
+    if len(file_list) == 0:
+        return
+    if len(file_list) == 1:
+        records = [item for item in items if isinstance(item, LinterRecord)]
+        yield LinterReport(source_file=file_list[0], records=records)
+        return
+
+    report: Optional[LinterReport] = None
+    for item in items:
+        if isinstance(item, str):
+            if report is not None:
+                yield report
+            report = LinterReport(source_file=Path(item))
+        elif report is not None:
+            report.records.append(item)
+    if report is not None:
+        yield report
+
+
+def build_reports(items: Iterable[MlintItem], file_list: Sequence[Path]) -> List[LinterReport]:
+    """Group parsed mlint output into one report per file."""
+    return list(iter_reports(items, file_list))
@@ -0,0 +1,354 @@
+import codecs
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.matlab_tokenizer import CODE_KINDS, Token, TokenKind, tokenize
+
+# Blocks closed by 'end'. Functions are special: in a file where no function uses 'end', none may.
+BLOCK_KEYWORDS = frozenset(
+    {"classdef", "for", "function", "if", "parfor", "spmd", "switch", "try", "while"}
+)
+# Section keywords that only open blocks directly inside a classdef
+CLASSDEF_SECTIONS = frozenset({"enumeration", "events", "methods", "properties"})
+ARGUMENTS_ATTRIBUTES = frozenset({"Input", "Output", "Repeating"})
+SECTION_WORDS = CLASSDEF_SECTIONS | {"arguments"}
+CLOSING_BRACKETS = {")": "(", "]": "[", "}": "{"}
+
+
+@dataclass
+class SourceFile:
+    """A MATLAB file as the pre-checks see it: its bytes, text and, lazily, tokens."""
+
+    path: Path
+    data: bytes
+    text: str
+    decode_error: Optional[UnicodeDecodeError] = None
+    _tokens: Optional[List[Token]] = None
+    _tokens_by_kind: Optional[Dict[TokenKind, List[Token]]] = None
+
+    @classmethod
+    def from_bytes(cls, path: Path, data: bytes) -> "SourceFile":
+        try:
+            return cls(path, data, data.decode("utf-8-sig"))
+        except UnicodeDecodeError as err:
+            return cls(path, data, data.decode("utf-8-sig", errors="replace"), decode_error=err)
+
+    @classmethod
+    def read(cls, path: Path) -> "SourceFile":
+        return cls.from_bytes(path, path.read_bytes())
+
+    @property
+    def tokens(self) -> List[Token]:
+        if self._tokens is None:
+            self._tokens = list(tokenize(self.text))
+        return self._tokens
+
+    def tokens_of(self, kind: TokenKind) -> List[Token]:
+        if self._tokens_by_kind is None:
+            self._tokens_by_kind = {}
+            for token in self.tokens:
+                self._tokens_by_kind.setdefault(token.kind, []).append(token)
+        return self._tokens_by_kind.get(kind, [])
+
+    def has_code(self) -> bool:
+        """Whether the file holds anything but comments and blank lines."""
+        return any(len(self.tokens_of(kind)) > 0 for kind in CODE_KINDS)
+
+
+class PrecheckRule(ABC):
+    """One cheap check run in-process before mlint.
+
+    Rules that look for problems mlint reports too set covered_by_mlint; their records are definite
+    errors that let fast-feedback mode skip mlint, and are otherwise replaced by mlint's own
+    records.
+    """
+
+    id: str = ""
+    covered_by_mlint: bool = True
+
+    @abstractmethod
+    def check(self, source: SourceFile) -> Iterable[LinterRecord]:
+        """Return the records of the problems found in a file."""
+
+    def record(self, message: str, line: int, column: int = 0) -> LinterRecord:
+        return LinterRecord(
+            id=self.id, message=message, line=line, columns=[column] if column > 0 else []
+        )
+
+
+class ByteOrderMarkRule(PrecheckRule):
+    id = "PREBOM"
+    covered_by_mlint = False
+
+    def check(self, source: SourceFile) -> Iterable[LinterRecord]:
+        if source.data.startswith(codecs.BOM_UTF8):
+            yield self.record(
+                "The file starts with a UTF-8 byte order mark, which some MATLAB releases misread.",
+                1,
+            )
+
+
+class EncodingRule(PrecheckRule):
+    id = "PREENC"
+    covered_by_mlint = False
+
+    def check(self, source: SourceFile) -> Iterable[LinterRecord]:
+        if source.decode_error is not None:
+            line = source.data.count(b"\n", 0, source.decode_error.start) + 1
+            yield self.record(f"The file is not valid UTF-8 ({source.decode_error.reason}).", line)
+
+
+class InvalidCharacterRule(PrecheckRule):
+    id = "PRECHR"
+
+    def check(self, source: SourceFile) -> Iterable[LinterRecord]:
+        for token in source.tokens_of(TokenKind.INVALID):
+            yield self.record(f"Invalid character '{token.text}'.", token.line, token.column)
+
+
+class UnterminatedStringRule(PrecheckRule):
+    id = "PRESTR"
+
+    def check(self, source: SourceFile) -> Iterable[LinterRecord]:
+        for token in source.tokens_of(TokenKind.UNTERMINATED_STRING):
+            yield self.record("The string is not terminated.", token.line, token.column)
+
+
+class BracketRule(PrecheckRule):
+    id = "PREBRK"
+
+    def check(self, source: SourceFile) -> Iterable[LinterRecord]:
+        stack: List[Token] = []
+        if not source.tokens_of(TokenKind.OPEN) and not source.tokens_of(TokenKind.CLOSE):
+            return
+        for token in source.tokens:
+            if token.kind is TokenKind.OPEN:
+                stack.append(token)
+            elif token.kind is TokenKind.CLOSE:
+                if not stack or stack[-1].text != CLOSING_BRACKETS[token.text]:
+                    yield self.record(f"Unexpected '{token.text}'.", token.line, token.column)
+                    return
+                stack.pop()
+        if stack:
+            yield self.record(
+                f"'{stack[-1].text}' is not closed.", stack[-1].line, stack[-1].column
+            )
+
+
+class BlockEndRule(PrecheckRule):
+    id = "PREEND"
+
+    def check(self, source: SourceFile) -> Iterable[LinterRecord]:
+        tokens = source.tokens
+        stack: List[Token] = []
+        function_count = 0
+        function_ends = 0
+        bracket_depth = 0
+        for index, token in enumerate(tokens):
+            kind = token.kind
+            if kind is TokenKind.OPEN:
+                bracket_depth += 1
+            elif kind is TokenKind.CLOSE:
+                bracket_depth = max(bracket_depth - 1, 0)
+            elif bracket_depth > 0:
+                continue
+            elif kind is TokenKind.KEYWORD:
+                if token.text in BLOCK_KEYWORDS:
+                    stack.append(token)
+                    function_count += token.text == "function"
+                elif token.text == "end":
+                    if not stack:
+                        yield self.record(
+                            "'end' does not close any block.", token.line, token.column
+                        )
+                        return
+                    function_ends += stack.pop().text == "function"
+            elif kind is TokenKind.IDENTIFIER and token.text in SECTION_WORDS:
+                if self._opens_section(tokens, index, stack):
+                    stack.append(token)
+
+        unclosed = [t for t in stack if t.text != "function"]
+        if unclosed:
+            token = unclosed[-1]
+            yield self.record(f"'{token.text}' is not closed by 'end'.", token.line, token.column)
+        elif function_ends > 0 and function_ends != function_count:
+            token = stack[-1]
+            yield self.record(
+                "If any function in a file is closed by 'end', all functions must be.",
+                token.line,
+                token.column,
+            )
+
+    @staticmethod
+    def _opens_section(tokens: List[Token], index: int, stack: List[Token]) -> bool:
+        """Whether an identifier opens a classdef section or an arguments block."""
+        token = tokens[index]
+        if not stack or not is_statement_start(tokens, index):
+            return False
+        following = [t for t in tokens[index + 1 : index + 8] if t.kind is not TokenKind.COMMENT]
+        if token.text in CLASSDEF_SECTIONS and stack[-1].text == "classdef":
+            return (
+                not following or following[0].kind is TokenKind.NEWLINE or following[0].text == "("
+            )
+        if token.text == "arguments" and stack[-1].text == "function":
+            if not following or following[0].kind is TokenKind.NEWLINE:
+                return True
+            # 'arguments (Input)' opens a block, 'arguments(1) = x' indexes a variable
+            attributes: List[str] = []
+            for t in following[1:]:
+                if t.text == ")":
+                    break
+                if t.text != ",":
+                    attributes.append(t.text)
+            return (
+                following[0].text == "("
+                and bool(attributes)
+                and set(attributes) <= ARGUMENTS_ATTRIBUTES
+            )
+        return False
+
+
+def is_statement_start(tokens: List[Token], index: int) -> bool:
+    if index == 0:
+        return True
+    previous = tokens[index - 1]
+    if previous.kind is TokenKind.NEWLINE:
+        return index < 2 or tokens[index - 2].kind is not TokenKind.CONTINUATION
+    return previous.text in (",", ";")
+
+
+DEFAULT_RULES: Tuple[PrecheckRule, ...] = (
+    ByteOrderMarkRule(),
+    EncodingRule(),
+    InvalidCharacterRule(),
+    UnterminatedStringRule(),
+    BracketRule(),
+    BlockEndRule(),
+)
+
+
+@dataclass
+class PrecheckResult:
+    source_file: Path
+    # Records of problems that mlint does not look for, reported in every mode
+    records: List[LinterRecord] = field(default_factory=list)
+    # Records of definite errors that mlint would report too
+    error_records: List[LinterRecord] = field(default_factory=list)
+    needs_linter: bool = True
+
+    def has_errors(self) -> bool:
+        return bool(self.error_records)
+
+    def to_report(self) -> LinterReport:
+        return LinterReport(source_file=self.source_file, records=self.records + self.error_records)
+
+
+class PrecheckEngine:
+    """Runs the pre-checks on files and decides which of them still need the full linter."""
+
+    rules: Tuple[PrecheckRule, ...]
+
+    def __init__(self, rules: Tuple[PrecheckRule, ...] = DEFAULT_RULES):
+        self.rules = rules
+
+    def check(self, filepath: Path) -> PrecheckResult:
+        try:
+            source = SourceFile.read(filepath)
+        except OSError:
+            # Leave it to the linter to report files that cannot be read
+            return PrecheckResult(filepath)
+
+        result = PrecheckResult(filepath, needs_linter=source.has_code())
+        for rule in self.rules:
+            (result.error_records if rule.covered_by_mlint else result.records).extend(
+                rule.check(source)
+            )
+        result.records.sort(key=lambda r: r.line)
+        result.error_records.sort(key=lambda r: r.line)
+        return result
+
+
+class Prechecks:
+    """Applies the pre-checks to files on their way to the linter, and merges their findings in.
+
+    Files without any code skip the linter. In fast-feedback mode, definite errors found by the
+    pre-checks end the run before the linter starts.
+    """
+
+    engine: PrecheckEngine
+    _records: Dict[Path, List[LinterRecord]]
+    _results: Dict[Path, PrecheckResult]
+    # The input positions of the files passed on to the linter, and of the held back reports
+    _indices: Dict[Path, int]
+    _skipped_reports: Deque[Tuple[int, LinterReport]]
+    _file_count: int
+    # filter() and merge() may run on different threads
+    _lock: threading.Lock
+
+    def __init__(self, engine: Optional[PrecheckEngine] = None):
+        self.engine = engine if engine is not None else PrecheckEngine()
+        self._records = {}
+        self._results = {}
+        self._indices = {}
+        self._skipped_reports = deque()
+        self._file_count = 0
+        self._lock = threading.Lock()
+
+    def find_errors(self, filepaths: List[Path]) -> List[LinterReport]:
+        """Check every file up front, returning the reports of those with definite errors."""
+        error_reports: List[LinterReport] = []
+        for filepath in filepaths:
+            result = self.engine.check(filepath)
+            self._results[filepath] = result
+            if result.has_errors():
+                error_reports.append(result.to_report())
+        return error_reports
+
+    def filter(self, filepaths: Iterable[Path]) -> Iterator[Path]:
+        """Yield the files that need the linter, holding back the reports of those that do not."""
+        for filepath in filepaths:
+            result = self._results.pop(filepath, None) or self.engine.check(filepath)
+            with self._lock:
+                index = self._file_count
+                self._file_count += 1
+                if not result.needs_linter:
+                    self._skipped_reports.append((index, result.to_report()))
+                    continue
+                self._indices[filepath] = index
+                if result.records:
+                    self._records[filepath] = result.records
+            yield filepath
+
+    def merge(self, reports: Iterable[LinterReport]) -> Iterator[LinterReport]:
+        """Add the pre-check records to the linter's reports, interleaving files that skipped it.
+
+        The report of a skipped file is passed on just before the first linter report of a file
+        that came after it, so reports in input order stay in input order, and the skipped reports
+        do not pile up while files stream through.
+        """
+        for report in reports:
+            with self._lock:
+                records = self._records.pop(report.source_file, None)
+                index = self._indices.pop(report.source_file, self._file_count)
+            yield from self._take_skipped_reports(index)
+            if records:
+                report = LinterReport(
+                    source_file=report.source_file, records=records + report.records
+                )
+            yield report
+        yield from self._take_skipped_reports(None)
+
+    def _take_skipped_reports(self, before_index: Optional[int]) -> List[LinterReport]:
+        """Remove and return the held back reports before an input position, or all if None."""
+        skipped_reports: List[LinterReport] = []
+        with self._lock:
+            while self._skipped_reports and (
+                before_index is None or self._skipped_reports[0][0] < before_index
+            ):
+                skipped_reports.append(self._skipped_reports.popleft()[1])
+        return skipped_reports
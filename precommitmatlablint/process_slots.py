@@ -0,0 +1,115 @@
+import getpass
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from precommitmatlablint.file_lock import FileLock
+
+# MATLAB processes are not limited by default, as a limit below --matlab-workers would leave workers
+# waiting; --max-matlab-processes sets one on machines short of memory or licenses
+DEFAULT_MAX_MATLAB_PROCESSES = 0
+DEFAULT_MAX_MLINT_PROCESSES = os.cpu_count() or 4
+
+
+def get_runtime_folder() -> Path:
+    """Return the per-user folder of the lock files shared by all hook processes on this machine."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir and Path(runtime_dir).is_dir():
+        return Path(runtime_dir, "pre-commit-matlab-lint")
+
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = "default"
+    return Path(tempfile.gettempdir(), f"pre-commit-matlab-lint-{user}")
+
+
+class ProcessSlotPool:
+    """A fixed number of slots, shared between processes, bounding how many children run at once.
+
+    Each slot is a lock file; holding its lock means holding the slot. Processes waiting for a slot
+    first queue on a separate lock file, so the operating system puts them to sleep in order. The
+    process at the head of the queue takes a free slot if there is one, and otherwise sleeps on the
+    lock of one of the taken slots, so no process polls.
+    """
+
+    name: str
+    max_slots: int
+    runtime_folder: Path
+    _queue_lock: FileLock
+    _slot_locks: List[FileLock]
+    _next_slot: int
+
+    def __init__(self, name: str, max_slots: int, runtime_folder: Optional[Path] = None):
+        """
+        Parameters
+        ----------
+        name: str
+                        Identifies the kind of process, e.g. "matlab"; pools with the same name
+                        share slots
+        max_slots: int
+                        The number of processes allowed to run at once. Zero or less means no limit.
+        runtime_folder: Path, optional
+                        The folder holding the lock files. Defaults to get_runtime_folder().
+        """
+        self.name = name
+        self.max_slots = max_slots
+        self.runtime_folder = runtime_folder if runtime_folder is not None else get_runtime_folder()
+        self._queue_lock = FileLock(self.runtime_folder / f"{name}.queue.lock")
+        self._slot_locks = [
+            FileLock(self.runtime_folder / f"{name}.slot{index}.lock")
+            for index in range(max(max_slots, 0))
+        ]
+        self._next_slot = 0
+
+    def is_limited(self) -> bool:
+        return self.max_slots > 0
+
+    def try_acquire(self) -> Optional[FileLock]:
+        """Take any free slot without waiting, returning its lock, or None if all are taken."""
+        for slot_lock in self._slot_locks:
+            # The locks are re-entrant, so skip slots that this process already holds
+            if not slot_lock.is_locked() and slot_lock.acquire(blocking=False):
+                return slot_lock
+        return None
+
+    def acquire(self) -> Optional[FileLock]:
+        """Wait for a free slot and take it, returning its lock (None if not limited)."""
+        if not self.is_limited():
+            return None
+
+        # Even when a slot is free, go through the queue so that newcomers cannot overtake waiting
+        # processes
+        with self._queue_lock:
+            slot_lock = self.try_acquire()
+            if slot_lock is None:
+                # Slots held by this thread would be re-entered rather than waited for
+                waiting_slots = [s for s in self._slot_locks if not s.is_owned()]
+                if not waiting_slots:
+                    raise RuntimeError(f"This thread already holds every {self.name} slot")
+                # Successive waits rotate over the slots, so that one long-held slot does not keep
+                # every waiter behind it
+                slot_lock = waiting_slots[self._next_slot % len(waiting_slots)]
+                self._next_slot += 1
+                slot_lock.acquire()
+        return slot_lock
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot for the duration of a with-block."""
+        slot_lock = self.acquire()
+        try:
+            yield
+        finally:
+            if slot_lock is not None:
+                slot_lock.release()
+
+    @classmethod
+    def for_matlab(cls, max_slots: int = DEFAULT_MAX_MATLAB_PROCESSES) -> "ProcessSlotPool":
+        return cls("matlab", max_slots)
+
+    @classmethod
+    def for_mlint(cls, max_slots: int = DEFAULT_MAX_MLINT_PROCESSES) -> "ProcessSlotPool":
+        return cls("mlint", max_slots)
@@ -0,0 +1,352 @@
+import io
+import json
+from abc import ABC, abstractmethod
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, TextIO, Type
+from xml.sax.saxutils import escape, quoteattr
+
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.return_code import ReturnCode
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+TOOL_NAME = "checkcode"
+TOOL_INFORMATION_URI = "https://www.mathworks.com/help/matlab/ref/checkcode.html"
+
+
+class ReportWriter(ABC):
+    """Writes linter reports to a text stream one at a time, as they arrive.
+
+    Subclasses never hold more than the report being written, so the memory used does not grow with
+    the number of reports or records.
+    """
+
+    stream: TextIO
+    # Facts about the run as a whole, e.g. the shard it covers, for the formats that have a place
+    # for them
+    metadata: Dict[str, Any]
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.metadata = {}
+
+    def begin(self) -> None:
+        """Write whatever precedes the first report."""
+
+    @abstractmethod
+    def write_report(self, report: LinterReport) -> None:
+        """Write one report."""
+
+    def write_unchecked(self, filepaths: List[Path]) -> None:
+        """Write the files that were not linted, e.g. at the end of a time budget.
+
+        By default they are recorded in the metadata, for the formats that have a place for it.
+        """
+        self.metadata["unchecked_files"] = [str(f) for f in filepaths]
+
+    def end(self, return_code: ReturnCode) -> None:
+        """Write whatever follows the last report, given the overall verdict."""
+
+    def write_summary(
+        self, id_counts: "Counter[str]", file_count: int, files_with_records: int
+    ) -> None:
+        """Write the number of records per ID. Only formats meant for people show a summary."""
+
+
+class TextReportWriter(ReportWriter):
+    """Writes the human-readable output of the hook."""
+
+    _has_written_header: bool
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self._has_written_header = False
+
+    def write_report(self, report: LinterReport) -> None:
+        header = ""
+        if report.has_records() and not self._has_written_header:
+            header = "mlint found issues:\n"
+            self._has_written_header = True
+
+        # Format the whole report first and hand it to the stream in a single write
+        lines: List[str] = [str(report.source_file)]
+        lines.extend(map(str, report.records))
+        lines.append("")
+        self.stream.write(header + "\n".join(lines))
+
+    def write_unchecked(self, filepaths: List[Path]) -> None:
+        lines: List[str] = ["Not checked:"]
+        lines.extend(f"  {f}" for f in filepaths)
+        lines.append("")
+        self.stream.write("\n".join(lines))
+
+    def write_summary(
+        self, id_counts: "Counter[str]", file_count: int, files_with_records: int
+    ) -> None:
+        record_count = sum(id_counts.values())
+        lines: List[str] = [
+            f"Summary: {record_count} issue(s) in {files_with_records} of {file_count} file(s)"
+        ]
+        width = len(str(max(id_counts.values(), default=0)))
+        lines.extend(
+            f"  {count:>{width}}  {record_id}" for record_id, count in id_counts.most_common()
+        )
+        lines.append("")
+        self.stream.write("\n".join(lines))
+
+
+class JsonReportWriter(ReportWriter):
+    """Writes a single JSON document holding every report and the verdict."""
+
+    _report_count: int
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self._report_count = 0
+
+    def begin(self) -> None:
+        self.stream.write('{"reports": [')
+
+    def write_report(self, report: LinterReport) -> None:
+        if self._report_count > 0:
+            self.stream.write(",")
+        self.stream.write("\n  ")
+        self.stream.write(json.dumps(report.to_dict()))
+        self._report_count += 1
+
+    def end(self, return_code: ReturnCode) -> None:
+        metadata = "".join(
+            f", {json.dumps(key)}: {json.dumps(value)}" for key, value in self.metadata.items()
+        )
+        self.stream.write(
+            f'\n], "return_code": {int(return_code)}, '
+            f'"result": {json.dumps(return_code.name)}{metadata}}}\n'
+        )
+
+
+class NdjsonReportWriter(ReportWriter):
+    """Writes one JSON object per report, one per line."""
+
+    def write_report(self, report: LinterReport) -> None:
+        self.stream.write(json.dumps(report.to_dict()))
+        self.stream.write("\n")
+
+
+class SarifReportWriter(ReportWriter):
+    """Writes a SARIF 2.1.0 log, as consumed by code scanning dashboards."""
+
+    _result_count: int
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self._result_count = 0
+
+    def begin(self) -> None:
+        tool = {"driver": {"name": TOOL_NAME, "informationUri": TOOL_INFORMATION_URI}}
+        self.stream.write(
+            f'{{"$schema": {json.dumps(SARIF_SCHEMA)}, "version": "2.1.0", '
+            f'"runs": [{{"tool": {json.dumps(tool)}, "results": ['
+        )
+
+    def write_report(self, report: LinterReport) -> None:
+        uri = to_uri(report.source_file)
+        for record in report.records:
+            if self._result_count > 0:
+                self.stream.write(",")
+            self.stream.write("\n  ")
+            self.stream.write(json.dumps(self.to_result(uri, record)))
+            self._result_count += 1
+
+    def end(self, return_code: ReturnCode) -> None:
+        invocation = {"executionSuccessful": True, "exitCode": int(return_code)}
+        # The metadata goes in the property bag of the run, where SARIF allows any facts
+        properties = f', "properties": {json.dumps(self.metadata)}' if self.metadata else ""
+        self.stream.write(f'\n], "invocations": [{json.dumps(invocation)}]{properties}}}]}}\n')
+
+    @staticmethod
+    def to_result(uri: str, record: LinterRecord) -> Dict[str, Any]:
+        physical_location: Dict[str, Any] = {"artifactLocation": {"uri": uri}}
+        if record.line > 0:
+            region: Dict[str, int] = {"startLine": record.line}
+            if len(record.columns) > 0:
+                region["startColumn"] = record.columns[0]
+                # SARIF end columns are exclusive, checkcode's are inclusive
+                region["endColumn"] = record.columns[-1] + 1
+            physical_location["region"] = region
+
+        return {
+            "ruleId": record.id,
+            "level": "error" if record.is_failure() else "note",
+            "message": {"text": record.message},
+            "locations": [{"physicalLocation": physical_location}],
+        }
+
+
+class JUnitReportWriter(ReportWriter):
+    """Writes a JUnit XML report with one test case per file."""
+
+    def begin(self) -> None:
+        self.stream.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n')
+        self.stream.write(f"<testsuite name={quoteattr(TOOL_NAME)}>\n")
+
+    def write_report(self, report: LinterReport) -> None:
+        self.stream.write(
+            f"  <testcase classname={quoteattr(TOOL_NAME)} "
+            f"name={quoteattr(str(report.source_file))}"
+        )
+        if not report.has_records():
+            self.stream.write("/>\n")
+            return
+
+        self.stream.write(">\n")
+        failures: List[LinterRecord] = [r for r in report.records if r.is_failure()]
+        details = escape("\n".join(str(r) for r in report.records))
+        if len(failures) > 0:
+            message = quoteattr(f"{len(failures)} issue(s) found")
+            self.stream.write(
+                f"    <failure message={message} type={quoteattr(TOOL_NAME)}>{details}</failure>\n"
+            )
+        else:
+            self.stream.write(f"    <system-out>{details}</system-out>\n")
+        self.stream.write("  </testcase>\n")
+
+    def write_unchecked(self, filepaths: List[Path]) -> None:
+        for filepath in filepaths:
+            self.stream.write(
+                f"  <testcase classname={quoteattr(TOOL_NAME)} name={quoteattr(str(filepath))}>\n"
+                '    <skipped message="not checked"/>\n'
+                "  </testcase>\n"
+            )
+
+    def end(self, return_code: ReturnCode) -> None:
+        self.stream.write("</testsuite>\n</testsuites>\n")
+
+
+class Reporter:
+    """Passes reports to a writer while working out the verdict and per-ID counts in one pass."""
+
+    writer: ReportWriter
+    quiet: bool
+    summary: bool
+    return_code: ReturnCode
+    id_counts: "Counter[str]"
+    file_count: int
+    files_with_records: int
+
+    def __init__(self, writer: ReportWriter, quiet: bool = False, summary: bool = False):
+        """
+        Parameters
+        ----------
+        writer: ReportWriter
+                    The writer that formats the output
+        quiet: bool
+                    Do not write the individual reports
+        summary: bool
+                    Write the number of records per ID after the reports
+        """
+        self.writer = writer
+        self.quiet = quiet
+        self.summary = summary
+        self.return_code = ReturnCode.OK
+        self.id_counts = Counter()
+        self.file_count = 0
+        self.files_with_records = 0
+
+    def begin(self) -> None:
+        self.writer.begin()
+
+    def add(self, report: LinterReport) -> None:
+        self.file_count += 1
+        if report.has_records():
+            self.files_with_records += 1
+            if self.return_code == ReturnCode.OK and report.has_failures():
+                self.return_code = ReturnCode.FAIL
+            if self.summary:
+                self.id_counts.update(record.id for record in report.records)
+
+        if not self.quiet:
+            self.writer.write_report(report)
+
+    def add_unchecked(self, filepaths: List[Path], fail: bool) -> None:
+        """Pass on the files that were not linted, failing the verdict if fail is set."""
+        if fail:
+            self.return_code = ReturnCode.FAIL
+        self.writer.write_unchecked(filepaths)
+
+    def finish(self) -> ReturnCode:
+        self.writer.end(self.return_code)
+        if self.summary:
+            self.writer.write_summary(self.id_counts, self.file_count, self.files_with_records)
+        self.writer.stream.flush()
+        return self.return_code
+
+
+class BufferedTextStream(io.TextIOBase):
+    """Collects writes in memory and passes them to the underlying stream in large chunks.
+
+    This keeps the number of write calls low even when the underlying stream is unbuffered, e.g.
+    stdout with PYTHONUNBUFFERED set.
+    """
+
+    _stream: TextIO
+    _buffer_size: int
+    _chunks: List[str]
+    _buffered: int
+
+    def __init__(self, stream: TextIO, buffer_size: int = 64 * 1024):
+        super().__init__()
+        self._stream = stream
+        self._buffer_size = buffer_size
+        self._chunks = []
+        self._buffered = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._chunks.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self._buffer_size:
+            self._flush_chunks()
+        return len(text)
+
+    def _flush_chunks(self) -> None:
+        if self._chunks:
+            self._stream.write("".join(self._chunks))
+            self._chunks.clear()
+            self._buffered = 0
+
+    def flush(self) -> None:
+        self._flush_chunks()
+        self._stream.flush()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.flush()
+        super().close()
+
+
+REPORT_WRITERS: Dict[str, Type[ReportWriter]] = {
+    "text": TextReportWriter,
+    "json": JsonReportWriter,
+    "ndjson": NdjsonReportWriter,
+    "sarif": SarifReportWriter,
+    "junit": JUnitReportWriter,
+}
+
+
+def create_report_writer(report_format: str, stream: TextIO) -> ReportWriter:
+    """Return the report writer for a format name, one of REPORT_WRITERS."""
+    try:
+        writer_class = REPORT_WRITERS[report_format]
+    except KeyError:
+        raise ValueError(f"Unknown report format '{report_format}'") from None
+    return writer_class(stream)
+
+
+def to_uri(source_file: Path) -> str:
+    """Return a URI for a source file, relative to the current folder when it lies within it."""
+    try:
+        return source_file.absolute().relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        return source_file.absolute().as_uri()
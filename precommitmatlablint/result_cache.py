@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from precommitmatlablint.file_dedupe import hash_file
+from precommitmatlablint.file_lock import FileLock, atomic_write_text, get_lock_file
+from precommitmatlablint.linter_handle import LinterOptions
+from precommitmatlablint.linter_results import LinterRecord
+from precommitmatlablint.utility import get_state_file
+
+# Results are remembered for at most this many file contents
+MAX_RESULT_ENTRIES = 50_000
+
+
+def get_options_key(linter_key: str, options: LinterOptions) -> str:
+    """Return a digest of everything besides the file that a lint result depends on.
+
+    That is the linter and the options passed to it, including the contents of the checkcode config
+    file.
+    """
+    config_digest: Optional[bytes] = None
+    if options.checkcode_config_file is not None and not options.use_factory_default:
+        config_digest = hash_file(options.checkcode_config_file)
+    key_data = [
+        linter_key,
+        options.fail_warnings,
+        options.enable_cyc,
+        options.enable_mod_cyc,
+        options.ignore_ok_pragmas,
+        options.use_factory_default,
+        config_digest.hex() if config_digest is not None else "",
+    ]
+    return hashlib.blake2b(json.dumps(key_data).encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class LintResultCache:
+    """The records found in each distinct file, persisted so that unchanged files are not relinted.
+
+    Results are keyed by the options key, the file name and a digest of the file's contents. The
+    name is part of the key because mlint checks a function's name against its file name. The least
+    recently used results are dropped first. Lookups and updates may come from several threads.
+    Saving adds this process's results to the ones saved meanwhile by parallel hook processes,
+    rather than replacing the whole file.
+    """
+
+    cache_file: Path = field(default_factory=lambda: get_state_file("lint-results.json"))
+    results: "OrderedDict[str, List[Dict[str, Any]]]" = field(default_factory=OrderedDict)
+    has_changes: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    # The keys of the results put since the last load or save
+    _changed_keys: Set[str] = field(default_factory=set, repr=False, compare=False)
+
+    @staticmethod
+    def make_key(options_key: str, filepath: Path, digest: bytes) -> str:
+        return f"{options_key}:{filepath.name}:{digest.hex()}"
+
+    def _read(self) -> "Optional[OrderedDict[str, List[Dict[str, Any]]]]":
+        try:
+            data: Dict[str, Any] = json.loads(self.cache_file.read_text(encoding="utf-8"))
+            return OrderedDict(
+                (str(key), list(value)) for key, value in data.get("results", {}).items()
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, AttributeError) as err:
+            logging.getLogger(__name__).warning(
+                f"Ignoring unreadable lint results {self.cache_file}: {err}"
+            )
+            return None
+
+    def load(self) -> None:
+        results = self._read()
+        with self._lock:
+            if results is not None:
+                self.results = results
+            self._changed_keys.clear()
+            self.has_changes = False
+
+    def save(self) -> None:
+        if self.has_changes:
+            with FileLock(get_lock_file(self.cache_file)):
+                results = self._read()
+                with self._lock:
+                    if results is not None:
+                        for key, value in self.results.items():
+                            if key in self._changed_keys:
+                                results.pop(key, None)
+                                results[key] = value
+                        self.results = results
+                    self._changed_keys.clear()
+                    while len(self.results) > MAX_RESULT_ENTRIES:
+                        self.results.popitem(last=False)
+                    data = json.dumps({"results": self.results})
+                    self.has_changes = False
+                atomic_write_text(self.cache_file, data)
+
+    def get(self, key: str) -> Optional[List[LinterRecord]]:
+        with self._lock:
+            records = self.results.get(key)
+            if records is None:
+                return None
+            self.results.move_to_end(key)
+            # Only the order changed, which is not worth a save on its own
+        return [LinterRecord.from_dict(r) for r in records]
+
+    def put(self, key: str, records: List[LinterRecord]) -> None:
+        record_dicts = [r.to_dict() for r in records]
+        with self._lock:
+            self.results[key] = record_dicts
+            self.results.move_to_end(key)
+            self._changed_keys.add(key)
+            self.has_changes = True
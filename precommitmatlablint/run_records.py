@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+from precommitmatlablint.file_dedupe import hash_file
+from precommitmatlablint.file_lock import FileLock, atomic_write_text, get_lock_file
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.stat_index import StatIndex
+from precommitmatlablint.utility import get_state_file
+
+# Complete runs are remembered for at most this many distinct file sets
+MAX_RUN_RECORDS = 20
+# Runs that found more records than this are not remembered, so the records file stays small
+MAX_RUN_RECORD_FINDINGS = 10_000
+
+
+def compute_run_digest(
+    filepaths: Sequence[Path], run_key: str, stat_index: Optional[StatIndex] = None
+) -> Optional[str]:
+    """Return a Merkle-style digest of a set of files and everything else a run's result depends on.
+
+    Each file contributes a leaf hash of its path and the digest of its contents. The root hashes
+    the run key and the leaves in path order, so the same files linted in any order give the same
+    digest. None is returned if any file cannot be read, as such a run cannot be replayed. With a
+    stat index, only the files that changed since they were last indexed are read.
+
+    The digest still costs at least one stat call per file, and without a stat index a read of
+    every file, so replaying a run saves the linting but not the walk over its files.
+    """
+    paths = sorted(set(str(p) for p in filepaths))
+    if stat_index is not None:
+        digests = stat_index.digests([Path(p) for p in paths])
+    else:
+        digests = [hash_file(Path(p)) for p in paths]
+    leaves: List[bytes] = []
+    for path, digest in zip(paths, digests):
+        if digest is None:
+            return None
+        leaves.append(
+            hashlib.blake2b(
+                path.encode("utf-8", errors="surrogateescape") + b"\0" + digest
+            ).digest()
+        )
+    root = hashlib.blake2b(run_key.encode("utf-8"), digest_size=16)
+    for leaf in leaves:
+        root.update(leaf)
+    return root.hexdigest()
+
+
+@dataclass
+class RunRecordStore:
+    """The outcome of recent complete runs, persisted between runs and keyed by their run digest.
+
+    A run whose digest matches a stored one lints exactly the same files, with the same contents,
+    linter and options, so its reports are replayed instead of linting anything. Only the records of
+    files that had any are stored; every other file of the run is replayed with an empty report.
+    Runs may be replayed and stored from several threads. Saving adds this process's runs to the
+    ones saved meanwhile by parallel hook processes, rather than replacing the whole file.
+    """
+
+    records_file: Path = field(default_factory=lambda: get_state_file("run-records.json"))
+    runs: "OrderedDict[str, Dict[str, List[Dict[str, Any]]]]" = field(default_factory=OrderedDict)
+    has_changes: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    # The digests of the runs stored since the last load or save
+    _changed_digests: Set[str] = field(default_factory=set, repr=False, compare=False)
+
+    def _read(self) -> "Optional[OrderedDict[str, Dict[str, List[Dict[str, Any]]]]]":
+        try:
+            data: Dict[str, Any] = json.loads(self.records_file.read_text(encoding="utf-8"))
+            return OrderedDict(
+                (str(key), dict(value)) for key, value in data.get("runs", {}).items()
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, AttributeError) as err:
+            logging.getLogger(__name__).warning(
+                f"Ignoring unreadable run records {self.records_file}: {err}"
+            )
+            return None
+
+    def load(self) -> None:
+        runs = self._read()
+        with self._lock:
+            if runs is not None:
+                self.runs = runs
+            self._changed_digests.clear()
+            self.has_changes = False
+
+    def save(self) -> None:
+        if self.has_changes:
+            with FileLock(get_lock_file(self.records_file)):
+                runs = self._read()
+                with self._lock:
+                    if runs is not None:
+                        for run_digest, findings in self.runs.items():
+                            if run_digest in self._changed_digests:
+                                runs.pop(run_digest, None)
+                                runs[run_digest] = findings
+                        self.runs = runs
+                    self._changed_digests.clear()
+                    # Drop the runs that were stored longest ago
+                    while len(self.runs) > MAX_RUN_RECORDS:
+                        self.runs.popitem(last=False)
+                    data = json.dumps({"runs": self.runs})
+                    self.has_changes = False
+                atomic_write_text(self.records_file, data)
+
+    def store(self, run_digest: str, findings: Dict[str, List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            self.runs[run_digest] = findings
+            self.runs.move_to_end(run_digest)
+            self._changed_digests.add(run_digest)
+            self.has_changes = True
+
+    def replay(
+        self, run_digest: str, filepaths: Sequence[Path]
+    ) -> Optional[Iterator[LinterReport]]:
+        """Return the stored run's reports in the order of filepaths, or None if there is none."""
+        with self._lock:
+            run = self.runs.get(run_digest)
+            if run is None:
+                return None
+            self.runs.move_to_end(run_digest)
+            # Only the order changed, which is not worth a save on its own
+
+        def reports() -> Iterator[LinterReport]:
+            for filepath in filepaths:
+                records = run.get(str(filepath), [])
+                yield LinterReport(
+                    source_file=filepath, records=[LinterRecord.from_dict(r) for r in records]
+                )
+
+        return reports()
+
+
+class RunRecorder:
+    """Collects the records of a run as its reports go by, to store once the run is complete."""
+
+    run_digest: str
+    findings: Dict[str, List[Dict[str, Any]]]
+    finding_count: int
+
+    def __init__(self, run_digest: str):
+        self.run_digest = run_digest
+        self.findings = {}
+        self.finding_count = 0
+
+    def add(self, report: LinterReport) -> None:
+        if report.has_records() and self.finding_count <= MAX_RUN_RECORD_FINDINGS:
+            self.finding_count += len(report.records)
+            self.findings[str(report.source_file)] = [r.to_dict() for r in report.records]
+
+    def store(self, run_records: RunRecordStore) -> None:
+        if self.finding_count <= MAX_RUN_RECORD_FINDINGS:
+            run_records.store(self.run_digest, self.findings)
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import re
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, TextIO, Tuple, cast
+
+from precommitmatlablint.lint_scheduler import get_file_size
+from precommitmatlablint.linter_results import LinterReport
+from precommitmatlablint.report_writers import BufferedTextStream, Reporter, create_report_writer
+from precommitmatlablint.return_code import ReturnCode
+
+# A shard, as its 1-based index and the number of shards
+Shard = Tuple[int, int]
+
+# Partial reports are read in chunks of this many characters
+READ_CHUNK_SIZE = 64 * 1024
+# The start of a report written with --format=json, up to its first report
+JSON_REPORTS_START = re.compile(r'\s*\{\s*"reports"\s*:\s*\[')
+# What separates two reports in the list
+JSON_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def parse_shard(value: str) -> Shard:
+    """Parse an INDEX/COUNT shard option, e.g. '2/4' for the second of four shards."""
+    try:
+        index_text, count_text = value.split("/")
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not of the form INDEX/COUNT") from None
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            f"'{value}' is not a shard: INDEX must be between 1 and COUNT"
+        )
+    return index, count
+
+
+def get_shard_key(filepath: Path) -> str:
+    """Return the name a file is sharded by, the same on every machine with the same checkout.
+
+    That is the path relative to the current folder when the file lies within it, as CI nodes check
+    out to different folders.
+    """
+    try:
+        return filepath.absolute().relative_to(Path.cwd()).as_posix()
+    except ValueError:
+        return filepath.absolute().as_posix()
+
+
+def get_shard_hash(filepath: Path) -> int:
+    digest = hashlib.blake2b(
+        get_shard_key(filepath).encode("utf-8", errors="surrogateescape"), digest_size=8
+    )
+    return int.from_bytes(digest.digest(), "big")
+
+
+def select_shard(filepaths: Iterable[Path], shard: Shard, by_size: bool = False) -> Iterable[Path]:
+    """Return the files of one shard of filepaths.
+
+    Every file belongs to exactly one of the shards, and all nodes given the same files agree on
+    which. By default a file's shard follows from a hash of its path alone, so files are filtered as
+    they stream by. With by_size, the files are assigned largest first to the shard with the fewest
+    bytes so far, which balances shards of files of very different sizes but needs every file listed
+    before the first is linted.
+    """
+    index, count = shard
+    if count == 1:
+        return filepaths
+    if not by_size:
+        return (f for f in filepaths if get_shard_hash(f) % count == index - 1)
+
+    files = sorted(
+        ((get_file_size(f), get_shard_hash(f), f) for f in filepaths), key=lambda e: (-e[0], e[1])
+    )
+    # The bytes assigned to each shard so far, and its 0-based index to break ties
+    loads: List[Tuple[int, int]] = [(0, i) for i in range(count)]
+    selected: List[Path] = []
+    for size, _, filepath in files:
+        load, shard_index = heapq.heappop(loads)
+        if shard_index == index - 1:
+            selected.append(filepath)
+        heapq.heappush(loads, (load + size, shard_index))
+    return selected
+
+
+def read_ndjson_report(report_file: Path) -> Iterator[LinterReport]:
+    """Read the reports of a report written with --format=ndjson, one at a time."""
+    with report_file.open("r", encoding="utf-8") as lines:
+        for line in lines:
+            if line.strip():
+                yield LinterReport.from_dict(json.loads(line))
+
+
+def iter_json_report(
+    stream: TextIO, chunk_size: int = READ_CHUNK_SIZE
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Parse a report written with --format=json while reading it, one chunk at a time.
+
+    Yields ('report', data) for each report, in order, then ('metadata', data) for the verdict and
+    metadata that follow the reports. Only the report being parsed is held in memory. Raises
+    ValueError if the stream is not such a report.
+    """
+    decoder = json.JSONDecoder()
+    # The first chunk holds at least the start of the report
+    buffer = stream.read(max(chunk_size, 256))
+    match = JSON_REPORTS_START.match(buffer)
+    if match is None:
+        raise ValueError("not a report written with --format=json")
+    position = match.end()
+    while True:
+        position = JSON_SEPARATOR.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            break
+        try:
+            report, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The report may continue in the next chunk
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield "report", report
+        position = end
+    # The reports are followed by ', "return_code": ..., <metadata>}'
+    rest = (buffer[position + 1 :] + stream.read()).lstrip()
+    if rest.startswith(","):
+        rest = rest[1:]
+    yield "metadata", json.loads("{" + rest)
+
+
+def read_json_reports(report_file: Path) -> Iterator[LinterReport]:
+    """Read the reports of a report written with --format=json, one at a time."""
+    with report_file.open("r", encoding="utf-8") as stream:
+        for kind, data in iter_json_report(stream):
+            if kind == "report":
+                yield LinterReport.from_dict(data)
+
+
+def read_partial_report(
+    report_file: Path,
+) -> Tuple[Iterator[LinterReport], Optional[Shard], ReturnCode, List[Path]]:
+    """Read a report written with --format=json.
+
+    Returns the reports, the shard the report covers if it says so, the verdict of its run, which
+    may fail for more than its records, and the files the run left unchecked. Raises ValueError for
+    any other format: an NDJSON report holds neither its shard nor its verdict.
+
+    The metadata follows the reports, so the file is read through once for it up front; the reports
+    are then read again, one at a time, as they are consumed.
+    """
+    metadata: Dict[str, Any] = {}
+    with report_file.open("r", encoding="utf-8") as stream:
+        try:
+            for kind, data in iter_json_report(stream):
+                if kind == "metadata":
+                    metadata = data
+        except ValueError as err:
+            raise ValueError(
+                f"{report_file} is not a report written with --format=json: {err}"
+            ) from err
+    shard = metadata.get("shard")
+    return (
+        read_json_reports(report_file),
+        (int(shard[0]), int(shard[1])) if shard is not None else None,
+        ReturnCode(int(metadata["return_code"])),
+        [Path(f) for f in metadata.get("unchecked_files", [])],
+    )
+
+
+def merge_reports(
+    report_files: Sequence[Path],
+    report_format: str = "text",
+    output_file: Optional[Path] = None,
+    quiet: bool = False,
+    summary: bool = False,
+    logger: Optional[logging.Logger] = None,
+) -> ReturnCode:
+    """Combine the partial reports of sharded runs into the output and verdict of a single run.
+
+    Parameters
+    ----------
+    report_files: list of Path
+                        The JSON reports written by each shard
+    report_format: str
+                        The output format, one of REPORT_WRITERS
+    output_file: Path, optional
+                        Write the output to this file instead of stdout
+    quiet: bool
+                        Do not write the individual file reports
+    summary: bool
+                        Write the number of issues found per checkcode ID after the reports
+    logger: logging.Logger, optional
+
+    Returns
+    -------
+    ReturnCode
+        FAIL if any shard failed, or if a partial report is unreadable or shards are missing or
+        repeated
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    partial_reports: List[Iterator[LinterReport]] = []
+    shards: List[Shard] = []
+    partial_return_codes: List[ReturnCode] = []
+    unchecked_files: List[Path] = []
+    for report_file in report_files:
+        try:
+            reports, shard, partial_return_code, unchecked = read_partial_report(report_file)
+        except (OSError, ValueError, TypeError, AttributeError, KeyError) as err:
+            logger.error(f"Unable to read the partial report {report_file}: {err}")
+            return ReturnCode.FAIL
+        partial_reports.append(reports)
+        partial_return_codes.append(partial_return_code)
+        unchecked_files.extend(unchecked)
+        if shard is not None:
+            shards.append(shard)
+
+    if shards:
+        counts: Set[int] = {count for _, count in shards}
+        indices = sorted(index for index, _ in shards)
+        if (
+            len(counts) > 1
+            or indices != list(range(1, max(counts) + 1))
+            or len(shards) != len(report_files)
+        ):
+            logger.error(f"The partial reports do not cover each shard once: {sorted(shards)}")
+            return ReturnCode.FAIL
+
+    with ExitStack() as stack:
+        stream: TextIO = (
+            stack.enter_context(output_file.open("w", encoding="utf-8"))
+            if output_file is not None
+            else sys.stdout
+        )
+        reporter = Reporter(
+            create_report_writer(report_format, cast(TextIO, BufferedTextStream(stream))),
+            quiet=quiet,
+            summary=summary,
+        )
+        reporter.begin()
+        try:
+            for reports in partial_reports:
+                for report in reports:
+                    reporter.add(report)
+        except (OSError, ValueError, TypeError, AttributeError) as err:
+            logger.error(f"Unable to read a partial report: {err}")
+            reporter.finish()
+            return ReturnCode.FAIL
+        if unchecked_files:
+            # The verdicts of the shards already apply their over-budget policy to these
+            reporter.add_unchecked(unchecked_files, fail=False)
+        # A shard's verdict may fail for more than its records, e.g. for files it left unchecked
+        return max(reporter.finish(), *partial_return_codes)
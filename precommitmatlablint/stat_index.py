@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from precommitmatlablint.file_dedupe import hash_file, map_hashing
+from precommitmatlablint.file_lock import FileLock, atomic_write_text, get_lock_file
+from precommitmatlablint.utility import get_state_file
+
+# The digests of at most this many files are remembered
+MAX_STAT_ENTRIES = 200_000
+# A file modified this recently may be modified again without its modification time changing, so its
+# digest is not remembered
+RACY_NANOSECONDS = 2_000_000_000
+
+# The inode, size and modification time of a file
+StatKey = Tuple[int, int, int]
+
+
+def get_stat_key(path: Path) -> Optional[StatKey]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+@dataclass
+class StatIndex:
+    """The content digests of files, persisted and keyed by each file's path, inode, size and mtime.
+
+    A file whose stat matches its entry is not read again, so the digests of an unchanged tree cost
+    one stat per file. Lookups and updates may come from several threads. Saving adds this
+    process's digests to the ones saved meanwhile by parallel hook processes, rather than replacing
+    the whole file.
+    """
+
+    index_file: Path = field(default_factory=lambda: get_state_file("stat-index.json"))
+    # Path to [inode, size, mtime_ns, hex digest]
+    entries: "OrderedDict[str, List[Any]]" = field(default_factory=OrderedDict)
+    has_changes: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    # The paths whose digests were remembered since the last load or save
+    _changed_paths: Set[str] = field(default_factory=set, repr=False, compare=False)
+
+    def _read(self) -> "Optional[OrderedDict[str, List[Any]]]":
+        try:
+            data: Dict[str, Any] = json.loads(self.index_file.read_text(encoding="utf-8"))
+            return OrderedDict(
+                (str(key), list(value)) for key, value in data.get("entries", {}).items()
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, AttributeError) as err:
+            logging.getLogger(__name__).warning(
+                f"Ignoring unreadable stat index {self.index_file}: {err}"
+            )
+            return None
+
+    def load(self) -> None:
+        entries = self._read()
+        with self._lock:
+            if entries is not None:
+                self.entries = entries
+            self._changed_paths.clear()
+            self.has_changes = False
+
+    def save(self) -> None:
+        if self.has_changes:
+            with FileLock(get_lock_file(self.index_file)):
+                entries = self._read()
+                with self._lock:
+                    if entries is not None:
+                        for path, entry in self.entries.items():
+                            if path in self._changed_paths:
+                                entries.pop(path, None)
+                                entries[path] = entry
+                        self.entries = entries
+                    self._changed_paths.clear()
+                    while len(self.entries) > MAX_STAT_ENTRIES:
+                        self.entries.popitem(last=False)
+                    data = json.dumps({"entries": self.entries})
+                    self.has_changes = False
+                atomic_write_text(self.index_file, data)
+
+    def digest(self, path: Path) -> Optional[bytes]:
+        """Return a digest of the file's contents, as hash_file() does, or None if unreadable."""
+        stat_key = get_stat_key(path)
+        if stat_key is None:
+            return None
+        digest = self._lookup(path, stat_key)
+        if digest is None:
+            digest = self._hash(path, stat_key)
+        return digest
+
+    def digests(
+        self, paths: Sequence[Path], executor: Optional[Executor] = None
+    ) -> List[Optional[bytes]]:
+        """Return the digests of several files, in order, hashing index misses on a thread pool.
+
+        The misses are hashed on executor if supplied, see map_hashing().
+        """
+        stat_keys = [get_stat_key(path) for path in paths]
+        digests: List[Optional[bytes]] = [
+            self._lookup(path, stat_key) if stat_key is not None else None
+            for path, stat_key in zip(paths, stat_keys)
+        ]
+        misses = [
+            i
+            for i, (digest, stat_key) in enumerate(zip(digests, stat_keys))
+            if digest is None and stat_key
+        ]
+        hashed = map_hashing(lambda i: self._hash(paths[i], stat_keys[i]), misses, executor)
+        for i, digest in zip(misses, hashed):
+            digests[i] = digest
+        return digests
+
+    def _lookup(self, path: Path, stat_key: StatKey) -> Optional[bytes]:
+        with self._lock:
+            entry = self.entries.get(str(path))
+            if entry is None or tuple(entry[:3]) != stat_key:
+                return None
+            self.entries.move_to_end(str(path))
+            # Only the order changed, which is not worth a save on its own
+        return bytes.fromhex(entry[3])
+
+    def _hash(self, path: Path, stat_key: StatKey) -> Optional[bytes]:
+        digest = hash_file(path)
+        if digest is None or time.time_ns() - stat_key[2] < RACY_NANOSECONDS:
+            return digest
+        # The file may have changed between the stat and the read; only remember the digest if it
+        # did not
+        if get_stat_key(path) == stat_key:
+            with self._lock:
+                self.entries[str(path)] = [*stat_key, digest.hex()]
+                self.entries.move_to_end(str(path))
+                self._changed_paths.add(str(path))
+                self.has_changes = True
+        return digest
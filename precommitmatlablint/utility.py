@@ -2,6 +2,14 @@ from pathlib import Path
 from typing import List, Optional
 
 
+def get_state_file(name: str) -> Path:
+    """Return the path of a file in the user's HOME directory persisting this hook's state.
+
+    The files share the prefix of the MATLAB info cache file, e.g. ~/.pre-commit-matlab-lint.<name>
+    """
+    return Path(Path.home(), f".pre-commit-matlab-lint.{name}")
+
+
 def construct_matlab_script(
     filepaths: List[Path],
     fail_warnings: bool,
@@ -36,24 +44,78 @@ def construct_matlab_script(
     str
         The MATLAB script to run on the MATLAB instance
     """
-    file_list = [f"'{f}'" for f in filepaths]
+    arguments: List[str] = construct_checkcode_arguments(
+        fail_warnings,
+        enable_cyc,
+        enable_mod_cyc,
+        ignore_ok_pragmas,
+        use_factory_default,
+        checkcode_config_file,
+    )
+    arguments.extend(str(f) for f in filepaths)
+    command_string = ", ".join(quote_matlab_string(a) for a in arguments)
+    return f"clc;disp(jsonencode(checkcode({command_string})));quit;"
+
 
-    level_option = "'-m0'" if fail_warnings else "'-m2'"
-    command: List[str] = [level_option, "'-id'", "'-struct'"]
+def construct_checkcode_arguments(
+    fail_warnings: bool,
+    enable_cyc: bool,
+    enable_mod_cyc: bool,
+    ignore_ok_pragmas: bool,
+    use_factory_default: bool,
+    checkcode_config_file: Optional[Path] = None,
+) -> List[str]:
+    """Return the option arguments (without file paths) to pass to MATLAB's checkcode function."""
+    level_option = "-m0" if fail_warnings else "-m2"
+    arguments: List[str] = [level_option, "-id", "-struct"]
     if enable_cyc:
-        command.append("'-cyc'")
+        arguments.append("-cyc")
 
     if enable_mod_cyc:
-        command.append("'-modcyc'")
+        arguments.append("-modcyc")
 
     if ignore_ok_pragmas:
-        command.append("'-notok'")
+        arguments.append("-notok")
 
     if use_factory_default:
-        command.append("'-config=factory'")
+        arguments.append("-config=factory")
     elif checkcode_config_file:
-        command.append(f"'-config={str(checkcode_config_file)}'")
+        arguments.append(f"-config={str(checkcode_config_file)}")
 
-    command.extend(file_list)
-    command_string = ", ".join(command)
-    return f"clc;disp(jsonencode(checkcode({command_string})));quit;"
+    return arguments
+
+
+def quote_matlab_string(text: str) -> str:
+    """Return a MATLAB character vector literal holding the supplied text."""
+    escaped = text.replace("'", "''")
+    return f"'{escaped}'"
+
+
+# Prefixes marking the lines a MATLAB worker writes back for each request; anything else it prints
+# is ignored
+WORKER_RESULT_PREFIX = "@@checkcode-result@@"
+WORKER_ERROR_PREFIX = "@@checkcode-error@@"
+WORKER_QUIT_REQUEST = "quit"
+
+
+def construct_matlab_worker_script() -> str:
+    """Return the inline MATLAB script that keeps a MATLAB instance serving checkcode requests.
+
+    Each request is one line on stdin holding a JSON array of the checkcode arguments. Each reply is
+    one line on stdout starting with WORKER_RESULT_PREFIX and followed by the JSON encoded checkcode
+    output, or starting with WORKER_ERROR_PREFIX and followed by the error message. The script exits
+    on WORKER_QUIT_REQUEST or end of input.
+    """
+    return (
+        "while true;"
+        "try;request=input('','s');catch;break;end;"
+        f"if isempty(request)||strcmp(request,'{WORKER_QUIT_REQUEST}');break;end;"
+        "try;"
+        "arguments=cellstr(jsondecode(request));"
+        f"fprintf('%s%s\\n','{WORKER_RESULT_PREFIX}',jsonencode(checkcode(arguments{{:}})));"
+        "catch err;"
+        f"fprintf('%s%s\\n','{WORKER_ERROR_PREFIX}',strrep(err.message,newline,' '));"
+        "end;"
+        "end;"
+        "quit;"
+    )
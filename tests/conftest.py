@@ -0,0 +1,57 @@
+import shutil
+import stat
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.linter_handle import MatlabHandle
+
+
+@pytest.fixture(autouse=True)
+def home_path(tmp_path: Path, monkeypatch) -> Path:
+    """Keep the state files that runs save in the user's HOME directory out of the real one."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def fake_matlab_install(tmp_path: Path) -> Callable[..., MatlabHandle]:
+    """A factory of handles to fake MATLAB installs, whose mlint is a Python stand-in."""
+    if sys.platform == "win32":
+        pytest.skip("The fake mlint executable is a shell script.")
+
+    data_folder_path = Path(__file__).parent / "data"
+
+    def make_install(release: str = "", with_mlint: bool = True) -> MatlabHandle:
+        home_path = tmp_path / "MATLAB" / (release or "R2099a")
+        home_path.mkdir(parents=True)
+        shutil.copy(data_folder_path / "version_info" / "VersionInfo.xml", home_path)
+
+        handle = MatlabHandle(
+            home_path=home_path,
+            exe_path=MatlabHandle.construct_exe_path(home_path),
+            base_exe_path=MatlabHandle.construct_base_exe_path(home_path),
+            version="9.99.0.0" if release else "",
+            release=release,
+        )
+        handle.exe_path.parent.mkdir(parents=True, exist_ok=True)
+        handle.exe_path.touch()
+
+        if with_mlint:
+            mlint_path = handle.get_mlint_handle().exe_path
+            mlint_path.parent.mkdir(parents=True, exist_ok=True)
+            fake_mlint = data_folder_path / "fake_matlab" / "fake_mlint.py"
+            mlint_path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake_mlint}" "$@"\n')
+            mlint_path.chmod(mlint_path.stat().st_mode | stat.S_IXUSR)
+        return handle
+
+    return make_install
+
+
+@pytest.fixture
+def fake_matlab_handle(fake_matlab_install: Callable[..., MatlabHandle]) -> MatlabHandle:
+    """A handle to a fake MATLAB install whose mlint is a Python stand-in."""
+    return fake_matlab_install()
@@ -0,0 +1,54 @@
+"""A stand-in for a MATLAB checkcode worker, speaking the same stdin/stdout protocol.
+
+Every line containing '#' is reported as an issue whose message holds this process's id. Linting a
+file whose name contains "crash" makes the worker exit abruptly.
+"""
+
+import json
+import os
+import sys
+
+RESULT_PREFIX = "@@checkcode-result@@"
+ERROR_PREFIX = "@@checkcode-error@@"
+
+
+def check_file(file_path: str):
+    issues = []
+    with open(file_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            column = line.find("#")
+            if column >= 0:
+                issues.append(
+                    {
+                        "id": "NOCHR",
+                        "message": f"Invalid character (worker {os.getpid()})",
+                        "line": line_number,
+                        "column": [column + 1, column + 1],
+                    }
+                )
+    # Like MATLAB's jsonencode, a single issue is encoded as an object rather than an array
+    return issues[0] if len(issues) == 1 else issues
+
+
+def main():
+    for request in sys.stdin:
+        request = request.strip()
+        if not request or request == "quit":
+            break
+        arguments = json.loads(request)
+        file_paths = [a for a in arguments if not a.startswith("-")]
+        if any("crash" in os.path.basename(f) for f in file_paths):
+            os._exit(3)
+        # MATLAB may print unrelated output, which must be ignored
+        print("Warning: something unrelated")
+        try:
+            results = [check_file(f) for f in file_paths]
+        except OSError as err:
+            print(f"{ERROR_PREFIX}{err}", flush=True)
+            continue
+        output = results[0] if len(results) == 1 else results
+        print(f"{RESULT_PREFIX}{json.dumps(output)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""A stand-in for MATLAB's mlint executable, writing the same output format to stderr.
+
+Every line containing '#' is reported as an NOCHR issue.
+"""
+
+import sys
+
+
+def main():
+    file_paths = [a for a in sys.argv[1:] if not a.startswith("-")]
+    for file_path in file_paths:
+        if len(file_paths) > 1:
+            sys.stderr.write(f"========== {file_path} ==========\n")
+        with open(file_path) as f:
+            for line_number, line in enumerate(f, start=1):
+                column = line.find("#")
+                if column >= 0:
+                    sys.stderr.write(
+                        f"L {line_number} (C {column + 1}): NOCHR: Invalid character.\n"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.backend_probe import (
+    MATLAB_BACKEND,
+    MLINT_BACKEND,
+    SAMPLE_CORPUS_SIZE,
+    BackendBenchmark,
+    BackendCapabilities,
+    probe_mlint,
+    select_backend,
+)
+from precommitmatlablint.lint_matlab import main
+from precommitmatlablint.linter_handle import LinterOptions, MatlabHandle, MatlabHandleList
+from precommitmatlablint.return_code import ReturnCode
+from precommitmatlablint.utility import get_state_file
+
+OPTIONS = LinterOptions(
+    fail_warnings=False,
+    enable_cyc=False,
+    enable_mod_cyc=False,
+    ignore_ok_pragmas=False,
+    use_factory_default=False,
+)
+MOD_CYC_OPTIONS = LinterOptions(
+    fail_warnings=False,
+    enable_cyc=False,
+    enable_mod_cyc=True,
+    ignore_ok_pragmas=False,
+    use_factory_default=False,
+)
+ALL_FLAGS = ["-config", "-cyc", "-id", "-m0", "-m2", "-modcyc", "-notok"]
+
+
+def write_script(path: Path, body: str) -> Path:
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+class TestBackendProbe:
+    def test_probe_fake_install(self, fake_matlab_handle: MatlabHandle):
+        assert fake_matlab_handle.needs_probe()
+        fake_matlab_handle.probe_backends()
+
+        mlint = fake_matlab_handle.backends[MLINT_BACKEND]
+        assert mlint.available
+        assert mlint.flags == ALL_FLAGS
+        assert mlint.cold_start_seconds is not None and mlint.cold_start_seconds > 0
+        # mlint works, so MATLAB is not launched
+        matlab = fake_matlab_handle.backends[MATLAB_BACKEND]
+        assert matlab.available
+        assert matlab.cold_start_seconds is None
+        assert not fake_matlab_handle.needs_probe()
+        assert fake_matlab_handle.select_backend(OPTIONS) == MLINT_BACKEND
+
+    @pytest.mark.skipif(
+        sys.platform == "win32", reason="The fake mlint executable is a shell script."
+    )
+    def test_probe_unsupported_flag(self, tmp_path: Path):
+        mlint_path = write_script(
+            tmp_path / "mlint",
+            'case "$*" in *-modcyc*) echo "Unknown option -modcyc" >&2; exit 1;; esac',
+        )
+        mlint = probe_mlint(mlint_path)
+        assert mlint.available
+        assert mlint.flags == [f for f in ALL_FLAGS if f != "-modcyc"]
+
+    @pytest.mark.skipif(
+        sys.platform == "win32", reason="The fake mlint executable is a shell script."
+    )
+    def test_probe_broken_mlint(self, tmp_path: Path):
+        assert not probe_mlint(write_script(tmp_path / "mlint", "exit 3")).available
+        assert not probe_mlint(tmp_path / "missing").available
+
+    def test_select_backend(self):
+        backends = {
+            MLINT_BACKEND: BackendCapabilities(MLINT_BACKEND, True, ["-id", "-m2"], 0.05),
+            MATLAB_BACKEND: BackendCapabilities(MATLAB_BACKEND, True, ALL_FLAGS, None),
+        }
+        assert select_backend(backends, {"-id", "-m2"}) == MLINT_BACKEND
+        # Only MATLAB accepts -modcyc
+        assert select_backend(backends, {"-id", "-m2", "-modcyc"}) == MATLAB_BACKEND
+
+        backends[MATLAB_BACKEND].cold_start_seconds = 0.01
+        assert select_backend(backends, {"-id"}) == MATLAB_BACKEND
+
+        backends[MATLAB_BACKEND].available = False
+        assert select_backend(backends, {"-modcyc"}) is None
+
+    def test_select_backend_from_handle(self, fake_matlab_handle: MatlabHandle):
+        fake_matlab_handle.backends = {
+            MLINT_BACKEND: BackendCapabilities(MLINT_BACKEND, True, ["-id", "-m2"], 0.05),
+            MATLAB_BACKEND: BackendCapabilities(MATLAB_BACKEND, True, ALL_FLAGS, None),
+        }
+        assert fake_matlab_handle.select_backend(OPTIONS) == MLINT_BACKEND
+        assert fake_matlab_handle.select_backend(MOD_CYC_OPTIONS) == MATLAB_BACKEND
+
+    def test_probe_results_are_cached(self, fake_matlab_handle: MatlabHandle, tmp_path: Path):
+        handle_list = MatlabHandleList(tmp_path / "cache_file.yaml")
+        probed_handle = handle_list.probe(fake_matlab_handle)
+        assert not handle_list.has_changes
+
+        reloaded = MatlabHandleList(handle_list.cache_file)
+        reloaded.load()
+        cached_handle = reloaded.find_home_path(fake_matlab_handle.home_path)
+        assert cached_handle is not None
+        assert cached_handle.backends == probed_handle.backends
+        assert not cached_handle.needs_probe()
+
+        # Updating the install changes the modification time of its mlint
+        mlint_path = cached_handle.get_mlint_handle().exe_path
+        stat_result = os.stat(mlint_path)
+        os.utime(mlint_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+        assert cached_handle.needs_probe()
+
+
+class TestBackendBenchmark:
+    def test_benchmark_fake_install(self, fake_matlab_handle: MatlabHandle):
+        fake_matlab_handle.benchmark_backends(repeats=1)
+
+        benchmark = fake_matlab_handle.backends[MLINT_BACKEND].benchmark
+        assert benchmark is not None
+        assert benchmark.file_count == SAMPLE_CORPUS_SIZE
+        assert 0 < benchmark.startup_seconds and 0 < benchmark.warm_seconds
+        assert benchmark.files_per_second > 0
+        # The fake MATLAB executable cannot be launched
+        assert fake_matlab_handle.backends[MATLAB_BACKEND].benchmark is None
+
+    def test_select_backend_by_benchmark(self):
+        backends = {
+            MLINT_BACKEND: BackendCapabilities(
+                MLINT_BACKEND, True, ALL_FLAGS, 0.05, BackendBenchmark(16, 2.0, 1.5, 0.1)
+            ),
+            MATLAB_BACKEND: BackendCapabilities(MATLAB_BACKEND, True, ALL_FLAGS, 5.0, None),
+        }
+        # Without a benchmark of every candidate, the cold starts decide
+        assert select_backend(backends, {"-id"}) == MLINT_BACKEND
+
+        backends[MATLAB_BACKEND].benchmark = BackendBenchmark(16, 9.0, 1.0, 0.8)
+        assert select_backend(backends, {"-id"}) == MATLAB_BACKEND
+
+    def test_benchmark_results_are_cached(self, fake_matlab_handle: MatlabHandle, tmp_path: Path):
+        handle_list = MatlabHandleList(tmp_path / "cache_file.yaml")
+        benchmarked_handle = handle_list.benchmark(fake_matlab_handle, repeats=1)
+
+        reloaded = MatlabHandleList(handle_list.cache_file)
+        reloaded.load()
+        cached_handle = reloaded.find_home_path(fake_matlab_handle.home_path)
+        assert cached_handle is not None
+        assert cached_handle.backends == benchmarked_handle.backends
+        assert cached_handle.backends[MLINT_BACKEND].benchmark is not None
+        assert not cached_handle.needs_probe()
+
+    def test_bench_backends_command(
+        self, fake_matlab_handle: MatlabHandle, tmp_path: Path, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        handle_list = MatlabHandleList(get_state_file("matlab-info-cache.yaml"))
+        handle_list.append(fake_matlab_handle)
+        handle_list.save()
+        output_file = tmp_path / "bench.txt"
+
+        assert ReturnCode.OK == main(["--bench-backends", f"--output={output_file}"])
+
+        output = output_file.read_text()
+        assert f"({fake_matlab_handle.home_path})" in output
+        assert "mlint: cold " in output and "files/s" in output
+        reloaded = MatlabHandleList(handle_list.cache_file)
+        reloaded.load()
+        cached_handle = reloaded.find_home_path(fake_matlab_handle.home_path)
+        assert (
+            cached_handle is not None
+            and cached_handle.backends[MLINT_BACKEND].benchmark is not None
+        )
@@ -0,0 +1,149 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.failure_history import FailureHistory, stop_at_first_failure
+from precommitmatlablint.lint_matlab import validate_matlab
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.return_code import ReturnCode
+from precommitmatlablint.utility import get_state_file
+
+
+def make_report(path: Path, record_id: str = "") -> LinterReport:
+    records = [LinterRecord(id=record_id, message="", line=1, columns=[1])] if record_id else []
+    return LinterReport(source_file=path, records=records)
+
+
+def touch(path: Path, mtime_ns: int) -> Path:
+    path.write_text("x = 1;\n")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+class TestFailureHistory:
+    def test_update_and_reload(self, tmp_path: Path):
+        history = FailureHistory(history_file=tmp_path / "failure-history.json")
+        history.update(make_report(tmp_path / "bad.m", "NOCHR"))
+        history.update(make_report(tmp_path / "cyclomatic.m", "CABE"))
+        history.update(make_report(tmp_path / "good.m"))
+        history.save()
+
+        reloaded = FailureHistory(history_file=history.history_file)
+        reloaded.load()
+        assert list(reloaded.failures) == [str(tmp_path / "bad.m")]
+
+        # Passing files are forgotten
+        reloaded.update(make_report(tmp_path / "bad.m"))
+        assert reloaded.has_changes and reloaded.failures == {}
+
+    def test_saves_of_parallel_runs_are_merged(self, tmp_path: Path):
+        history = FailureHistory(history_file=tmp_path / "failure-history.json")
+        history.update(make_report(tmp_path / "fixed.m", "NOCHR"))
+        history.save()
+
+        first = FailureHistory(history_file=history.history_file)
+        second = FailureHistory(history_file=history.history_file)
+        first.load()
+        second.load()
+        first.update(make_report(tmp_path / "fixed.m"))
+        second.update(make_report(tmp_path / "broken.m", "NOCHR"))
+        first.save()
+        second.save()
+
+        reloaded = FailureHistory(history_file=history.history_file)
+        reloaded.load()
+        assert list(reloaded.failures) == [str(tmp_path / "broken.m")]
+
+    def test_prioritize(self, tmp_path: Path):
+        old = touch(tmp_path / "old.m", 1_000_000_000)
+        new = touch(tmp_path / "new.m", 3_000_000_000)
+        failed_long_ago = touch(tmp_path / "failed_long_ago.m", 1_000_000_000)
+        failed_recently = touch(tmp_path / "failed_recently.m", 1_000_000_000)
+        history = FailureHistory(
+            history_file=tmp_path / "failure-history.json",
+            failures={str(failed_long_ago): 100.0, str(failed_recently): 200.0},
+        )
+
+        assert history.prioritize([old, failed_long_ago, new, failed_recently]) == [
+            failed_recently,
+            failed_long_ago,
+            new,
+            old,
+        ]
+
+    def test_stop_at_first_failure(self, tmp_path: Path):
+        produced: List[Path] = []
+
+        def reports() -> Iterator[LinterReport]:
+            for name, record_id in [
+                ("a.m", ""),
+                ("b.m", "CABE"),
+                ("c.m", "NOCHR"),
+                ("d.m", "NOCHR"),
+            ]:
+                produced.append(tmp_path / name)
+                yield make_report(tmp_path / name, record_id)
+
+        assert [r.source_file.name for r in stop_at_first_failure(reports())] == [
+            "a.m",
+            "b.m",
+            "c.m",
+        ]
+        assert [p.name for p in produced] == ["a.m", "b.m", "c.m"]
+
+    def test_fail_fast(self, fake_matlab_handle, tmp_path: Path):
+        matlab_folder_path = Path(__file__).parent / "data" / "matlab"
+        clean_files = [
+            Path(shutil.copy(matlab_folder_path / "clean_function.m", tmp_path / f"clean_{i}.m"))
+            for i in range(3)
+        ]
+        bad_file = Path(shutil.copy(matlab_folder_path / "invalid_char.m", tmp_path))
+        # The bad file is the oldest, so only its failure history brings it to the front
+        os.utime(bad_file, ns=(0, 0))
+        history = FailureHistory(
+            history_file=tmp_path / "failure-history.json", failures={str(bad_file): 1.0}
+        )
+
+        output_file = tmp_path / "output.txt"
+        return_code = validate_matlab(
+            matlab_handle=fake_matlab_handle,
+            filepaths=[*clean_files, bad_file],
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+            output_file=output_file,
+            quiet=True,
+            summary=True,
+            fail_fast=True,
+            failure_history=history,
+        )
+
+        assert ReturnCode.FAIL == return_code
+        assert output_file.read_text().splitlines()[0] == "Summary: 1 issue(s) in 1 of 1 file(s)"
+        reloaded = FailureHistory(history_file=history.history_file)
+        reloaded.load()
+        assert list(reloaded.failures) == [str(bad_file)]
+        assert reloaded.failures[str(bad_file)] > 1.0
+
+    def test_history_is_left_alone_without_fail_fast(self, fake_matlab_handle, tmp_path: Path):
+        bad_file = Path(
+            shutil.copy(Path(__file__).parent / "data" / "matlab" / "invalid_char.m", tmp_path)
+        )
+        return_code = validate_matlab(
+            matlab_handle=fake_matlab_handle,
+            filepaths=[bad_file],
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+            output_file=tmp_path / "output.txt",
+        )
+
+        assert ReturnCode.FAIL == return_code
+        assert not get_state_file("failure-history.json").exists()
@@ -0,0 +1,177 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint import file_dedupe
+from precommitmatlablint.file_dedupe import Deduplicator
+from precommitmatlablint.lint_matlab import validate_matlab
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.return_code import ReturnCode
+from precommitmatlablint.stat_index import StatIndex
+
+
+def fake_lint(filepaths: List[Path]) -> List[LinterReport]:
+    return [
+        LinterReport(
+            source_file=f,
+            records=[LinterRecord(id="NOCHR", message=f.read_text(), line=1, columns=[1])],
+        )
+        for f in filepaths
+    ]
+
+
+@pytest.fixture
+def matlab_folder_path() -> Path:
+    return Path(__file__).parent / "data" / "matlab"
+
+
+@pytest.fixture
+def vendored_files(tmp_path: Path) -> List[Path]:
+    """Copies of one helper in several subprojects, plus files not to be mistaken for them."""
+    paths: List[Path] = []
+    for folder, name, text in [
+        ("a", "helper.m", "x = 1;\n"),
+        ("b", "helper.m", "x = 1;\n"),
+        ("c", "other.m", "x = 1;\n"),
+        ("d", "helper.m", "x = 2;\n"),
+        ("e", "helper.m", "x = 1;\n"),
+    ]:
+        path = tmp_path / folder / name
+        path.parent.mkdir()
+        path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+class TestDeduplicator:
+    def test_identical_contents_are_linted_once(self, vendored_files: List[Path]):
+        deduplicator = Deduplicator()
+        linted = list(deduplicator.filter(vendored_files))
+
+        # a/helper.m stands in for b/ and e/; other.m has a different name and d/helper.m different
+        # contents
+        assert linted == [vendored_files[0], vendored_files[2], vendored_files[3]]
+        assert deduplicator.duplicate_count == 2
+
+        reports = list(deduplicator.expand(fake_lint(linted)))
+        assert sorted(r.source_file for r in reports) == sorted(vendored_files)
+        for report in reports:
+            assert report.records[0].message == report.source_file.read_text()
+
+    def test_digests_come_from_the_stat_index(self, vendored_files: List[Path], tmp_path: Path):
+        stat_index = StatIndex(index_file=tmp_path / "stat-index.json")
+        digested: List[List[Path]] = []
+
+        def digests(paths: List[Path]):
+            digested.append(list(paths))
+            return stat_index.digests(paths)
+
+        deduplicator = Deduplicator(digests)
+        assert list(deduplicator.filter(vendored_files)) == [
+            vendored_files[0],
+            vendored_files[2],
+            vendored_files[3],
+        ]
+        # The files sharing a name and size are hashed together
+        assert len(digested) == 1
+        assert sorted(digested[0]) == sorted(
+            vendored_files[i] for i in range(len(vendored_files)) if i != 2
+        )
+
+    @pytest.mark.skipif(
+        sys.platform == "win32", reason="Creating symbolic links needs extra privileges on Windows."
+    )
+    def test_symlinks_and_repeated_paths(self, tmp_path: Path):
+        target = tmp_path / "target.m"
+        target.write_text("y = 2;\n")
+        link = tmp_path / "link.m"
+        os.symlink(target, link)
+
+        deduplicator = Deduplicator()
+        assert list(deduplicator.filter([target, link, target])) == [target]
+        reports = list(deduplicator.expand(fake_lint([target])))
+        assert [r.source_file for r in reports] == [target, link, target]
+
+    def test_streamed_duplicates(self, vendored_files: List[Path]):
+        """Duplicates found after their original's report was yielded still get a report."""
+        deduplicator = Deduplicator()
+
+        def reports():
+            for path in deduplicator.filter(vendored_files):
+                yield from fake_lint([path])
+
+        assert sorted(r.source_file for r in deduplicator.expand(reports())) == sorted(
+            vendored_files
+        )
+
+    def test_dropped_entries(self, vendored_files: List[Path], monkeypatch):
+        """A duplicate of a file no longer tracked is linted again."""
+        monkeypatch.setattr(file_dedupe, "MAX_TRACKED_FILES", 1)
+        deduplicator = Deduplicator()
+        linted = list(deduplicator.filter(vendored_files))
+
+        # b/helper.m directly follows a/helper.m, but e/helper.m comes after other files
+        assert linted == [
+            vendored_files[0],
+            vendored_files[2],
+            vendored_files[3],
+            vendored_files[4],
+        ]
+        reports = list(deduplicator.expand(fake_lint(linted)))
+        assert sorted(r.source_file for r in reports) == sorted(vendored_files)
+
+    def test_dropped_reports(self, vendored_files: List[Path], monkeypatch):
+        """A duplicate whose original's report is no longer kept is linted again."""
+        monkeypatch.setattr(file_dedupe, "MAX_RETAINED_REPORTS", 1)
+        deduplicator = Deduplicator()
+        linted: List[Path] = []
+
+        def reports():
+            for path in deduplicator.filter(vendored_files):
+                linted.append(path)
+                yield from fake_lint([path])
+
+        assert sorted(r.source_file for r in deduplicator.expand(reports())) == sorted(
+            vendored_files
+        )
+        # b/helper.m still finds the report of a/helper.m, but e/helper.m comes after two other
+        # reports
+        assert linted == [
+            vendored_files[0],
+            vendored_files[2],
+            vendored_files[3],
+            vendored_files[4],
+        ]
+        assert deduplicator.duplicate_count == 1
+
+    def test_validate_matlab(self, fake_matlab_handle, matlab_folder_path: Path, tmp_path: Path):
+        filepaths: List[Path] = []
+        for folder in ("project_a", "project_b", "project_c"):
+            (tmp_path / folder).mkdir()
+            filepaths.append(
+                Path(shutil.copy(matlab_folder_path / "invalid_char.m", tmp_path / folder))
+            )
+
+        output_file = tmp_path / "output.txt"
+        return_code = validate_matlab(
+            matlab_handle=fake_matlab_handle,
+            filepaths=filepaths,
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+            output_file=output_file,
+            quiet=True,
+            summary=True,
+        )
+
+        assert ReturnCode.FAIL == return_code
+        assert output_file.read_text().splitlines() == [
+            "Summary: 3 issue(s) in 3 of 3 file(s)",
+            "  3  NOCHR",
+        ]
@@ -0,0 +1,121 @@
+import shutil
+import subprocess
+from pathlib import Path
+from typing import List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.file_discovery import (
+    IgnorePattern,
+    find_matlab_files,
+    is_ignored,
+    list_git_matlab_files,
+    scan_matlab_files,
+)
+
+
+def write_files(root: Path, relative_paths: List[str]) -> None:
+    for relative_path in relative_paths:
+        path = root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x = 1;\n")
+
+
+def relative(root: Path, paths) -> List[str]:
+    return sorted(p.relative_to(root).as_posix() for p in paths)
+
+
+class TestIgnorePattern:
+    @pytest.mark.parametrize(
+        "pattern, path, is_dir, expected",
+        [
+            ("*.asv", "a.asv", False, True),
+            ("*.asv", "sub/dir/a.asv", False, True),
+            ("/build", "build", True, True),
+            ("/build", "sub/build", True, False),
+            ("build/", "sub/build", True, True),
+            ("build/", "sub/build", False, False),
+            ("doc/*.m", "doc/a.m", False, True),
+            ("doc/*.m", "doc/sub/a.m", False, False),
+            ("doc/**/*.m", "doc/sub/deeper/a.m", False, True),
+            ("**/generated", "x/y/generated", True, True),
+            ("file[0-9].m", "file7.m", False, True),
+            ("file[!0-9].m", "file7.m", False, False),
+            ("\\#literal.m", "#literal.m", False, True),
+        ],
+    )
+    def test_matches(self, pattern: str, path: str, is_dir: bool, expected: bool):
+        ignore_pattern = IgnorePattern.parse(pattern)
+        assert ignore_pattern is not None
+        assert ignore_pattern.matches(path, is_dir) == expected
+
+    def test_comments_and_blank_lines(self):
+        assert IgnorePattern.parse("# comment") is None
+        assert IgnorePattern.parse("   ") is None
+
+    def test_negation(self):
+        patterns = [IgnorePattern.parse("*.m"), IgnorePattern.parse("!keep.m")]
+        assert is_ignored(patterns, "drop.m", False)
+        assert not is_ignored(patterns, "keep.m", False)
+
+    def test_base(self):
+        pattern = IgnorePattern.parse("/local.m", "sub/")
+        assert pattern.matches("sub/local.m", False)
+        assert not pattern.matches("local.m", False)
+
+
+@pytest.fixture
+def source_tree(tmp_path: Path) -> Path:
+    write_files(
+        tmp_path,
+        [
+            "a.m",
+            "notes.txt",
+            "build/out.m",
+            "src/b.m",
+            "src/scratch.m",
+            "src/keep/scratch.m",
+            "src/vendor/c.m",
+            "tests/d.m",
+        ],
+    )
+    (tmp_path / ".gitignore").write_text("build/\nscratch.m\n!src/keep/scratch.m\n")
+    (tmp_path / "src" / ".gitignore").write_text("/vendor\n")
+    return tmp_path
+
+
+class TestScanMatlabFiles:
+    def test_gitignore(self, source_tree: Path):
+        assert relative(source_tree, scan_matlab_files(source_tree)) == [
+            "a.m",
+            "src/b.m",
+            "src/keep/scratch.m",
+            "tests/d.m",
+        ]
+
+    def test_excludes(self, source_tree: Path):
+        assert relative(
+            source_tree, scan_matlab_files(source_tree, excludes=["tests/", "/a.m"])
+        ) == [
+            "src/b.m",
+            "src/keep/scratch.m",
+        ]
+
+    def test_streams_files(self, source_tree: Path):
+        files = scan_matlab_files(source_tree)
+        assert next(files).name == "a.m"
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+class TestGitMatlabFiles:
+    def test_git_ls_files(self, source_tree: Path):
+        subprocess.run(["git", "init", "-q", str(source_tree)], check=True)
+        subprocess.run(["git", "-C", str(source_tree), "add", "tests/d.m"], check=True)
+        (source_tree / "tests" / "d.m").unlink()
+
+        expected = ["a.m", "src/b.m", "src/keep/scratch.m"]
+        assert relative(source_tree, list_git_matlab_files(source_tree)) == expected
+        assert relative(source_tree, find_matlab_files(source_tree)) == expected
+        assert relative(source_tree, list_git_matlab_files(source_tree, excludes=["src"])) == [
+            "a.m"
+        ]
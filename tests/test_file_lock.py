@@ -0,0 +1,79 @@
+import threading
+from pathlib import Path
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.file_lock import FileLock, atomic_write_text, get_lock_file
+from precommitmatlablint.linter_handle import MatlabHandle, MatlabHandleList
+
+
+class TestFileLock:
+    def test_lock_excludes_other_instances(self, tmp_path: Path):
+        lock_file = tmp_path / "test.lock"
+        first = FileLock(lock_file)
+        second = FileLock(lock_file)
+
+        assert first.acquire()
+        assert not second.acquire(blocking=False)
+        assert not second.acquire(timeout=0.05)
+
+        first.release()
+        assert second.acquire(blocking=False)
+        second.release()
+
+    def test_lock_is_reentrant(self, tmp_path: Path):
+        lock = FileLock(tmp_path / "test.lock")
+        with lock:
+            with lock:
+                assert lock.is_locked()
+            assert lock.is_locked() and lock.is_owned()
+        assert not lock.is_locked() and not lock.is_owned()
+
+    def test_atomic_write_text(self, tmp_path: Path):
+        target_file = tmp_path / "target.txt"
+        atomic_write_text(target_file, "first")
+        atomic_write_text(target_file, "second")
+
+        assert target_file.read_text() == "second"
+        assert [p.name for p in tmp_path.iterdir()] == ["target.txt"]
+
+    def test_concurrent_cache_saves(self, tmp_path: Path):
+        cache_file = tmp_path / "cache_file.yaml"
+        home_paths = [tmp_path / f"R20{idx:02d}a" for idx in range(10)]
+
+        def save_handles(count: int):
+            handle_list = MatlabHandleList(cache_file)
+            for home_path in home_paths[:count]:
+                handle_list.handles.append(
+                    MatlabHandle(
+                        home_path=home_path,
+                        exe_path=MatlabHandle.construct_exe_path(home_path),
+                        base_exe_path=MatlabHandle.construct_base_exe_path(home_path),
+                        version="1.2.3.4",
+                        release="R1234a",
+                    )
+                )
+            for _ in range(5):
+                handle_list.has_changes = True
+                handle_list.save()
+
+        threads = [threading.Thread(target=save_handles, args=(c,)) for c in range(1, 11)]
+        for thread in threads:
+            thread.start()
+
+        # Readers do not take the lock, but must never see a partially written file
+        while any(t.is_alive() for t in threads):
+            reader = MatlabHandleList(cache_file)
+            existed = cache_file.exists()
+            reader.load()
+            if existed:
+                assert len(reader) > 0
+
+        for thread in threads:
+            thread.join()
+
+        assert get_lock_file(cache_file).exists()
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "cache_file.yaml",
+            "cache_file.yaml.lock",
+        ]
@@ -0,0 +1,135 @@
+import io
+import sys
+from pathlib import Path
+from typing import List, Type
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.file_watcher import FileWatcher, InotifyWatcher, PollingWatcher
+from precommitmatlablint.lint_watcher import LintWatcher
+from precommitmatlablint.linter_handle import LinterOptions
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+
+WATCHERS = [
+    PollingWatcher,
+    pytest.param(
+        InotifyWatcher,
+        marks=pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only"),
+    ),
+]
+OPTIONS = LinterOptions(
+    fail_warnings=False,
+    enable_cyc=False,
+    enable_mod_cyc=False,
+    ignore_ok_pragmas=False,
+    use_factory_default=False,
+)
+
+
+class RecordingLinter:
+    def __init__(self):
+        self.linted: List[List[Path]] = []
+
+    def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
+        self.linted.append(list(filepaths))
+        return [
+            LinterReport(
+                source_file=f,
+                records=(
+                    [LinterRecord(id="NOCHR", message="Invalid character.", line=1, columns=[1])]
+                    if "#" in f.read_text()
+                    else []
+                ),
+            )
+            for f in filepaths
+        ]
+
+
+def create_tree(root: Path) -> None:
+    (root / "pkg").mkdir()
+    (root / ".git").mkdir()
+    (root / "a.m").write_text("a = 1;\n")
+    (root / "pkg" / "b.m").write_text("b = 1;\n")
+    (root / "notes.txt").write_text("not MATLAB\n")
+    (root / ".git" / "hidden.m").write_text("hidden = 1;\n")
+
+
+@pytest.mark.parametrize("watcher_class", WATCHERS)
+class TestFileWatcher:
+    def test_initial_files(self, tmp_path: Path, watcher_class: Type[FileWatcher]):
+        create_tree(tmp_path)
+        with watcher_class([tmp_path]) as watcher:
+            assert watcher.files() == {tmp_path / "a.m", tmp_path / "pkg" / "b.m"}
+
+    def test_changes(self, tmp_path: Path, watcher_class: Type[FileWatcher]):
+        create_tree(tmp_path)
+        with watcher_class([tmp_path]) as watcher:
+            assert watcher.wait_for_changes(timeout=0.05) == set()
+
+            (tmp_path / "a.m").write_text("a = 2; % changed\n")
+            (tmp_path / "notes.txt").write_text("still not MATLAB\n")
+            assert watcher.wait_for_changes(timeout=5) == {tmp_path / "a.m"}
+
+            (tmp_path / "pkg" / "sub").mkdir()
+            (tmp_path / "pkg" / "sub" / "c.m").write_text("c = 1;\n")
+            assert tmp_path / "pkg" / "sub" / "c.m" in collect_changes(watcher)
+
+            (tmp_path / "pkg" / "b.m").unlink()
+            assert watcher.wait_for_changes(timeout=5) == {tmp_path / "pkg" / "b.m"}
+            assert watcher.files() == {tmp_path / "a.m", tmp_path / "pkg" / "sub" / "c.m"}
+
+    def test_named_file(self, tmp_path: Path, watcher_class: Type[FileWatcher]):
+        create_tree(tmp_path)
+        with watcher_class([tmp_path / "a.m"]) as watcher:
+            assert watcher.files() == {tmp_path / "a.m"}
+            (tmp_path / "pkg" / "b.m").write_text("b = 2; % changed\n")
+            (tmp_path / "a.m").write_text("a = 2; % changed\n")
+            assert collect_changes(watcher) == {tmp_path / "a.m"}
+
+
+def collect_changes(watcher: FileWatcher) -> set:
+    """Gather changes until they settle; a new folder and its file may arrive as separate events."""
+    changed = watcher.wait_for_changes(timeout=5)
+    while True:
+        more = watcher.wait_for_changes(timeout=0.3)
+        if not more:
+            return changed
+        changed |= more
+
+
+class TestLintWatcher:
+    def test_update_relints_changed_files_only(self, tmp_path: Path):
+        create_tree(tmp_path)
+        linter = RecordingLinter()
+        with PollingWatcher([tmp_path], interval=0.01) as watcher:
+            lint_watcher = LintWatcher(linter, OPTIONS, watcher, io.StringIO())
+            lint_watcher.run_once(watcher.files())
+            assert len(linter.linted[0]) == 2
+
+            (tmp_path / "a.m").write_text("a = 1; # invalid\n")
+            changed = lint_watcher.wait_for_changes(timeout=5)
+            lint_watcher.run_once(changed)
+
+            assert linter.linted[-1] == [tmp_path / "a.m"]
+            assert lint_watcher.reports[tmp_path / "a.m"].has_records()
+            assert not lint_watcher.reports[tmp_path / "pkg" / "b.m"].has_records()
+
+            (tmp_path / "a.m").unlink()
+            lint_watcher.run_once(lint_watcher.wait_for_changes(timeout=5))
+            assert set(lint_watcher.reports) == {tmp_path / "pkg" / "b.m"}
+
+    def test_render_changed_reports(self, tmp_path: Path):
+        create_tree(tmp_path)
+        (tmp_path / "a.m").write_text("a = 1; # invalid\n")
+        stream = io.StringIO()
+        with PollingWatcher([tmp_path]) as watcher:
+            lint_watcher = LintWatcher(RecordingLinter(), OPTIONS, watcher, stream)
+            lint_watcher.run_once({tmp_path / "a.m"})
+
+        lines = stream.getvalue().splitlines()
+        assert lines[:3] == [
+            "mlint found issues:",
+            str(tmp_path / "a.m"),
+            "Line 1 (Column 1): NOCHR: Invalid character.",
+        ]
+        assert lines[-1].startswith("Watching 1 file(s): 1 issue(s) in 1 file(s).")
@@ -1,15 +1,24 @@
 import logging
+import os
 import re
+import shutil
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import pytest  # noqa: F401 # pylint: disable=unused-import
 
+from precommitmatlablint import find_matlab as find_matlab_module
 from precommitmatlablint.find_matlab import (
+    BORROW_ANY,
+    BORROW_NEWER,
+    BORROW_SAME,
     get_matlab_installs,
+    get_release_distance,
     find_matlab,
+    find_mlint_donor,
+    refresh_matlab_installs,
 )
-from precommitmatlablint.linter_handle import MatlabHandle, MatlabHandleList
+from precommitmatlablint.linter_handle import LinterOptions, MatlabHandle, MatlabHandleList
 from precommitmatlablint.return_code import ReturnCode
 
 
@@ -35,6 +44,16 @@ def handle_list(request):
         yield handle_list
 
 
+def make_fake_install(search_root: Path, release_name: str, data_folder_path: Path) -> Path:
+    """Create a folder that looks enough like a MATLAB install to be picked up by a search."""
+    home_path = search_root / release_name
+    exe_path = MatlabHandle.construct_exe_path(home_path)
+    exe_path.parent.mkdir(parents=True)
+    exe_path.touch()
+    shutil.copy(data_folder_path / "version_info" / "VersionInfo.xml", home_path)
+    return home_path
+
+
 class TestFindMatlab:
     def test_get_matlab_installs(self):
         install_list = get_matlab_installs()
@@ -279,3 +298,91 @@ class TestFindMatlab:
             assert len(version) > 0, f"Failed to get version for {handle.home_path}"
             assert len(release_name) > 0, f"Failed to get release name for {handle.home_path}"
             logger.info(f"MATLAB {handle.release} succeeded.")
+
+    def test_refresh_matlab_installs(self, data_folder_path: Path, tmp_path: Path, monkeypatch):
+        search_root = tmp_path / "MATLAB"
+        search_root.mkdir()
+        first_home = make_fake_install(search_root, "R2020a", data_folder_path)
+
+        handle_list = MatlabHandleList(tmp_path / "cache_file.yaml")
+        rescanned = refresh_matlab_installs(
+            handle_list, search_roots=[str(search_root)], platform="linux"
+        )
+        assert rescanned == [str(search_root)]
+        assert handle_list.find_home_path(first_home) is not None
+        handle_list.save()
+
+        # Nothing changed, so the search root must not be listed again
+        def fail_scan(search_root: str, platform: str):
+            raise AssertionError(f"{search_root} should not have been scanned")
+
+        reloaded = MatlabHandleList(handle_list.cache_file)
+        reloaded.load()
+        with monkeypatch.context() as m:
+            m.setattr(find_matlab_module, "find_matlab_home_paths", fail_scan)
+            assert (
+                refresh_matlab_installs(reloaded, search_roots=[str(search_root)], platform="linux")
+                == []
+            )
+        assert not reloaded.has_changes
+
+        # A new install changes the search root's modification time
+        second_home = make_fake_install(search_root, "R2021a", data_folder_path)
+        stat_result = os.stat(search_root)
+        os.utime(search_root, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+        assert refresh_matlab_installs(
+            reloaded, search_roots=[str(search_root)], platform="linux"
+        ) == [str(search_root)]
+        assert reloaded.find_home_path(first_home) is not None
+        assert reloaded.find_home_path(second_home) is not None
+
+    def test_load_legacy_cache_file(self, tmp_path: Path):
+        cache_file = tmp_path / "cache_file.yaml"
+        shutil.copy(Path(__file__).parent / "matlab_info_cache.yaml", cache_file)
+
+        handle_list = MatlabHandleList(cache_file)
+        handle_list.load()
+
+        assert len(handle_list) == 1
+        assert handle_list.search_roots == {}
+
+    def test_release_distance(self):
+        assert get_release_distance("R2021a", "R2021a") == 0
+        assert get_release_distance("R2021b", "R2021a") == 1
+        assert get_release_distance("R2023a", "R2021b") == 3
+        assert get_release_distance("r2020b", "R2021a") == -1
+        assert get_release_distance("", "R2021a") is None
+
+    def test_find_mlint_donor(self, fake_matlab_install, tmp_path: Path):
+        options = LinterOptions(
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+        )
+        target = fake_matlab_install("R2021a", with_mlint=False)
+        handle_list = MatlabHandleList(tmp_path / "cache_file.yaml")
+        handle_list.append(target)
+        for release in ("R2020b", "R2022b", "R2022a"):
+            handle_list.append(fake_matlab_install(release))
+        handle_list.append(fake_matlab_install("R2021b", with_mlint=False))
+        handle_list.save()
+
+        def find_donor(policy: str) -> str:
+            donor = find_mlint_donor(target, options, policy, cache_file=handle_list.cache_file)
+            return "" if donor is None else donor.release
+
+        # R2021b has no mlint either, so the nearest newer release with one is R2022a
+        assert find_donor(BORROW_NEWER) == "R2022a"
+        assert find_donor(BORROW_SAME) == ""
+        assert find_donor(BORROW_ANY) == "R2022a"
+
+        # The probe results of the candidates were saved
+        reloaded = MatlabHandleList(handle_list.cache_file)
+        reloaded.load()
+        donor = reloaded.find_home_path(tmp_path / "MATLAB" / "R2022a")
+        assert donor is not None and not donor.needs_probe()
+
+        with pytest.raises(ValueError):
+            find_mlint_donor(target, options, "older", cache_file=handle_list.cache_file)
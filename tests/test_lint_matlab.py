@@ -1,16 +1,46 @@
+import argparse
+import json
+import logging
+import shutil
+import stat
+import sys
+import time
 from tempfile import TemporaryDirectory
 from typing import List
 
 import pytest  # noqa: F401 # pylint: disable=unused-import
 from pathlib import Path
 
+from precommitmatlablint.backend_probe import MATLAB_BACKEND, BackendCapabilities
+from precommitmatlablint.cost_model import LintCostModel
+from precommitmatlablint.failure_history import FailureHistory
 from precommitmatlablint.find_matlab import (
     get_matlab_installs,
 )
 from precommitmatlablint.linter_handle import MLintHandle, MatlabHandleList, LinterOptions
-from precommitmatlablint.linter_results import LinterReport
-from precommitmatlablint.lint_matlab import validate_matlab, main
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint import lint_matlab
+from precommitmatlablint.lint_matlab import (
+    RunStores,
+    get_background_lint_command,
+    merge_release_reports,
+    validate_matlab,
+    validate_matlab_matrix,
+    main,
+    start_matlab_warm_up,
+)
+from precommitmatlablint.result_cache import LintResultCache
 from precommitmatlablint.return_code import ReturnCode
+from precommitmatlablint.utility import get_state_file
+
+
+MATRIX_LINT_OPTIONS = dict(
+    fail_warnings=False,
+    enable_cyc=False,
+    enable_mod_cyc=False,
+    ignore_ok_pragmas=False,
+    use_factory_default=False,
+)
 
 
 @pytest.fixture(scope="module")
@@ -502,3 +532,422 @@ class TestLintMatlab:
         linter_reports: List[LinterReport] = mlint_handle.lint(filepaths=[test_file], options=options)
 
         assert len(linter_reports) == 1
+
+
+class TestRunStores:
+    def test_load(self):
+        supplied = LintResultCache()
+        stores = RunStores.load(result_cache=supplied)
+        assert stores.result_cache is supplied
+        assert stores.run_records is not None and stores.stat_index is not None
+        # Only fail-fast runs use the failure history
+        assert stores.failure_history is None
+        assert RunStores.load(fail_fast=True).failure_history is not None
+
+    def test_load_without_result_cache(self):
+        stores = RunStores.load(use_result_cache=False)
+        assert stores.result_cache is None and stores.run_records is None
+        assert stores.stat_index is None
+        assert stores.cost_model is not None
+
+
+class TestLintMatlabOutput:
+    def test_summary(self, fake_matlab_handle, matlab_folder_path: Path, tmp_path: Path):
+        output_file = tmp_path / "output.txt"
+        return_code = validate_matlab(
+            matlab_handle=fake_matlab_handle,
+            filepaths=[
+                matlab_folder_path / "invalid_char.m",
+                matlab_folder_path / "clean_function.m",
+            ],
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+            output_file=output_file,
+            quiet=True,
+            summary=True,
+            jobs=2,
+        )
+
+        assert ReturnCode.FAIL == return_code
+        assert output_file.read_text().splitlines() == [
+            "Summary: 1 issue(s) in 1 of 2 file(s)",
+            "  1  NOCHR",
+        ]
+        assert get_state_file("lint-stats.json").exists()
+
+    def test_text_output(
+        self, fake_matlab_handle, matlab_folder_path: Path, tmp_path: Path, capsys, monkeypatch
+    ):
+        # Keep the MATLAB handle cache out of the real home folder
+        monkeypatch.setenv("HOME", str(tmp_path))
+        filepaths = [matlab_folder_path / "clean_function.m", matlab_folder_path / "invalid_char.m"]
+        return_code = main(
+            [f"--matlab-home-path={fake_matlab_handle.home_path}", *[str(f) for f in filepaths]]
+        )
+
+        assert int(ReturnCode.FAIL) == return_code
+        assert capsys.readouterr().out.splitlines() == [
+            str(filepaths[0]),
+            "mlint found issues:",
+            str(filepaths[1]),
+            "Line 2 (Column 1): NOCHR: Invalid character.",
+        ]
+
+    def test_all(
+        self, fake_matlab_handle, matlab_folder_path: Path, tmp_path: Path, capsys, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        root = tmp_path / "repo"
+        shutil.copytree(matlab_folder_path, root)
+        (root / ".gitignore").write_text("*.m\n!clean_function.m\n")
+
+        return_code = main(
+            [
+                f"--matlab-home-path={fake_matlab_handle.home_path}",
+                "--quiet",
+                "--summary",
+                "--all",
+                str(root),
+            ]
+        )
+
+        assert int(ReturnCode.OK) == return_code
+        summary = capsys.readouterr().out.splitlines()[0]
+        assert summary == "Summary: 0 issue(s) in 0 of 1 file(s)"
+
+    def test_borrow_mlint(
+        self, fake_matlab_install, matlab_folder_path: Path, tmp_path: Path, capsys, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        target = fake_matlab_install("R2021a", with_mlint=False)
+        handle_list = MatlabHandleList()
+        handle_list.append(fake_matlab_install("R2022a"))
+        handle_list.save()
+
+        test_file = matlab_folder_path / "invalid_char.m"
+        return_code = main(
+            [f"--matlab-home-path={target.home_path}", "--borrow-mlint=newer", str(test_file)]
+        )
+
+        assert int(ReturnCode.FAIL) == return_code
+        assert (
+            "Line 2 (Column 1): NOCHR: Invalid character." in capsys.readouterr().out.splitlines()
+        )
+
+        output_file = tmp_path / "output.json"
+        main(
+            [
+                f"--matlab-home-path={target.home_path}",
+                "--borrow-mlint=newer",
+                "--format=json",
+                f"--output={output_file}",
+                str(test_file),
+            ]
+        )
+        assert json.loads(output_file.read_text())["borrowed_mlint"] == {
+            "release": "R2022a",
+            "home_path": str(handle_list.handles[0].home_path),
+        }
+
+    def test_speculative_warm_up(
+        self, fake_matlab_install, matlab_folder_path: Path, tmp_path: Path, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        handle = fake_matlab_install("R2021a", with_mlint=False)
+        # MATLAB itself is a stand-in for a checkcode worker
+        fake_worker = Path(__file__).parent / "data" / "fake_matlab" / "fake_matlab_worker.py"
+        handle.exe_path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{fake_worker}"\n')
+        handle.exe_path.chmod(handle.exe_path.stat().st_mode | stat.S_IXUSR)
+        handle.backends = {MATLAB_BACKEND: BackendCapabilities(MATLAB_BACKEND, True, [], None)}
+        handle.probed_mtime = handle.get_install_mtime()
+        handle_list = MatlabHandleList()
+        handle_list.append(handle)
+        handle_list.save()
+
+        output_file = tmp_path / "output.txt"
+        return_code = main(
+            [
+                f"--matlab-home-path={handle.home_path}",
+                f"--output={output_file}",
+                "--format=ndjson",
+                "--matlab-workers=1",
+                str(matlab_folder_path / "invalid_char.m"),
+            ]
+        )
+
+        assert int(ReturnCode.FAIL) == return_code
+        assert "(worker " in output_file.read_text()
+
+    def test_no_warm_up_without_workers(self, fake_matlab_install):
+        handle = fake_matlab_install("R2021a", with_mlint=False)
+        handle.backends = {MATLAB_BACKEND: BackendCapabilities(MATLAB_BACKEND, True, [], None)}
+        handle.probed_mtime = handle.get_install_mtime()
+        options = LinterOptions(
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+        )
+
+        # The default of a single MATLAB process is not switched to workers by the warm-up
+        assert start_matlab_warm_up(handle, options, None, 0, 0, None, logging.getLogger()) is None
+
+    def test_warm_up_is_stopped_on_errors(
+        self, fake_matlab_install, matlab_folder_path: Path, tmp_path: Path, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        handle = fake_matlab_install("R2021a")
+        handle_list = MatlabHandleList()
+        handle_list.append(handle)
+        handle_list.save()
+
+        class FakeWorkerPool:
+            closed = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.closed = True
+
+        worker_pool = FakeWorkerPool()
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("Unable to list the files")
+
+        monkeypatch.setattr(lint_matlab, "start_matlab_warm_up", lambda *args: worker_pool)
+        monkeypatch.setattr(lint_matlab, "get_filepaths", fail)
+        with pytest.raises(RuntimeError):
+            main(
+                [
+                    f"--matlab-home-path={handle.home_path}",
+                    str(matlab_folder_path / "invalid_char.m"),
+                ]
+            )
+
+        assert worker_pool.closed
+
+    def test_no_warm_up_for_mlint(self, fake_matlab_handle):
+        options = LinterOptions(
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+        )
+        fake_matlab_handle.probe_backends()
+        assert (
+            start_matlab_warm_up(fake_matlab_handle, options, None, 0, 0, None, logging.getLogger())
+            is None
+        )
+
+
+class TestReleaseMatrix:
+    def test_merge_release_reports(self, tmp_path: Path):
+        nosemi = LinterRecord(
+            id="NOSEMI", message="Terminate statement with semicolon.", line=3, columns=[5]
+        )
+        agrow = LinterRecord(
+            id="AGROW", message="The variable appears to change size.", line=1, columns=[1]
+        )
+        release_reports = {
+            "R2021a": [LinterReport(Path("a.m"), [nosemi, agrow]), LinterReport(Path("b.m"))],
+            "R2023b": [LinterReport(Path("b.m")), LinterReport(Path("a.m"), [nosemi])],
+        }
+        report_files: List[Path] = []
+        for release_name, reports in release_reports.items():
+            report_file = tmp_path / f"{release_name}.ndjson"
+            report_file.write_text("".join(json.dumps(r.to_dict()) + "\n" for r in reports))
+            report_files.append(report_file)
+
+        merged = list(merge_release_reports(list(release_reports), report_files))
+
+        assert [r.source_file for r in merged] == [Path("a.m"), Path("b.m")]
+        assert [str(r) for r in merged[0].records] == [
+            "Line 1 (Column 1): AGROW: [R2021a] The variable appears to change size.",
+            "Line 3 (Column 5): NOSEMI: [R2021a, R2023b] Terminate statement with semicolon.",
+        ]
+        assert merged[1].records == []
+
+    def test_matrix_run(
+        self, fake_matlab_install, matlab_folder_path: Path, tmp_path: Path, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        handle_list = MatlabHandleList()
+        handle_list.append(fake_matlab_install("R2021a"))
+        handle_list.append(fake_matlab_install("R2022a"))
+        handle_list.save()
+
+        output_file = tmp_path / "output.json"
+        filepaths = [matlab_folder_path / "clean_function.m", matlab_folder_path / "invalid_char.m"]
+        return_code = main(
+            [
+                "--matlab-release-name=R2021a, R2022a",
+                "--format=json",
+                f"--output={output_file}",
+                *[str(f) for f in filepaths],
+            ]
+        )
+
+        assert int(ReturnCode.FAIL) == return_code
+        output = json.loads(output_file.read_text())
+        assert output["releases"] == ["R2021a", "R2022a"]
+        assert [r["source_file"] for r in output["reports"]] == [str(f) for f in filepaths]
+        assert [r["message"] for r in output["reports"][1]["records"]] == [
+            "[R2021a, R2022a] Invalid character."
+        ]
+
+    def test_matrix_orders_by_the_failure_history_and_saves_once(
+        self, fake_matlab_install, matlab_folder_path: Path, tmp_path: Path
+    ):
+        saves: List[str] = []
+
+        class CountingCostModel(LintCostModel):
+            def save(self) -> None:
+                saves.append("cost model")
+                super().save()
+
+        handles = [fake_matlab_install("R2021a"), fake_matlab_install("R2022a")]
+        clean_file = matlab_folder_path / "clean_function.m"
+        invalid_file = matlab_folder_path / "invalid_char.m"
+        failure_history = FailureHistory(history_file=tmp_path / "failure-history.json")
+        failure_history.failures[str(clean_file)] = time.time()
+        output_file = tmp_path / "output.json"
+        return_code = validate_matlab_matrix(
+            handles,
+            [invalid_file, clean_file],
+            report_format="json",
+            output_file=output_file,
+            fail_fast=True,
+            use_result_cache=False,
+            cost_model=CountingCostModel(stats_file=tmp_path / "lint-stats.json"),
+            failure_history=failure_history,
+            **MATRIX_LINT_OPTIONS,
+        )
+
+        assert ReturnCode.FAIL == return_code
+        # Both releases linted the file that failed before first
+        output = json.loads(output_file.read_text())
+        assert [r["source_file"] for r in output["reports"]] == [str(clean_file), str(invalid_file)]
+        assert saves == ["cost model"]
+        assert set(json.loads(failure_history.history_file.read_text())["failures"]) == {
+            str(invalid_file)
+        }
+
+    def test_matrix_reports_unchecked_files(
+        self, fake_matlab_install, matlab_folder_path: Path, tmp_path: Path
+    ):
+        handles = [fake_matlab_install("R2021a"), fake_matlab_install("R2022a")]
+        filepaths = [matlab_folder_path / "clean_function.m", matlab_folder_path / "invalid_char.m"]
+        finished: List[List[Path]] = []
+        output_file = tmp_path / "output.json"
+        return_code = validate_matlab_matrix(
+            handles,
+            filepaths,
+            report_format="json",
+            output_file=output_file,
+            use_result_cache=False,
+            cost_model=LintCostModel(stats_file=tmp_path / "lint-stats.json"),
+            time_budget=0,
+            over_budget="fail",
+            finish_unchecked=lambda handle, unchecked: finished.append(unchecked),
+            **MATRIX_LINT_OPTIONS,
+        )
+
+        assert ReturnCode.FAIL == return_code
+        output = json.loads(output_file.read_text())
+        assert sorted(output["unchecked_files"]) == sorted(str(f) for f in filepaths)
+        assert len(finished) == 2
+
+    def test_missing_release(
+        self, fake_matlab_install, matlab_folder_path: Path, tmp_path: Path, monkeypatch
+    ):
+        monkeypatch.setenv("HOME", str(tmp_path))
+        handle_list = MatlabHandleList()
+        handle_list.append(fake_matlab_install("R2021a"))
+        handle_list.save()
+
+        return_code = main(
+            [
+                "--matlab-release-name=R2021a,R2022a",
+                str(matlab_folder_path / "clean_function.m"),
+            ]
+        )
+
+        assert int(ReturnCode.FAIL) == return_code
+
+    @pytest.mark.parametrize(
+        "option", ["--matlab-home-path=/opt/matlab", "--matlab-version=9.10.0.1602886"]
+    )
+    def test_single_install_options_are_rejected(self, option: str):
+        with pytest.raises(SystemExit):
+            main([option, "--matlab-release-name=R2021a,R2022a", "clean_function.m"])
+
+
+class TestTimeBudget:
+    @pytest.mark.parametrize(
+        "over_budget, expected", [("pass", ReturnCode.OK), ("fail", ReturnCode.FAIL)]
+    )
+    def test_unchecked_files(
+        self,
+        fake_matlab_handle,
+        matlab_folder_path: Path,
+        tmp_path: Path,
+        over_budget: str,
+        expected: ReturnCode,
+    ):
+        filepaths = [
+            matlab_folder_path / "clean_function.m",
+            matlab_folder_path / "growing_array.m",
+        ]
+        unchecked: List[Path] = []
+        return_code = validate_matlab(
+            matlab_handle=fake_matlab_handle,
+            filepaths=filepaths,
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+            report_format="json",
+            output_file=tmp_path / "output.json",
+            time_budget=0.0,
+            over_budget=over_budget,
+            finish_unchecked=lambda handle, files: unchecked.extend(files),
+        )
+
+        assert expected == return_code
+        assert sorted(unchecked) == sorted(filepaths)
+        output = json.loads((tmp_path / "output.json").read_text())
+        assert sorted(output["unchecked_files"]) == sorted(str(f) for f in filepaths)
+        assert output["return_code"] == int(expected)
+        assert not (tmp_path / "run-records.json").exists()
+
+    def test_background_lint_command(self, fake_matlab_handle, tmp_path: Path):
+        config_file = tmp_path / "checkcode.txt"
+        args = argparse.Namespace(
+            max_matlab_processes=1,
+            max_mlint_processes=2,
+            matlab_workers=0,
+            jobs=3,
+            treat_warning_as_error=True,
+            enable_modified_cyclomaticity=False,
+            enable_cyclomaticity=False,
+            ignore_ok_pragmas=False,
+            use_default_checkcode_config=False,
+            no_precheck=False,
+            checkcode_config_file=str(config_file),
+            borrow_mlint=None,
+        )
+
+        command = get_background_lint_command(fake_matlab_handle, [tmp_path / "a.m"], args)
+
+        assert command[:3] == [sys.executable, "-m", "precommitmatlablint.lint_matlab"]
+        assert f"--matlab-home-path={fake_matlab_handle.home_path}" in command
+        assert "--treat-warning-as-error" in command
+        assert f"--checkcode-config-file={config_file}" in command
+        assert command[-1] == str(tmp_path / "a.m")
@@ -0,0 +1,229 @@
+import dataclasses
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.cost_model import LintCostModel
+from precommitmatlablint.lint_pipeline import LintPipeline
+from precommitmatlablint.lint_scheduler import BatchScheduler
+from precommitmatlablint.linter_handle import (
+    DeadlineExceeded,
+    LinterError,
+    LinterOptions,
+    MLintHandle,
+)
+from precommitmatlablint.linter_results import MISSING_REPORT_ID, LinterRecord, LinterReport
+from precommitmatlablint.result_cache import LintResultCache, get_options_key
+from precommitmatlablint.stat_index import StatIndex
+
+OPTIONS = LinterOptions(
+    fail_warnings=False,
+    enable_cyc=False,
+    enable_mod_cyc=False,
+    ignore_ok_pragmas=False,
+    use_factory_default=False,
+)
+
+
+class ContentLinter:
+    """Reports one record per file, holding the file's contents, and remembers what it linted."""
+
+    def __init__(self, fail_on: str = "", out_of_time_on: str = "", skip: str = ""):
+        self.linted: List[Path] = []
+        self.fail_on = fail_on
+        self.out_of_time_on = out_of_time_on
+        self.skip = skip
+        self._lock = threading.Lock()
+
+    def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
+        with self._lock:
+            self.linted.extend(filepaths)
+        if any(f.name == self.fail_on for f in filepaths):
+            raise RuntimeError(f"Cannot lint {self.fail_on}")
+        if any(f.name == self.out_of_time_on for f in filepaths):
+            raise DeadlineExceeded()
+        return [
+            LinterReport(
+                source_file=f, records=[LinterRecord(id="NOCHR", message=f.read_text(), line=1)]
+            )
+            for f in filepaths
+            if f.name != self.skip
+        ]
+
+
+def make_files(folder: Path, count: int) -> List[Path]:
+    paths: List[Path] = []
+    for index in range(count):
+        path = folder / f"file_{index}.m"
+        path.write_text(f"x = {index};\n")
+        paths.append(path)
+    return paths
+
+
+def make_pipeline(
+    linter: ContentLinter, result_cache=None, jobs: int = 2, queue_size: int = 4
+) -> LintPipeline:
+    scheduler = BatchScheduler(
+        linter, "content", jobs=jobs, cost_model=LintCostModel(), max_batch_files=3
+    )
+    return LintPipeline(scheduler, result_cache, queue_size=queue_size)
+
+
+class TestLintPipeline:
+    @pytest.mark.parametrize("balance", [False, True])
+    def test_reports_in_input_order(self, tmp_path: Path, balance: bool):
+        filepaths = make_files(tmp_path, 40)
+        linter = ContentLinter()
+
+        def stream() -> Iterator[Path]:
+            yield from filepaths
+
+        reports = list(
+            make_pipeline(linter).lint(filepaths if balance else stream(), OPTIONS, balance=balance)
+        )
+
+        assert [r.source_file for r in reports] == filepaths
+        assert [r.records[0].message for r in reports] == [f.read_text() for f in filepaths]
+        assert sorted(linter.linted) == sorted(filepaths)
+
+    def test_result_cache(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 10)
+        cache_file = tmp_path / "lint-results.json"
+        result_cache = LintResultCache(cache_file=cache_file)
+        list(make_pipeline(ContentLinter(), result_cache).lint(filepaths, OPTIONS))
+        result_cache.save()
+
+        filepaths[3].write_text("changed = 1;\n")
+        reloaded = LintResultCache(cache_file=cache_file)
+        reloaded.load()
+        linter = ContentLinter()
+        pipeline = make_pipeline(linter, reloaded)
+        reports = list(pipeline.lint(filepaths, OPTIONS))
+
+        assert linter.linted == [filepaths[3]]
+        assert pipeline.cache_hits == 9
+        assert [r.records[0].message for r in reports] == [f.read_text() for f in filepaths]
+
+    def test_files_are_hashed_in_chunks(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 10)
+        chunks: List[List[Path]] = []
+
+        class RecordingStatIndex(StatIndex):
+            def digests(self, paths, executor=None):
+                chunks.append(list(paths))
+                return super().digests(paths, executor)
+
+        stat_index = RecordingStatIndex(index_file=tmp_path / "stat-index.json")
+        result_cache = LintResultCache(cache_file=tmp_path / "lint-results.json")
+        pipeline = make_pipeline(ContentLinter(), result_cache, queue_size=4)
+        pipeline.stat_index = stat_index
+        reports = list(pipeline.lint(iter(filepaths), OPTIONS))
+
+        assert [r.source_file for r in reports] == filepaths
+        # No chunk holds more files than may be in flight
+        assert chunks == [filepaths[0:4], filepaths[4:8], filepaths[8:10]]
+
+    def test_skipped_files_are_not_cached(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 6)
+        result_cache = LintResultCache(cache_file=tmp_path / "lint-results.json")
+        reports = list(
+            make_pipeline(ContentLinter(skip=filepaths[1].name), result_cache).lint(
+                filepaths, OPTIONS
+            )
+        )
+
+        assert [r.source_file for r in reports] == filepaths
+        # A file the linter skipped fails rather than passing unchecked
+        assert [r.id for r in reports[1].records] == [MISSING_REPORT_ID]
+        assert all(
+            r.records[0].message == f.read_text()
+            for index, (r, f) in enumerate(zip(reports, filepaths))
+            if index != 1
+        )
+        # Each result is cached under the name of the file it belongs to
+        assert len(result_cache.results) == 5
+        for key, records in result_cache.results.items():
+            assert records[0]["message"] == (tmp_path / key.split(":")[1]).read_text()
+
+    def test_result_cache_saves_of_parallel_runs_are_merged(self, tmp_path: Path):
+        cache_file = tmp_path / "lint-results.json"
+        first = LintResultCache(cache_file=cache_file)
+        second = LintResultCache(cache_file=cache_file)
+        first.put("first", [])
+        second.put("second", [])
+        first.save()
+        second.save()
+
+        reloaded = LintResultCache(cache_file=cache_file)
+        reloaded.load()
+        assert list(reloaded.results) == ["first", "second"]
+
+    def test_options_key(self, tmp_path: Path):
+        config_file = tmp_path / "checkcode.txt"
+        config_file.write_text("a\n")
+        options = LinterOptions(
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+            checkcode_config_file=config_file,
+        )
+        key = get_options_key("mlint", options)
+        assert key != get_options_key("other mlint", options)
+        assert key != get_options_key("mlint", OPTIONS)
+        config_file.write_text("b\n")
+        assert key != get_options_key("mlint", options)
+
+    def test_stop_early(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 100)
+        linter = ContentLinter()
+        reports = make_pipeline(linter, queue_size=2, jobs=1).lint(iter(filepaths), OPTIONS)
+
+        assert next(reports).source_file == filepaths[0]
+        reports.close()
+        # Only a bounded number of files was read ahead of the reports taken
+        assert len(linter.linted) < 20
+
+    def test_linter_errors_reach_the_caller(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 10)
+        with pytest.raises(RuntimeError, match="file_7.m"):
+            list(make_pipeline(ContentLinter(fail_on="file_7.m")).lint(filepaths, OPTIONS))
+
+    def test_failed_mlint_batches_are_not_cached(self, tmp_path: Path):
+        if sys.platform == "win32":
+            pytest.skip("The failing mlint stand-in is a shell script.")
+        failing_mlint = tmp_path / "failing_mlint"
+        failing_mlint.write_text("#!/bin/sh\necho 'Fatal: license checkout failed' >&2\nexit 3\n")
+        failing_mlint.chmod(0o755)
+        filepaths = make_files(tmp_path, 4)
+        result_cache = LintResultCache(cache_file=tmp_path / "lint-results.json")
+        scheduler = BatchScheduler(MLintHandle(exe_path=failing_mlint), "failing", jobs=2)
+
+        with pytest.raises(LinterError, match="status 3"):
+            list(LintPipeline(scheduler, result_cache).lint(filepaths, OPTIONS))
+        assert result_cache.results == {}
+
+    def test_nothing_is_linted_past_the_deadline(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 10)
+        linter = ContentLinter()
+        pipeline = make_pipeline(linter)
+        options = dataclasses.replace(OPTIONS, deadline=time.monotonic() - 1)
+
+        assert list(pipeline.lint(filepaths, options)) == []
+        assert pipeline.unchecked == filepaths
+        assert linter.linted == []
+
+    def test_batches_killed_at_the_deadline_are_unchecked(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 10)
+        pipeline = make_pipeline(ContentLinter(out_of_time_on="file_4.m"), jobs=1)
+        options = dataclasses.replace(OPTIONS, deadline=time.monotonic() + 60)
+
+        reports = list(pipeline.lint(filepaths, options))
+
+        assert filepaths[4] in pipeline.unchecked
+        assert sorted([r.source_file for r in reports] + pipeline.unchecked) == sorted(filepaths)
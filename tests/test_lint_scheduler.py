@@ -0,0 +1,151 @@
+from pathlib import Path
+from typing import List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.cost_model import LintCostModel
+from precommitmatlablint.lint_scheduler import BatchScheduler, plan_batches
+from precommitmatlablint.linter_handle import LinterOptions
+from precommitmatlablint.linter_results import MISSING_REPORT_ID, LinterReport
+
+
+class RecordingLinter:
+    def __init__(self):
+        self.batches: List[List[Path]] = []
+
+    def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
+        self.batches.append(list(filepaths))
+        return [LinterReport(source_file=f) for f in filepaths]
+
+
+class TestPlanBatches:
+    def test_giant_file_is_scheduled_first_and_alone(self):
+        estimates = [0.1] * 20 + [5.0]
+        batches = plan_batches(estimates, workers=2, startup_seconds=0.05)
+
+        assert batches[0].indices == [20]
+        assert sorted(i for b in batches for i in b.indices) == list(range(21))
+
+    def test_batches_are_balanced(self):
+        estimates = [3.0, 3.0, 2.0, 2.0, 2.0, 2.0]
+        batches = plan_batches(estimates, workers=2, startup_seconds=10.0)
+
+        assert len(batches) == 2
+        assert [b.estimated_seconds for b in batches] == [7.0, 7.0]
+
+    def test_max_batch_files(self):
+        batches = plan_batches([0.01] * 25, workers=1, startup_seconds=0.05, max_batch_files=10)
+
+        assert [len(b.indices) for b in batches] == [9, 8, 8]
+
+    def test_single_worker(self):
+        batches = plan_batches([0.2, 0.1, 0.3], workers=1, startup_seconds=0.05)
+
+        assert [b.indices for b in batches] == [[0, 1, 2]]
+
+
+class TestLintCostModel:
+    def test_fit_startup_and_per_byte_cost(self):
+        cost_model = LintCostModel()
+        for total_bytes in [1_000, 10_000, 100_000]:
+            cost_model.observe_batch(
+                "mlint", [(Path("a.m"), total_bytes)], 0.5 + total_bytes * 1e-5
+            )
+
+        startup, per_byte = cost_model.get_linter_costs("mlint")
+        assert startup == pytest.approx(0.5)
+        assert per_byte == pytest.approx(1e-5)
+
+    def test_file_estimates_follow_observations(self):
+        cost_model = LintCostModel()
+        big, small = Path("big.m"), Path("small.m")
+        cost_model.observe_batch("mlint", [(big, 1_000), (small, 1_000)], 2.0)
+
+        # Both files had the same size and therefore the same share
+        assert cost_model.estimate_file("mlint", big, 1_000) == pytest.approx(
+            cost_model.estimate_file("mlint", small, 1_000)
+        )
+        # A changed size falls back to the per-byte estimate
+        _, per_byte = cost_model.get_linter_costs("mlint")
+        assert cost_model.estimate_file("mlint", big, 3_000) == pytest.approx(3_000 * per_byte)
+
+    def test_save_and_load(self, tmp_path: Path):
+        cost_model = LintCostModel(stats_file=tmp_path / "lint-stats.json")
+        cost_model.observe_batch("mlint", [(Path("a.m"), 100)], 0.2)
+        cost_model.save()
+
+        loaded = LintCostModel(stats_file=cost_model.stats_file)
+        loaded.load()
+        assert loaded.files == cost_model.files
+        assert loaded.get_linter_costs("mlint") == cost_model.get_linter_costs("mlint")
+
+    def test_saves_of_parallel_runs_are_merged(self, tmp_path: Path):
+        first = LintCostModel(stats_file=tmp_path / "lint-stats.json")
+        second = LintCostModel(stats_file=first.stats_file)
+        first.observe_batch("mlint", [(Path("a.m"), 100)], 0.2)
+        second.observe_batch("matlab", [(Path("b.m"), 100)], 5.0)
+        first.save()
+        second.save()
+
+        loaded = LintCostModel(stats_file=first.stats_file)
+        loaded.load()
+        assert set(loaded.linters) == {"mlint", "matlab"}
+        assert set(loaded.files) == {"a.m", "b.m"}
+
+
+class TestBatchScheduler:
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_reports_keep_input_order(self, tmp_path: Path, jobs: int):
+        filepaths = []
+        for index in range(12):
+            filepath = tmp_path / f"file{index}.m"
+            filepath.write_text("x = 1;\n" * (index * 100 + 1))
+            filepaths.append(filepath)
+        filepaths.append(filepaths[0])
+
+        linter = RecordingLinter()
+        cost_model = LintCostModel(stats_file=tmp_path / "lint-stats.json")
+        scheduler = BatchScheduler(
+            linter, "recording", jobs=jobs, cost_model=cost_model, max_batch_files=5
+        )
+        reports = scheduler.lint(filepaths, options=None)
+
+        assert [r.source_file for r in reports] == filepaths
+        assert all(len(b) <= 5 for b in linter.batches)
+        assert len(cost_model.files) == 12
+
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_lint_stream_keeps_input_order(self, tmp_path: Path, jobs: int):
+        filepaths = []
+        for index in range(30):
+            filepath = tmp_path / f"file{index}.m"
+            filepath.write_text("x = 1;\n")
+            filepaths.append(filepath)
+
+        linter = RecordingLinter()
+        scheduler = BatchScheduler(linter, "recording", jobs=jobs, max_batch_files=4)
+        reports = scheduler.lint_stream(iter(filepaths), options=None)
+
+        assert [r.source_file for r in reports] == filepaths
+        assert all(len(b) <= 4 for b in linter.batches)
+
+    def test_reports_are_matched_by_source_file(self, tmp_path: Path):
+        filepaths = []
+        for index in range(4):
+            filepath = tmp_path / f"file{index}.m"
+            filepath.write_text("x = 1;\n")
+            filepaths.append(filepath)
+
+        class SkippingLinter(RecordingLinter):
+            """Reports in reverse order, and skips the second file."""
+
+            def lint(self, filepaths: List[Path], options: LinterOptions) -> List[LinterReport]:
+                reports = super().lint(filepaths, options)
+                return [r for r in reversed(reports) if r.source_file.name != "file1.m"]
+
+        scheduler = BatchScheduler(SkippingLinter(), "skipping", jobs=1)
+        reports = scheduler.lint(filepaths, options=None)
+
+        assert [r.source_file for r in reports] == filepaths
+        assert [r.has_failures() for r in reports] == [False, True, False, False]
+        assert [r.id for r in reports[1].records] == [MISSING_REPORT_ID]
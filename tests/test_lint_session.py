@@ -0,0 +1,112 @@
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from precommitmatlablint.lint_session import LintSession
+from precommitmatlablint.linter_handle import MatlabHandle, MLintHandle
+from precommitmatlablint.utility import get_state_file
+
+
+@pytest.fixture
+def matlab_folder_path() -> Path:
+    return Path(__file__).parent / "data" / "matlab"
+
+
+@pytest.fixture
+def session(fake_matlab_handle: MatlabHandle):
+    with LintSession(fake_matlab_handle) as session:
+        yield session
+
+
+@pytest.fixture
+def filepaths(matlab_folder_path: Path, tmp_path: Path) -> List[Path]:
+    paths = [tmp_path / "invalid_char.m", tmp_path / "clean_function.m"]
+    for path in paths:
+        shutil.copy(matlab_folder_path / path.name, path)
+    return paths
+
+
+class TestLintSession:
+    def test_lint(self, session: LintSession, filepaths: List[Path], capsys):
+        reports = list(session.lint(filepaths))
+
+        assert [r.source_file for r in reports] == filepaths
+        assert reports[0].has_records() and not reports[1].has_records()
+        assert capsys.readouterr().out == ""
+
+    def test_unchanged_files_are_not_linted_again(
+        self, session: LintSession, filepaths: List[Path], monkeypatch
+    ):
+        linted: List[Path] = []
+        mlint_lint = MLintHandle.lint
+
+        def counting_lint(self, paths, options):
+            linted.extend(paths)
+            return mlint_lint(self, paths, options)
+
+        monkeypatch.setattr(MLintHandle, "lint", counting_lint)
+
+        first_reports = list(session.lint(filepaths))
+        assert list(session.lint(filepaths)) == first_reports
+        assert sorted(linted) == sorted(filepaths)
+
+    def test_lint_from_several_threads(self, session: LintSession, filepaths: List[Path]):
+        expected = list(session.lint(filepaths))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: list(session.lint(filepaths)), range(8)))
+        assert all(reports == expected for reports in results)
+
+    def test_close(self, session: LintSession, filepaths: List[Path]):
+        list(session.lint(filepaths))
+        unstarted_reports = session.lint(filepaths)
+        session.close()
+
+        assert session.closed
+        assert get_state_file("lint-results.json").exists()
+        with pytest.raises(ValueError):
+            session.lint(filepaths)
+        with pytest.raises(ValueError):
+            next(unstarted_reports)
+        # Closing again does nothing
+        session.close()
+
+    def test_close_with_partly_read_reports(self, session: LintSession, filepaths: List[Path]):
+        reports = session.lint(filepaths)
+        next(reports)
+
+        closer = threading.Thread(target=session.close)
+        closer.start()
+        closer.join(timeout=60)
+
+        assert not closer.is_alive()
+        assert list(reports) == []
+
+    def test_close_while_other_threads_lint(self, session: LintSession, filepaths: List[Path]):
+        def lint_until_closed() -> None:
+            try:
+                while True:
+                    for _ in session.lint(filepaths):
+                        time.sleep(0.01)
+            except ValueError:
+                pass
+
+        threads = [threading.Thread(target=lint_until_closed) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        session.close()
+        for thread in threads:
+            thread.join(timeout=60)
+
+        assert not any(thread.is_alive() for thread in threads)
+
+    def test_find_missing_matlab(self, tmp_path: Path):
+        with pytest.raises(FileNotFoundError):
+            LintSession.find(
+                matlab_home_path=tmp_path / "missing", cache_file=tmp_path / "cache_file.yaml"
+            )
@@ -0,0 +1,126 @@
+import shutil
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.linter_handle import LinterOptions
+from precommitmatlablint.matlab_workers import MatlabWorkerError, MatlabWorkerPool
+from precommitmatlablint.process_slots import ProcessSlotPool
+
+
+@pytest.fixture(scope="module")
+def worker_command(request) -> List[str]:
+    worker_script = Path(__file__).parent / "data" / "fake_matlab" / "fake_matlab_worker.py"
+    return [sys.executable, str(worker_script)]
+
+
+@pytest.fixture(scope="module")
+def matlab_folder_path(request) -> Path:
+    root_dir = Path(__file__).parent
+    return root_dir / "data" / "matlab"
+
+
+@pytest.fixture(scope="module")
+def options(request) -> LinterOptions:
+    return LinterOptions(
+        fail_warnings=False,
+        enable_cyc=False,
+        enable_mod_cyc=False,
+        ignore_ok_pragmas=False,
+        use_factory_default=False,
+    )
+
+
+def worker_ids(pool: MatlabWorkerPool, filepaths: List[Path], options: LinterOptions) -> set:
+    reports = pool.lint(filepaths, options)
+    return {r.message for report in reports for r in report.records}
+
+
+class TestMatlabWorkerPool:
+    def test_lint(self, worker_command, matlab_folder_path, options):
+        filepaths = [
+            matlab_folder_path / "invalid_char.m",
+            matlab_folder_path / "clean_function.m",
+        ] * 5
+        with MatlabWorkerPool(worker_command, size=2, batch_size=3) as pool:
+            reports = pool.lint(filepaths, options)
+            assert len(pool) == 2
+
+        assert [r.source_file for r in reports] == filepaths
+        for report in reports:
+            if report.source_file.name == "invalid_char.m":
+                assert [(r.id, r.line, r.columns) for r in report.records] == [("NOCHR", 2, [1, 1])]
+            else:
+                assert not report.has_records()
+
+    def test_single_file_jobs(self, worker_command, matlab_folder_path, options):
+        with MatlabWorkerPool(worker_command, size=1, batch_size=1) as pool:
+            reports = pool.lint([matlab_folder_path / "invalid_char.m"], options)
+
+        assert len(reports) == 1
+        assert len(reports[0].records) == 1
+
+    def test_workers_are_recycled(self, worker_command, matlab_folder_path, options):
+        filepaths = [matlab_folder_path / "invalid_char.m"] * 4
+        with MatlabWorkerPool(worker_command, size=1, batch_size=1, max_jobs_per_worker=2) as pool:
+            assert len(worker_ids(pool, filepaths, options)) == 2
+
+    def test_crashed_workers_are_restarted(
+        self, worker_command, matlab_folder_path, options, tmp_path
+    ):
+        crash_file = tmp_path / "crash.m"
+        shutil.copy(matlab_folder_path / "invalid_char.m", crash_file)
+        filepaths = [matlab_folder_path / "invalid_char.m"]
+        with MatlabWorkerPool(worker_command, size=1, batch_size=1) as pool:
+            first_ids = worker_ids(pool, filepaths, options)
+            with pytest.raises(MatlabWorkerError):
+                pool.lint([crash_file], options)
+            second_ids = worker_ids(pool, filepaths, options)
+
+        assert len(first_ids) == 1
+        assert len(second_ids) == 1
+        assert first_ids != second_ids
+
+    def test_pool_respects_process_slots(
+        self, worker_command, matlab_folder_path, options, tmp_path
+    ):
+        slot_pool = ProcessSlotPool("matlab", 1, runtime_folder=tmp_path)
+        with MatlabWorkerPool(worker_command, size=3, slot_pool=slot_pool) as pool:
+            pool.warm_up()
+            assert len(pool) == 1
+            assert slot_pool.try_acquire() is None
+            reports = pool.lint([matlab_folder_path / "invalid_char.m"] * 3, options)
+            assert len(reports) == 3
+
+        slot_lock = slot_pool.try_acquire()
+        assert slot_lock is not None
+        slot_lock.release()
+
+    def test_warm_up_in_background(self, worker_command, matlab_folder_path, options):
+        with MatlabWorkerPool(worker_command, size=2) as pool:
+            pool.warm_up_in_background()
+            reports = pool.lint([matlab_folder_path / "invalid_char.m"] * 2, options)
+            # The first job waited for the warm-up instead of starting a worker of its own
+            assert len(pool) == 2
+
+        assert len(reports) == 2
+
+    def test_failed_warm_up(self, options, matlab_folder_path, tmp_path):
+        with MatlabWorkerPool([str(tmp_path / "missing_matlab")], size=1) as pool:
+            pool.warm_up_in_background()
+            with pytest.raises(OSError):
+                pool.lint([matlab_folder_path / "invalid_char.m"], options)
+
+    def test_failed_restart(self, worker_command, matlab_folder_path, options, tmp_path):
+        crash_file = tmp_path / "crash.m"
+        shutil.copy(matlab_folder_path / "invalid_char.m", crash_file)
+        slot_pool = ProcessSlotPool("matlab", 1, runtime_folder=tmp_path)
+        with MatlabWorkerPool(worker_command, size=3, batch_size=1, slot_pool=slot_pool) as pool:
+            pool.warm_up()
+            # Replacing the crashed worker fails while the other jobs wait for it
+            pool.worker_command = [str(tmp_path / "missing_matlab")]
+            with pytest.raises((MatlabWorkerError, OSError)):
+                pool.lint([crash_file] * 3, options)
+            assert len(pool) == 0
@@ -0,0 +1,199 @@
+import dataclasses
+import io
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.linter_handle import (
+    DeadlineExceeded,
+    LinterError,
+    LinterOptions,
+    MLintHandle,
+)
+from precommitmatlablint.linter_results import LinterRecord
+from precommitmatlablint.mlint_parser import (
+    MlintOutputParser,
+    build_reports,
+    iter_mlint_output,
+    iter_reports,
+    read_mlint_output,
+)
+
+MLINT_OUTPUT = """========== /work/first.m ==========
+L 46 (C 1-6): GVMIS: Global variables are inefficient. Use a function with input variables instead.
+L 5004 (C 59): INUSL: Input argument 'helpUrl' might be unused: consider replacing it by ~.
+
+    ========== /work/second file.m ==========\r
+    L 2 (C 1): NOCHR: Invalid character.  \r
+L 0 (C 0): MDOTM: Filename 'second file.m' must be a valid MATLAB identifier.
+"""
+EXPECTED_RECORDS = [
+    LinterRecord(
+        id="GVMIS",
+        message="Global variables are inefficient. Use a function with input variables instead.",
+        line=46,
+        columns=[1, 6],
+    ),
+    LinterRecord(
+        id="INUSL",
+        message="Input argument 'helpUrl' might be unused: consider replacing it by ~.",
+        line=5004,
+        columns=[59],
+    ),
+    LinterRecord(id="NOCHR", message="Invalid character.", line=2, columns=[1]),
+    LinterRecord(
+        id="MDOTM",
+        message="Filename 'second file.m' must be a valid MATLAB identifier.",
+        line=0,
+        columns=[0],
+    ),
+]
+OPTIONS = LinterOptions(
+    fail_warnings=False,
+    enable_cyc=False,
+    enable_mod_cyc=False,
+    ignore_ok_pragmas=False,
+    use_factory_default=False,
+)
+EXPECTED_ITEMS = [
+    "/work/first.m",
+    *EXPECTED_RECORDS[:2],
+    "/work/second file.m",
+    *EXPECTED_RECORDS[2:],
+]
+
+
+class TestMlintParser:
+    @pytest.mark.parametrize("convert", [str, str.encode, lambda text: memoryview(text.encode())])
+    def test_iter_mlint_output(self, convert):
+        assert list(iter_mlint_output(convert(MLINT_OUTPUT))) == EXPECTED_ITEMS
+
+    def test_matches_line_parser(self):
+        """Each record equals what LinterRecord.from_mlint makes of its line."""
+        lines = [line.strip() for line in MLINT_OUTPUT.splitlines()]
+        expected = [
+            LinterRecord.from_mlint(line) for line in lines if line and not line.startswith("===")
+        ]
+        assert [
+            item for item in iter_mlint_output(MLINT_OUTPUT) if isinstance(item, LinterRecord)
+        ] == expected
+
+    def test_unexpected_lines(self):
+        output = "L 3 (C 2-4) ID WITHOUT COLONS\nsomething else: entirely\n\n"
+        assert list(iter_mlint_output(output)) == [
+            LinterRecord.from_mlint("L 3 (C 2-4) ID WITHOUT COLONS"),
+            LinterRecord.from_mlint("something else: entirely"),
+        ]
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096])
+    def test_chunked_output(self, chunk_size: int):
+        data = MLINT_OUTPUT.encode()
+        parser = MlintOutputParser()
+        items: List = []
+        for start in range(0, len(data), chunk_size):
+            items.extend(parser.feed(data[start : start + chunk_size]))
+        items.extend(parser.close())
+        assert items == EXPECTED_ITEMS
+
+    def test_build_reports(self):
+        files = [Path("/work/first.m"), Path("/work/second file.m")]
+        reports = build_reports(iter_mlint_output(MLINT_OUTPUT), files)
+        assert [r.source_file for r in reports] == files
+        assert [r.records for r in reports] == [EXPECTED_RECORDS[:2], EXPECTED_RECORDS[2:]]
+
+        single = build_reports(
+            iter_mlint_output("L 2 (C 1): NOCHR: Invalid character.\n"), files[:1]
+        )
+        assert single[0].records == [EXPECTED_RECORDS[2]]
+
+    def test_parse_mlint_output(self):
+        files = [Path("/work/first.m"), Path("/work/second file.m")]
+        assert MLintHandle.parse_mlint_output(
+            MLINT_OUTPUT.encode(), files
+        ) == MLintHandle.parse_mlint_output(MLINT_OUTPUT, files)
+        assert [r.has_records() for r in MLintHandle.parse_mlint_output(b"", files)] == [
+            False,
+            False,
+        ]
+
+    def test_read_mlint_output(self):
+        stream = io.BufferedReader(io.BytesIO(MLINT_OUTPUT.encode()), buffer_size=16)
+        assert list(read_mlint_output(stream, chunk_size=5)) == EXPECTED_ITEMS
+
+    def test_reports_are_yielded_as_they_complete(self):
+        consumed: List = []
+
+        def items():
+            for item in EXPECTED_ITEMS:
+                consumed.append(item)
+                yield item
+
+        reports = iter_reports(items(), [Path("/work/first.m"), Path("/work/second file.m")])
+        first = next(reports)
+        assert first.records == EXPECTED_RECORDS[:2]
+        # Only the boundary of the second file had to be read to complete the first report
+        assert consumed == EXPECTED_ITEMS[:4]
+
+    def test_iter_lint(self, fake_matlab_handle, tmp_path: Path):
+        dirty = tmp_path / "dirty.m"
+        dirty.write_text("x = 1; # comment\ny = 2;\nz = #3;\n")
+        clean = tmp_path / "clean.m"
+        clean.write_text("x = 1;\n")
+        mlint_handle = fake_matlab_handle.get_mlint_handle()
+
+        reports = list(mlint_handle.iter_lint([dirty, clean], OPTIONS))
+        assert [r.source_file for r in reports] == [dirty, clean]
+        assert [(r.id, r.line) for r in reports[0].records] == [("NOCHR", 1), ("NOCHR", 3)]
+        assert not reports[1].has_records()
+
+        assert [r.has_records() for r in mlint_handle.lint([clean, clean], OPTIONS)] == [
+            False,
+            False,
+        ]
+
+    def test_iter_lint_stops_at_deadline(self, fake_matlab_handle, tmp_path: Path):
+        if sys.platform == "win32":
+            pytest.skip("The slow mlint stand-in is a shell script.")
+        slow_mlint = tmp_path / "slow_mlint"
+        slow_mlint.write_text("#!/bin/sh\nexec sleep 30\n")
+        slow_mlint.chmod(0o755)
+        clean = tmp_path / "clean.m"
+        clean.write_text("x = 1;\n")
+        options = dataclasses.replace(OPTIONS, deadline=time.monotonic() + 0.2)
+
+        assert not options.deadline_passed()
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            MLintHandle(exe_path=slow_mlint).lint([clean], options)
+        assert time.monotonic() - start < 10
+        assert options.deadline_passed()
+        assert not OPTIONS.deadline_passed()
+        # Nothing is launched once the deadline has passed
+        with pytest.raises(DeadlineExceeded):
+            fake_matlab_handle.get_mlint_handle().lint([clean], options)
+
+    @pytest.mark.parametrize(
+        "script,match",
+        [
+            ("echo 'Fatal: license checkout failed' >&2\nexit 3", "status 3"),
+            ("echo 'Fatal: license checkout failed' >&2", "without any file boundaries"),
+        ],
+    )
+    def test_iter_lint_fails_with_mlint(self, tmp_path: Path, script: str, match: str):
+        if sys.platform == "win32":
+            pytest.skip("The failing mlint stand-in is a shell script.")
+        failing_mlint = tmp_path / "failing_mlint"
+        failing_mlint.write_text(f"#!/bin/sh\n{script}\n")
+        failing_mlint.chmod(0o755)
+        clean = tmp_path / "clean.m"
+        clean.write_text("x = 1;\n")
+        other = tmp_path / "other.m"
+        other.write_text("y = 2;\n")
+
+        reports = MLintHandle(exe_path=failing_mlint).iter_lint([clean, other], OPTIONS)
+        with pytest.raises(LinterError, match=match):
+            # Not even the last report is yielded before the exit status is known
+            next(reports)
@@ -0,0 +1,197 @@
+import codecs
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.lint_matlab import validate_matlab
+from precommitmatlablint.linter_results import LinterReport
+from precommitmatlablint.matlab_tokenizer import TokenKind, tokenize
+from precommitmatlablint.prechecks import PrecheckEngine, Prechecks
+from precommitmatlablint.return_code import ReturnCode
+
+
+def kinds_and_texts(text: str) -> List[Tuple[TokenKind, str]]:
+    return [(t.kind, t.text) for t in tokenize(text) if t.kind != TokenKind.NEWLINE]
+
+
+def record_ids(tmp_path: Path, text: str) -> List[str]:
+    source_file = tmp_path / "source.m"
+    source_file.write_text(text)
+    result = PrecheckEngine().check(source_file)
+    return [r.id for r in result.to_report().records]
+
+
+class TestTokenize:
+    def test_transpose_and_strings(self):
+        assert kinds_and_texts("x = [a' 'str'];") == [
+            (TokenKind.IDENTIFIER, "x"),
+            (TokenKind.OPERATOR, "="),
+            (TokenKind.OPEN, "["),
+            (TokenKind.IDENTIFIER, "a"),
+            (TokenKind.OPERATOR, "'"),
+            (TokenKind.STRING, "'str'"),
+            (TokenKind.CLOSE, "]"),
+            (TokenKind.OPERATOR, ";"),
+        ]
+
+    def test_escaped_quotes(self):
+        assert kinds_and_texts("""s = 'it''s'; t = "say ""hi\"\"";""")[2:7] == [
+            (TokenKind.STRING, "'it''s'"),
+            (TokenKind.OPERATOR, ";"),
+            (TokenKind.IDENTIFIER, "t"),
+            (TokenKind.OPERATOR, "="),
+            (TokenKind.STRING, '"say ""hi"""'),
+        ]
+
+    def test_keywords_as_fields_and_indices(self):
+        tokens = kinds_and_texts("y = s.end + x(end);")
+        assert (TokenKind.IDENTIFIER, "end") in tokens
+        assert (TokenKind.KEYWORD, "end") in tokens
+
+    def test_command_syntax(self):
+        assert kinds_and_texts("hold on # not code") == [
+            (TokenKind.IDENTIFIER, "hold"),
+            (TokenKind.COMMAND_TEXT, " on # not code"),
+        ]
+        assert kinds_and_texts("x = 1")[1] == (TokenKind.OPERATOR, "=")
+
+    def test_comments(self):
+        tokens = list(tokenize("a = 1; % note\n%{\nblock # comment\n%}\nb = 2 ...\n  + 1"))
+        assert [
+            t.kind for t in tokens if t.kind in (TokenKind.COMMENT, TokenKind.CONTINUATION)
+        ] == [
+            TokenKind.COMMENT,
+            TokenKind.COMMENT,
+            TokenKind.CONTINUATION,
+        ]
+        assert [(t.text, t.line) for t in tokens if t.text == "b"] == [("b", 5)]
+
+    def test_invalid_and_unterminated(self):
+        tokens = list(tokenize("a = b # c\nd = 'open"))
+        assert [(t.kind, t.line, t.column) for t in tokens if t.kind == TokenKind.INVALID] == [
+            (TokenKind.INVALID, 1, 7)
+        ]
+        assert [t.kind for t in tokens][-1] == TokenKind.UNTERMINATED_STRING
+
+
+class TestPrecheckRules:
+    @pytest.mark.parametrize(
+        "text, expected_ids",
+        [
+            ("function f\nx = 1;\nend\n", []),
+            ("function f\nx = 1;\n", []),
+            ("function f\nif x\ny = 1;\nend\n", []),
+            ("function f\nfor k = 1:3\nend\n", []),
+            ("x = 1;\nif x\n  y = x(end);\n", ["PREEND"]),
+            ("x = 1;\nend\n", ["PREEND"]),
+            ("function f\nend\nfunction g\n", ["PREEND"]),
+            ("x = (1 + 2;\n", ["PREBRK"]),
+            ("x = [1 2);\n", ["PREBRK"]),
+            ("x = 'abc;\n", ["PRESTR"]),
+            ("x = 1 # 2;\n", ["PRECHR"]),
+            ("% only a comment with # and 'quotes\n", []),
+            (
+                "classdef C < handle\nproperties\nx\nend\nmethods\nfunction "
+                "f(obj)\nend\nend\nend\n",
+                [],
+            ),
+            ("classdef C\nmethods\nfunction f(obj)\nend\nend\n", ["PREEND"]),
+            ("function f(x)\narguments\nx double\nend\ny = x;\nend\n", []),
+            ("function f(x)\narguments (Input)\nx double\nend\nend\n", []),
+            ("function f\narguments = 1;\nend\n", []),
+        ],
+    )
+    def test_rules(self, tmp_path: Path, text: str, expected_ids: List[str]):
+        assert record_ids(tmp_path, text) == expected_ids
+
+    def test_byte_order_mark(self, tmp_path: Path):
+        source_file = tmp_path / "bom.m"
+        source_file.write_bytes(codecs.BOM_UTF8 + b"x = 1;\n")
+        result = PrecheckEngine().check(source_file)
+        assert [r.id for r in result.records] == ["PREBOM"]
+        assert not result.has_errors()
+
+    def test_encoding(self, tmp_path: Path):
+        source_file = tmp_path / "latin1.m"
+        source_file.write_bytes("x = 1;\n% café\n".encode("latin-1"))
+        result = PrecheckEngine().check(source_file)
+        assert [(r.id, r.line) for r in result.records] == [("PREENC", 2)]
+
+    def test_needs_linter(self, tmp_path: Path):
+        comments_only = tmp_path / "comments.m"
+        comments_only.write_text("% nothing here\n\n")
+        code = tmp_path / "code.m"
+        code.write_text("x = 1;\n")
+
+        engine = PrecheckEngine()
+        assert not engine.check(comments_only).needs_linter
+        assert engine.check(code).needs_linter
+
+
+class TestPrechecks:
+    def test_filter_and_merge(self, tmp_path: Path):
+        comments_only = tmp_path / "comments.m"
+        comments_only.write_text("% nothing here\n")
+        bom = tmp_path / "bom.m"
+        bom.write_bytes(codecs.BOM_UTF8 + b"x = 1;\n")
+
+        code = tmp_path / "code.m"
+        code.write_text("x = 1;\n")
+
+        prechecks = Prechecks()
+        lint_files = list(prechecks.filter([comments_only, bom, code]))
+        assert lint_files == [bom, code]
+
+        reports = list(
+            prechecks.merge([LinterReport(source_file=bom), LinterReport(source_file=code)])
+        )
+        # The reports come out in input order
+        assert [(r.source_file, [rec.id for rec in r.records]) for r in reports] == [
+            (comments_only, []),
+            (bom, ["PREBOM"]),
+            (code, []),
+        ]
+
+    def test_merge_interleaves_skipped_files(self, tmp_path: Path):
+        first = tmp_path / "first.m"
+        first.write_text("x = 1;\n")
+        comments_only = tmp_path / "comments.m"
+        comments_only.write_text("% nothing here\n")
+        last = tmp_path / "last.m"
+        last.write_text("y = 1;\n")
+
+        prechecks = Prechecks()
+        reports = prechecks.merge(
+            LinterReport(source_file=f) for f in prechecks.filter([first, comments_only, last])
+        )
+        assert [r.source_file for r in reports] == [first, comments_only, last]
+
+
+class TestFastFeedback:
+    def test_definite_errors_skip_the_linter(self, fake_matlab_handle, tmp_path: Path):
+        broken = tmp_path / "broken.m"
+        broken.write_text("x = (1 + 2;\n")
+        clean = tmp_path / "clean.m"
+        clean.write_text("y = 1;\n")
+        output_file = tmp_path / "output.txt"
+
+        return_code = validate_matlab(
+            matlab_handle=fake_matlab_handle,
+            filepaths=[broken, clean],
+            fail_warnings=False,
+            enable_cyc=False,
+            enable_mod_cyc=False,
+            ignore_ok_pragmas=False,
+            use_factory_default=False,
+            output_file=output_file,
+            fast_feedback=True,
+        )
+
+        assert ReturnCode.FAIL == return_code
+        # Had mlint run, the clean file would be listed too
+        assert output_file.read_text().splitlines() == [
+            "mlint found issues:",
+            str(broken),
+            "Line 1 (Column 5): PREBRK: '(' is not closed.",
+        ]
@@ -0,0 +1,73 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.process_slots import ProcessSlotPool
+
+
+class TestProcessSlotPool:
+    def test_slots_are_shared_between_pools(self, tmp_path: Path):
+        first = ProcessSlotPool("test", 2, runtime_folder=tmp_path)
+        second = ProcessSlotPool("test", 2, runtime_folder=tmp_path)
+
+        held = [first.try_acquire(), first.try_acquire()]
+        assert all(h is not None for h in held)
+        assert second.try_acquire() is None
+
+        held[0].release()
+        slot_lock = second.try_acquire()
+        assert slot_lock is not None
+        slot_lock.release()
+        held[1].release()
+
+    def test_unlimited_pool(self, tmp_path: Path):
+        pool = ProcessSlotPool("test", 0, runtime_folder=tmp_path)
+        assert not pool.is_limited()
+        assert pool.acquire() is None
+        with pool.slot():
+            pass
+        assert list(tmp_path.iterdir()) == []
+
+    def test_concurrency_is_limited(self, tmp_path: Path):
+        max_slots = 2
+        running = 0
+        peak = 0
+        counter_lock = threading.Lock()
+
+        def work():
+            nonlocal running, peak
+            # Separate pool objects stand in for separate hook processes
+            with ProcessSlotPool("test", max_slots, runtime_folder=tmp_path).slot():
+                with counter_lock:
+                    running += 1
+                    peak = max(peak, running)
+                time.sleep(0.02)
+                with counter_lock:
+                    running -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak == max_slots
+
+    def test_acquire_waits_for_a_slot(self, tmp_path: Path):
+        holder = ProcessSlotPool("test", 1, runtime_folder=tmp_path)
+        waiter = ProcessSlotPool("test", 1, runtime_folder=tmp_path)
+        held = holder.acquire()
+        acquired = threading.Event()
+
+        def wait_for_slot():
+            with waiter.slot():
+                acquired.set()
+
+        thread = threading.Thread(target=wait_for_slot)
+        thread.start()
+        assert not acquired.wait(0.05)
+        held.release()
+        assert acquired.wait(5)
+        thread.join()
@@ -0,0 +1,167 @@
+import io
+import json
+from pathlib import Path
+from typing import List
+from xml.etree import ElementTree  # nosec B405 - parses our own output only
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.report_writers import (
+    REPORT_WRITERS,
+    BufferedTextStream,
+    Reporter,
+    create_report_writer,
+)
+from precommitmatlablint.return_code import ReturnCode
+
+
+@pytest.fixture(scope="module")
+def linter_reports(request) -> List[LinterReport]:
+    return [
+        LinterReport(source_file=Path("clean_function.m").absolute()),
+        LinterReport(
+            source_file=Path("invalid_char.m").absolute(),
+            records=[
+                LinterRecord(id="NOCHR", message="Invalid character.", line=2, columns=[1, 1]),
+                LinterRecord(
+                    id="CABE", message="The McCabe complexity is 1.", line=1, columns=[10, 21]
+                ),
+            ],
+        ),
+    ]
+
+
+def write_reports(report_format: str, linter_reports: List[LinterReport]) -> str:
+    stream = io.StringIO()
+    report_writer = create_report_writer(report_format, stream)
+    report_writer.begin()
+    for report in linter_reports:
+        report_writer.write_report(report)
+    report_writer.end(ReturnCode.FAIL)
+    return stream.getvalue()
+
+
+class TestReportWriters:
+    def test_text(self, linter_reports):
+        output = write_reports("text", linter_reports)
+        assert output.splitlines() == [
+            str(linter_reports[0].source_file),
+            "mlint found issues:",
+            str(linter_reports[1].source_file),
+            "Line 2 (Columns 1-1): NOCHR: Invalid character.",
+            "Line 1 (Columns 10-21): CABE: The McCabe complexity is 1.",
+        ]
+
+    def test_json(self, linter_reports):
+        document = json.loads(write_reports("json", linter_reports))
+        assert document["return_code"] == int(ReturnCode.FAIL)
+        assert [LinterReport.from_dict(r) for r in document["reports"]] == linter_reports
+
+    def test_ndjson(self, linter_reports):
+        lines = write_reports("ndjson", linter_reports).splitlines()
+        assert [LinterReport.from_dict(json.loads(line)) for line in lines] == linter_reports
+
+    def test_sarif(self, linter_reports):
+        document = json.loads(write_reports("sarif", linter_reports))
+        assert document["version"] == "2.1.0"
+        run = document["runs"][0]
+        assert [r["ruleId"] for r in run["results"]] == ["NOCHR", "CABE"]
+        assert [r["level"] for r in run["results"]] == ["error", "note"]
+        region = run["results"][0]["locations"][0]["physicalLocation"]["region"]
+        assert region == {"startLine": 2, "startColumn": 1, "endColumn": 2}
+        assert run["invocations"][0]["exitCode"] == int(ReturnCode.FAIL)
+        assert "properties" not in run
+
+    def test_metadata(self):
+        for report_format in ["json", "sarif"]:
+            stream = io.StringIO()
+            report_writer = create_report_writer(report_format, stream)
+            report_writer.metadata["shard"] = [1, 2]
+            report_writer.begin()
+            report_writer.end(ReturnCode.OK)
+            document = json.loads(stream.getvalue())
+            if report_format == "sarif":
+                document = document["runs"][0]["properties"]
+            assert document["shard"] == [1, 2]
+
+    def test_junit(self, linter_reports):
+        root = ElementTree.fromstring(write_reports("junit", linter_reports))  # nosec B314
+        test_cases = root.findall("./testsuite/testcase")
+        assert [t.get("name") for t in test_cases] == [str(r.source_file) for r in linter_reports]
+        assert test_cases[0].find("failure") is None
+        assert test_cases[1].find("failure") is not None
+
+    @pytest.mark.parametrize("report_format", sorted(REPORT_WRITERS))
+    def test_no_reports(self, report_format):
+        output = write_reports(report_format, [])
+        if report_format in {"json", "sarif"}:
+            json.loads(output)
+        elif report_format == "junit":
+            ElementTree.fromstring(output)  # nosec B314
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            create_report_writer("yaml", io.StringIO())
+
+
+class TestReporter:
+    def test_verdict_and_counts(self, linter_reports):
+        stream = io.StringIO()
+        reporter = Reporter(create_report_writer("text", stream), quiet=True, summary=True)
+        reporter.begin()
+        for report in linter_reports:
+            reporter.add(report)
+
+        assert reporter.finish() == ReturnCode.FAIL
+        assert reporter.id_counts == {"NOCHR": 1, "CABE": 1}
+        assert stream.getvalue().splitlines()[0] == "Summary: 2 issue(s) in 1 of 2 file(s)"
+
+    @pytest.mark.parametrize("fail, expected", [(False, ReturnCode.OK), (True, ReturnCode.FAIL)])
+    def test_unchecked(self, fail: bool, expected: ReturnCode):
+        unchecked = [Path("growing_array.m").absolute()]
+        for report_format in sorted(REPORT_WRITERS):
+            stream = io.StringIO()
+            reporter = Reporter(create_report_writer(report_format, stream))
+            reporter.begin()
+            reporter.add_unchecked(unchecked, fail=fail)
+
+            assert reporter.finish() == expected
+            output = stream.getvalue()
+            if report_format == "json":
+                assert json.loads(output)["unchecked_files"] == [str(unchecked[0])]
+            elif report_format == "sarif":
+                run = json.loads(output)["runs"][0]
+                assert run["properties"]["unchecked_files"] == [str(unchecked[0])]
+            elif report_format == "junit":
+                root = ElementTree.fromstring(output)  # nosec B314
+                test_case = root.find("./testsuite/testcase")
+                assert test_case.get("name") == str(unchecked[0])
+                assert test_case.find("skipped") is not None
+            elif report_format == "text":
+                assert output.splitlines() == ["Not checked:", f"  {unchecked[0]}"]
+
+    def test_mccabe_records_pass(self):
+        report = LinterReport(
+            records=[LinterRecord(id="CABE", message="The McCabe complexity is 1.")]
+        )
+        reporter = Reporter(create_report_writer("text", io.StringIO()))
+        reporter.add(report)
+        assert reporter.finish() == ReturnCode.OK
+
+    def test_buffered_stream(self):
+        class CountingStream(io.StringIO):
+            write_count = 0
+
+            def write(self, text: str) -> int:
+                self.write_count += 1
+                return super().write(text)
+
+        target = CountingStream()
+        stream = BufferedTextStream(target, buffer_size=100)
+        for _ in range(50):
+            stream.write("0123456789")
+        stream.flush()
+
+        assert target.getvalue() == "0123456789" * 50
+        assert target.write_count == 5
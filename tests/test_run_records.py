@@ -0,0 +1,125 @@
+import shutil
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from precommitmatlablint.lint_matlab import validate_matlab
+from precommitmatlablint.linter_handle import MLintHandle
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.result_cache import LintResultCache
+from precommitmatlablint.return_code import ReturnCode
+from precommitmatlablint.run_records import RunRecorder, RunRecordStore, compute_run_digest
+
+
+@pytest.fixture
+def matlab_folder_path() -> Path:
+    return Path(__file__).parent / "data" / "matlab"
+
+
+def make_files(folder: Path) -> List[Path]:
+    paths = [folder / "a.m", folder / "b.m", folder / "c.m"]
+    for index, path in enumerate(paths):
+        path.write_text(f"x = {index};\n")
+    return paths
+
+
+class TestRunDigest:
+    def test_order_does_not_matter(self, tmp_path: Path):
+        paths = make_files(tmp_path)
+        assert compute_run_digest(paths, "key") == compute_run_digest(list(reversed(paths)), "key")
+
+    def test_everything_else_matters(self, tmp_path: Path):
+        paths = make_files(tmp_path)
+        digest = compute_run_digest(paths, "key")
+        assert digest != compute_run_digest(paths, "other key")
+        assert digest != compute_run_digest(paths[:2], "key")
+        paths[1].write_text("changed = 1;\n")
+        assert digest != compute_run_digest(paths, "key")
+
+    def test_missing_file(self, tmp_path: Path):
+        paths = make_files(tmp_path)
+        assert compute_run_digest([*paths, tmp_path / "missing.m"], "key") is None
+
+
+class TestRunRecordStore:
+    def test_replay(self, tmp_path: Path):
+        paths = make_files(tmp_path)
+        records_file = tmp_path / "run-records.json"
+        run_records = RunRecordStore(records_file=records_file)
+        recorder = RunRecorder("digest")
+        recorder.add(
+            LinterReport(
+                source_file=paths[1], records=[LinterRecord(id="NOSEMI", message="m", line=3)]
+            )
+        )
+        recorder.store(run_records)
+        run_records.save()
+
+        reloaded = RunRecordStore(records_file=records_file)
+        reloaded.load()
+        assert reloaded.replay("other digest", paths) is None
+        reports = list(reloaded.replay("digest", paths))
+        assert [r.source_file for r in reports] == paths
+        assert [len(r.records) for r in reports] == [0, 1, 0]
+        assert reports[1].records[0].id == "NOSEMI"
+        # Replaying only reorders the runs, which is not saved
+        assert not reloaded.has_changes
+
+    def test_saves_of_parallel_runs_are_merged(self, tmp_path: Path):
+        records_file = tmp_path / "run-records.json"
+        first = RunRecordStore(records_file=records_file)
+        second = RunRecordStore(records_file=records_file)
+        first.store("first", {})
+        second.store("second", {})
+        first.save()
+        second.save()
+
+        reloaded = RunRecordStore(records_file=records_file)
+        reloaded.load()
+        assert list(reloaded.runs) == ["first", "second"]
+
+
+class TestReplayedRun:
+    def test_second_run_is_replayed(
+        self, fake_matlab_handle, matlab_folder_path: Path, tmp_path: Path, capsys, monkeypatch
+    ):
+        paths = [tmp_path / "invalid_char.m", tmp_path / "clean_function.m"]
+        for path in paths:
+            shutil.copy(matlab_folder_path / path.name, path)
+        linted: List[Path] = []
+        mlint_lint = MLintHandle.lint
+
+        def counting_lint(self, filepaths, options):
+            linted.extend(filepaths)
+            return mlint_lint(self, filepaths, options)
+
+        monkeypatch.setattr(MLintHandle, "lint", counting_lint)
+
+        def run(result_cache_file: Path) -> ReturnCode:
+            run_records = RunRecordStore(records_file=tmp_path / "run-records.json")
+            run_records.load()
+            return validate_matlab(
+                matlab_handle=fake_matlab_handle,
+                filepaths=paths,
+                fail_warnings=False,
+                enable_cyc=False,
+                enable_mod_cyc=False,
+                ignore_ok_pragmas=False,
+                use_factory_default=False,
+                result_cache=LintResultCache(cache_file=result_cache_file),
+                run_records=run_records,
+            )
+
+        assert ReturnCode.FAIL == run(tmp_path / "lint-results.json")
+        first_output = capsys.readouterr().out
+        assert sorted(linted) == sorted(paths)
+
+        # Without a single cached result, the identical run is still not linted again
+        assert ReturnCode.FAIL == run(tmp_path / "empty-lint-results.json")
+        assert capsys.readouterr().out == first_output
+        assert len(linted) == 2
+
+        paths[1].write_text("x = 1\n")
+        run(tmp_path / "empty-lint-results.json")
+        assert len(linted) == 4
@@ -0,0 +1,203 @@
+import argparse
+import io
+import json
+import shutil
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from precommitmatlablint.lint_matlab import main
+from precommitmatlablint.linter_results import LinterRecord, LinterReport
+from precommitmatlablint.report_writers import JsonReportWriter, Reporter
+from precommitmatlablint.return_code import ReturnCode
+from precommitmatlablint.sharding import (
+    iter_json_report,
+    merge_reports,
+    parse_shard,
+    select_shard,
+)
+
+
+@pytest.fixture
+def matlab_folder_path() -> Path:
+    return Path(__file__).parent / "data" / "matlab"
+
+
+def make_files(folder: Path, count: int) -> List[Path]:
+    paths: List[Path] = []
+    for index in range(count):
+        path = folder / f"file_{index}.m"
+        # Sizes from 1 to 50 lines, so that shards of equal file counts can differ widely in size
+        path.write_text(f"x = {index};\n" * (index % 50 + 1))
+        paths.append(path)
+    return paths
+
+
+def write_json(
+    path: Path, reports: List[LinterReport], return_code: ReturnCode = ReturnCode.OK
+) -> Path:
+    data = {"reports": [r.to_dict() for r in reports], "return_code": int(return_code)}
+    path.write_text(json.dumps(data))
+    return path
+
+
+class TestShardSelection:
+    def test_parse_shard(self):
+        assert parse_shard("2/4") == (2, 4)
+        for value in ["0/4", "5/4", "1/0", "2", "a/b"]:
+            with pytest.raises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    @pytest.mark.parametrize("by_size", [False, True])
+    def test_shards_are_disjoint_and_complete(self, tmp_path: Path, by_size: bool):
+        filepaths = make_files(tmp_path, 200)
+        shards = [
+            list(select_shard(iter(filepaths), (index, 4), by_size=by_size))
+            for index in range(1, 5)
+        ]
+
+        assert sorted(f for shard in shards for f in shard) == sorted(filepaths)
+        assert all(len(shard) > 0 for shard in shards)
+        # The same input always gives the same shards
+        assert shards[2] == list(select_shard(filepaths, (3, 4), by_size=by_size))
+
+    def test_shards_by_size_are_balanced(self, tmp_path: Path):
+        filepaths = make_files(tmp_path, 200)
+        sizes = [
+            sum(f.stat().st_size for f in select_shard(filepaths, (i, 4), by_size=True))
+            for i in range(1, 5)
+        ]
+        assert max(sizes) - min(sizes) <= max(f.stat().st_size for f in filepaths)
+
+
+class TestMergeReports:
+    def test_merge(self, tmp_path: Path):
+        failure = LinterReport(
+            source_file=Path("b.m"), records=[LinterRecord(id="NOSEMI", message="m", line=1)]
+        )
+        partial_files = [
+            write_json(tmp_path / "1.json", [LinterReport(source_file=Path("a.m"))]),
+            write_json(tmp_path / "2.json", [failure], ReturnCode.FAIL),
+        ]
+        output_file = tmp_path / "merged.json"
+
+        assert ReturnCode.FAIL == merge_reports(
+            partial_files, report_format="json", output_file=output_file
+        )
+        merged = json.loads(output_file.read_text())
+        assert [r["source_file"] for r in merged["reports"]] == ["a.m", "b.m"]
+        assert merged["result"] == "FAIL"
+
+        assert ReturnCode.OK == merge_reports(partial_files[:1], output_file=output_file)
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+    def test_iter_json_report(self, chunk_size: int):
+        reports = [
+            LinterReport(
+                source_file=Path(f"{index}].m"),
+                records=[LinterRecord(id="NOSEMI", message="{ ], [", line=index)],
+            )
+            for index in range(5)
+        ]
+        stream = io.StringIO()
+        reporter = Reporter(JsonReportWriter(stream))
+        reporter.begin()
+        for report in reports:
+            reporter.add(report)
+        reporter.add_unchecked([Path("c.m")], fail=True)
+        reporter.finish()
+
+        stream.seek(0)
+        items = list(iter_json_report(stream, chunk_size=chunk_size))
+        assert [LinterReport.from_dict(data) for _, data in items[:-1]] == reports
+        assert items[-1] == (
+            "metadata",
+            {"return_code": 1, "result": "FAIL", "unchecked_files": ["c.m"]},
+        )
+
+    def test_unchecked_files_are_merged(self, tmp_path: Path):
+        partial_file = tmp_path / "1.json"
+        partial_file.write_text(
+            json.dumps(
+                {
+                    "reports": [LinterReport(source_file=Path("a.m")).to_dict()],
+                    "return_code": 1,
+                    "unchecked_files": ["b.m"],
+                }
+            )
+        )
+        output_file = tmp_path / "merged.json"
+
+        assert ReturnCode.FAIL == merge_reports(
+            [partial_file], report_format="json", output_file=output_file
+        )
+        assert json.loads(output_file.read_text())["unchecked_files"] == ["b.m"]
+
+    def test_failed_shard_without_records(self, tmp_path: Path):
+        """A shard may fail without any records, e.g. for the files it left unchecked."""
+        partial_files = [
+            write_json(tmp_path / "1.json", [LinterReport(source_file=Path("a.m"))]),
+            write_json(tmp_path / "2.json", [], ReturnCode.FAIL),
+        ]
+        assert ReturnCode.FAIL == merge_reports(partial_files, output_file=tmp_path / "merged.txt")
+
+    def test_ndjson_report(self, tmp_path: Path):
+        partial_file = tmp_path / "1.ndjson"
+        partial_file.write_text(json.dumps(LinterReport(source_file=Path("a.m")).to_dict()) + "\n")
+        assert ReturnCode.FAIL == merge_reports([partial_file], output_file=tmp_path / "merged.txt")
+
+    def test_missing_shard(self, tmp_path: Path):
+        partial_files = []
+        for index in [1, 3]:
+            path = tmp_path / f"{index}.json"
+            path.write_text(
+                json.dumps({"reports": [], "return_code": 0, "result": "OK", "shard": [index, 3]})
+            )
+            partial_files.append(path)
+
+        assert ReturnCode.FAIL == merge_reports(partial_files, output_file=tmp_path / "merged.txt")
+
+    def test_unreadable_report(self, tmp_path: Path):
+        assert ReturnCode.FAIL == merge_reports(
+            [tmp_path / "missing.json"], output_file=tmp_path / "merged.txt"
+        )
+
+
+class TestShardedRun:
+    def test_sharded_run_merges_to_the_full_run(
+        self, fake_matlab_handle, matlab_folder_path: Path, tmp_path: Path, monkeypatch
+    ):
+        monkeypatch.chdir(tmp_path)
+        root = tmp_path / "repo"
+        shutil.copytree(matlab_folder_path, root)
+        common_args = [f"--matlab-home-path={fake_matlab_handle.home_path}", "--no-result-cache"]
+        filepaths = [str(f) for f in sorted(root.glob("*.m"))]
+
+        partial_files: List[str] = []
+        for index in [1, 2, 3]:
+            partial_file = tmp_path / f"shard_{index}.json"
+            main(
+                [
+                    *common_args,
+                    f"--shard={index}/3",
+                    "--format=json",
+                    f"--output={partial_file}",
+                    *filepaths,
+                ]
+            )
+            assert json.loads(partial_file.read_text())["shard"] == [index, 3]
+            partial_files.append(str(partial_file))
+        merged_file = tmp_path / "merged.json"
+        merge_return_code = main(
+            ["merge", "--format=json", f"--output={merged_file}", *partial_files]
+        )
+
+        full_file = tmp_path / "full.json"
+        full_return_code = main(
+            [*common_args, "--format=json", f"--output={full_file}", *filepaths]
+        )
+
+        assert merge_return_code == full_return_code == int(ReturnCode.FAIL)
+        merged, full = json.loads(merged_file.read_text()), json.loads(full_file.read_text())
+        assert sorted(merged["reports"], key=lambda r: r["source_file"]) == full["reports"]
@@ -0,0 +1,88 @@
+import os
+import time
+from pathlib import Path
+from typing import List
+
+import pytest  # noqa: F401 # pylint: disable=unused-import
+
+from precommitmatlablint import stat_index as stat_index_module
+from precommitmatlablint.file_dedupe import hash_file
+from precommitmatlablint.stat_index import StatIndex
+
+
+def make_files(folder: Path, count: int) -> List[Path]:
+    paths: List[Path] = []
+    # Old enough for their digests to be remembered
+    mtime = time.time() - 60
+    for index in range(count):
+        path = folder / f"file_{index}.m"
+        path.write_text(f"x = {index};\n")
+        os.utime(path, (mtime, mtime))
+        paths.append(path)
+    return paths
+
+
+class TestStatIndex:
+    def test_unchanged_files_are_not_read(self, tmp_path: Path, monkeypatch):
+        filepaths = make_files(tmp_path, 20)
+        index_file = tmp_path / "stat-index.json"
+        stat_index = StatIndex(index_file=index_file)
+        assert stat_index.digests(filepaths) == [hash_file(f) for f in filepaths]
+        stat_index.save()
+
+        hashed: List[Path] = []
+
+        def counting_hash_file(path: Path):
+            hashed.append(path)
+            return hash_file(path)
+
+        monkeypatch.setattr(stat_index_module, "hash_file", counting_hash_file)
+        filepaths[4].write_text("changed = 1;\n")
+        reloaded = StatIndex(index_file=index_file)
+        reloaded.load()
+
+        assert reloaded.digests(filepaths) == [hash_file(f) for f in filepaths]
+        assert hashed == [filepaths[4]]
+        assert reloaded.digest(filepaths[0]) == hash_file(filepaths[0])
+        assert hashed == [filepaths[4]]
+
+    def test_recently_modified_files_are_not_remembered(self, tmp_path: Path):
+        filepath = tmp_path / "new.m"
+        filepath.write_text("x = 1;\n")
+        stat_index = StatIndex(index_file=tmp_path / "stat-index.json")
+
+        assert stat_index.digest(filepath) == hash_file(filepath)
+        assert len(stat_index.entries) == 0
+
+    def test_missing_file(self, tmp_path: Path):
+        stat_index = StatIndex(index_file=tmp_path / "stat-index.json")
+        assert stat_index.digests([tmp_path / "missing.m"]) == [None]
+
+    def test_hash_file_of_empty_file(self, tmp_path: Path):
+        filepath = tmp_path / "empty.m"
+        filepath.write_bytes(b"")
+        assert hash_file(filepath) is not None
+
+    def test_hash_file_of_large_file(self, tmp_path: Path):
+        filepath = tmp_path / "large.m"
+        filepath.write_bytes(b"x = 1;\n" * 400_000)
+        other = tmp_path / "other.m"
+        other.write_bytes(b"x = 1;\n" * 400_000 + b"y")
+        assert hash_file(filepath) != hash_file(other)
+
+    def test_saves_of_parallel_runs_are_merged(self, tmp_path: Path):
+        (tmp_path / "first").mkdir()
+        (tmp_path / "second").mkdir()
+        first_files = make_files(tmp_path / "first", 2)
+        second_files = make_files(tmp_path / "second", 2)
+        index_file = tmp_path / "stat-index.json"
+        first = StatIndex(index_file=index_file)
+        second = StatIndex(index_file=index_file)
+        first.digests(first_files)
+        second.digests(second_files)
+        first.save()
+        second.save()
+
+        reloaded = StatIndex(index_file=index_file)
+        reloaded.load()
+        assert list(reloaded.entries) == [str(f) for f in first_files + second_files]